@@ -13,6 +13,16 @@ class Settings:
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "metron_db")
+    # asyncpg পুলের সর্বনিম্ন/সর্বোচ্চ কানেকশন ও প্রতি কোয়েরির টাইমআউট (সেকেন্ড)
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    DB_COMMAND_TIMEOUT: float = float(os.getenv("DB_COMMAND_TIMEOUT", "60"))
+    # এতক্ষণ অলস থাকা কানেকশন বন্ধ হয় (সেকেন্ড); প্রতি কানেকশনে asyncpg এর অটো স্টেটমেন্ট ক্যাশের সাইজ
+    DB_MAX_INACTIVE_LIFETIME: float = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", "300"))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+    # নতুন কানেকশন খোলার টাইমআউট ও পুল হারালে রিকানেক্ট ব্যাকঅফের সর্বোচ্চ সীমা (সেকেন্ড)
+    DB_CONNECT_TIMEOUT: float = float(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+    DB_RECONNECT_MAX_BACKOFF_SEC: float = float(os.getenv("DB_RECONNECT_MAX_BACKOFF_SEC", "60"))
 
     # Notification Settings
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
@@ -22,6 +32,71 @@ class Settings:
     # Trading Settings
     PAPER_TRADING: bool = os.getenv("PAPER_TRADING", "True").lower() == "true"
     RISK_PERCENTAGE: float = float(os.getenv("RISK_PERCENTAGE", "2.0")) # Default 2%
+    # কমা দিয়ে আলাদা করা সিম্বল লিস্ট, যেমন "BTC/USDT,ETH/USDT,SOL/USDT"
+    TRADING_SYMBOLS: list = [s.strip() for s in os.getenv("TRADING_SYMBOLS", "BTC/USDT").split(",") if s.strip()]
+    # খালি থাকলে Binance Futures WebSocket; টেস্টে লোকাল রিপ্লে সার্ভার (যেমন ws://127.0.0.1:9001/stream)
+    MARKET_FEED_URL: str = os.getenv("MARKET_FEED_URL", "")
+
+    # Stream Pipeline Settings
+    # স্ট্র্যাটেজি অ্যানালাইসিস কত সেকেন্ড পরপর চলবে (নতুন বার শুরু হলে সাথে সাথে চলে)
+    ANALYSIS_INTERVAL_SEC: int = int(os.getenv("ANALYSIS_INTERVAL_SEC", "30"))
+    # ক্লোজড ক্যান্ডেল write-behind: এতগুলো জমলে অথবা এত সেকেন্ড পরপর এক COPY ব্যাচে সেভ
+    CANDLE_FLUSH_SIZE: int = int(os.getenv("CANDLE_FLUSH_SIZE", "500"))
+    CANDLE_FLUSH_INTERVAL_SEC: float = float(os.getenv("CANDLE_FLUSH_INTERVAL_SEC", "1.0"))
+    # ঐচ্ছিক (ডিফল্ট বন্ধ): true হলে aggTrade স্ট্রিমও সাবস্ক্রাইব হয়, প্রতিটি ট্রেড market_trades এ যায়
+    # (আসল vol_buy/vol_sell/smart_delta); বন্ধ থাকলে ক্যান্ডেল রঙের আনুমানিক অর্ডার-ফ্লো
+    MARKET_TRADES: bool = os.getenv("MARKET_TRADES", "False").lower() == "true"
+    # ট্রেড write-behind: এতগুলো জমলে অথবা এত সেকেন্ড পরপর এক COPY ব্যাচে সেভ
+    TRADE_FLUSH_SIZE: int = int(os.getenv("TRADE_FLUSH_SIZE", "5000"))
+    TRADE_FLUSH_INTERVAL_SEC: float = float(os.getenv("TRADE_FLUSH_INTERVAL_SEC", "0.5"))
+
+    # Compute Executor Settings
+    # NumPy/sklearn কাজের থ্রেড ও pandas_ta কাজের প্রসেস সংখ্যা (প্রসেস 0 = সব থ্রেড পুলে)
+    COMPUTE_THREADS: int = int(os.getenv("COMPUTE_THREADS", "4"))
+    COMPUTE_PROCESSES: int = int(os.getenv("COMPUTE_PROCESSES", "2"))
+    # এর বেশি ইভেন্ট লুপ ল্যাগ (ms) হলে স্টল হিসেবে লগ হবে
+    LOOP_LAG_WARN_MS: float = float(os.getenv("LOOP_LAG_WARN_MS", "100"))
+
+    # Metrics Settings
+    # false হলে হট পাথের টাইমিং ডেকোরেটর/কনটেক্সট ম্যানেজার no-op (প্রায় শূন্য ওভারহেড)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+
+    # API Cache Settings
+    # /api/v1/market-status এর সিরিয়ালাইজড রেসপন্স ক্যাশের সর্বোচ্চ মেমরি (MB)
+    MARKET_STATUS_CACHE_MB: int = int(os.getenv("MARKET_STATUS_CACHE_MB", "64"))
+
+    # Backtest Settings
+    # লোকাল ঐতিহাসিক ক্যান্ডেল স্টোরের ডিরেক্টরি (exchange/symbol/timeframe/YYYY-MM.npy)
+    CANDLE_STORE_DIR: str = os.getenv("CANDLE_STORE_DIR", "data/ohlcv")
+    # প্যারামিটার সুইপ ও পোর্টফোলিও ব্যাকটেস্টের প্রসেস সংখ্যা (0 = সব CPU কোর)
+    SWEEP_WORKERS: int = int(os.getenv("SWEEP_WORKERS", "0"))
+    # ব্যাকটেস্ট রিকোয়েস্টের সর্বোচ্চ ক্যান্ডেল সংখ্যা (limit); এর বেশি হলে রিকোয়েস্ট বাতিল (পেজিনেটেড ডাউনলোড ও ডিস্ক সীমিত)
+    BACKTEST_MAX_BARS: int = int(os.getenv("BACKTEST_MAX_BARS", "100000"))
+    # পোর্টফোলিও ব্যাকটেস্টের সর্বোচ্চ সিম্বল ও প্রতি এক্সচেঞ্জে একসাথে চলা ক্যান্ডেল ডাউনলোড
+    # (enableRateLimit শুধু একটি ক্লায়েন্টের ভেতরে থ্রটল করে, তাই সমান্তরাল ক্লায়েন্ট এখানে সীমিত)
+    PORTFOLIO_MAX_SYMBOLS: int = int(os.getenv("PORTFOLIO_MAX_SYMBOLS", "20"))
+    CANDLE_DOWNLOAD_CONCURRENCY: int = int(os.getenv("CANDLE_DOWNLOAD_CONCURRENCY", "2"))
+    # একটি সুইপ/ওয়াক-ফরওয়ার্ড রিকোয়েস্টে সর্বোচ্চ প্যারামিটার কনফিগারেশন (গ্রিড কম্বিনেশন বা র‍্যান্ডম স্যাম্পল)
+    SWEEP_MAX_CONFIGS: int = int(os.getenv("SWEEP_MAX_CONFIGS", "5000"))
+    # একসাথে চলা ব্যাকটেস্ট জব (প্রতিটি আলাদা প্রসেসে) ও মেমরিতে রাখা শেষ জবের সংখ্যা
+    BACKTEST_JOB_WORKERS: int = int(os.getenv("BACKTEST_JOB_WORKERS", "2"))
+    BACKTEST_JOB_HISTORY: int = int(os.getenv("BACKTEST_JOB_HISTORY", "200"))
+    # ব্যাকটেস্ট সিদ্ধান্তে (StrategyManager.get_strategy_decision) মার্কেট ফেজ-প্রতি ন্যূনতম স্কোর, "ফেজ=স্কোর,..." ফরম্যাটে;
+    # তালিকায় না থাকা ফেজে BACKTEST_DEFAULT_MIN_SCORE
+    BACKTEST_PHASE_MIN_SCORE: dict = {
+        key.strip(): int(value)
+        for key, _, value in (item.partition("=") for item in os.getenv(
+            "BACKTEST_PHASE_MIN_SCORE", "Markup=2,Accumulation=3,Consolidation=3,Distribution=4,Markdown=5"
+        ).split(","))
+        if key.strip() and value.strip()
+    }
+    BACKTEST_DEFAULT_MIN_SCORE: int = int(os.getenv("BACKTEST_DEFAULT_MIN_SCORE", "3"))
+
+    # Indicator Engine Settings
+    # True হলে লাইভ স্ট্রিমে ইন্ডিকেটর প্রতি টিকে ইনক্রিমেন্টালি (O(1)) আপডেট হবে
+    INCREMENTAL_INDICATORS: bool = os.getenv("INCREMENTAL_INDICATORS", "True").lower() == "true"
+    # ভারী ইন্ডিকেটরের ব্যাকএন্ড: pandas_ta (ডিফল্ট) | numpy | numba (numba ইনস্টল না থাকলে numpy)
+    INDICATOR_BACKEND: str = os.getenv("INDICATOR_BACKEND", "pandas_ta").lower()
     
     # Exchange Keys
     BINANCE_API_KEY: str = os.getenv("BINANCE_API_KEY", "")
@@ -30,6 +105,32 @@ class Settings:
     KUCOIN_SECRET_KEY: str = os.getenv("KUCOIN_SECRET_KEY", "")
     KUCOIN_PASSPHRASE: str = os.getenv("KUCOIN_PASSPHRASE", "")
     
+    # TimescaleDB Settings
+    # 15m/1H/4H/1D continuous aggregate তৈরি ও পড়া (false বা TimescaleDB না থাকলে ইন-প্রসেস রিস্যাম্পল)
+    CANDLE_AGGREGATES: bool = os.getenv("CANDLE_AGGREGATES", "True").lower() == "true"
+    # /api/v1/market-status এ continuous aggregate থেকে কতগুলো বার পড়া হবে
+    MARKET_STATUS_BARS: int = int(os.getenv("MARKET_STATUS_BARS", "300"))
+    # Hypertable চাঙ্কের সময়সীমা (নতুন চাঙ্কে প্রযোজ্য); অনেক সিম্বলে ছোট চাঙ্কের ইনডেক্স মেমরিতে থাকে
+    CANDLE_CHUNK_INTERVAL: str = os.getenv("CANDLE_CHUNK_INTERVAL", "1 day")
+    # এর চেয়ে পুরনো market_candles চাঙ্ক নেটিভ কম্প্রেশনে যায় (segmentby symbol); খালি = কম্প্রেশন বন্ধ
+    CANDLE_COMPRESS_AFTER: str = os.getenv("CANDLE_COMPRESS_AFTER", "7 days")
+    # রেজোলিউশন-প্রতি রিটেনশন (ঐচ্ছিক, ডিফল্ট খালি = কিছুই মোছা হয় না), যেমন "1m=180 days,15m=2 years"
+    # (1m = market_candles, বাকিগুলো continuous aggregate); মোছা ডাটা ফেরত আসে না, তাই অপারেটর নিজে চালু করবেন।
+    # তালিকায় না থাকলে চিরস্থায়ী; 1m রিটেনশন aggregate এর রিফ্রেশ উইন্ডো ও আর্কাইভ ইন্টারভালের চেয়ে বড় রাখতে হবে
+    CANDLE_RETENTION: dict = {
+        key.strip(): value.strip()
+        for key, _, value in (item.partition("=") for item in os.getenv("CANDLE_RETENTION", "").split(","))
+        if key.strip() and value.strip()
+    }
+    # কোল্ড (কম্প্রেসড) চাঙ্কের Parquet আর্কাইভ (ব্যাকটেস্টের CandleStore পড়ে) ও এক্সপোর্টের ইন্টারভাল (ঘণ্টা, 0 = বন্ধ);
+    # ডিফল্ট বন্ধ: এক্সপোর্ট ডিস্ক ও DB লোড বাড়ায়, তাই অপারেটর নিজে চালু করবেন (যেমন 6)
+    CANDLE_ARCHIVE_DIR: str = os.getenv("CANDLE_ARCHIVE_DIR", "data/archive")
+    CANDLE_ARCHIVE_INTERVAL_HOURS: float = float(os.getenv("CANDLE_ARCHIVE_INTERVAL_HOURS", "0"))
+    # market_trades এর চাঙ্ক সাইজ, কম্প্রেশন ও রিটেনশন (খালি = কম্প্রেশন বন্ধ / চিরস্থায়ী)
+    TRADE_CHUNK_INTERVAL: str = os.getenv("TRADE_CHUNK_INTERVAL", "1 hour")
+    TRADE_COMPRESS_AFTER: str = os.getenv("TRADE_COMPRESS_AFTER", "1 day")
+    TRADE_RETENTION: str = os.getenv("TRADE_RETENTION", "30 days")
+
     # Connection String creation
     DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
     ASYNC_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
@@ -1,147 +1,915 @@
+import asyncio
 import asyncpg
+import json
 import logging
+import time
+from contextlib import asynccontextmanager
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from app.core.config import settings
+from app.services.metrics import metrics
+from app.services.candle_store import candle_store, ARCHIVE_TIMEFRAME, PARQUET_AVAILABLE
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("TimescaleDB")
 
+# market_candles এর কলাম ক্রম (COPY রেকর্ড টাপল এই ক্রমে)
+CANDLE_COLUMNS = ('time', 'symbol', 'open', 'high', 'low', 'close', 'volume')
+# উইন্ডো রিডে প্রজেক্ট করা যায় এমন ভ্যালু কলাম (SQL এ শুধু এই নামগুলোই বসে)
+CANDLE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+# continuous aggregate এ বাড়তি কলাম (TimeframeManager.prepare_and_resample এর আউটপুটের মতো)
+AGGREGATE_FIELDS = CANDLE_FIELDS + ('money_flow', 'vol_buy', 'vol_sell')
+# API টাইমফ্রেম -> (ভিউ, বাকেট, রিফ্রেশ উইন্ডোর শুরু, রিফ্রেশ ইন্টারভাল); উইন্ডো অন্তত দুই বাকেট
+CANDLE_AGGREGATES = {
+    "15m": ("market_candles_15m", "15 minutes", "1 day", "1 minute"),
+    "1H": ("market_candles_1h", "1 hour", "3 days", "5 minutes"),
+    "4H": ("market_candles_4h", "4 hours", "10 days", "15 minutes"),
+    "1D": ("market_candles_1d", "1 day", "30 days", "1 hour"),
+}
+# market_trades এর কলাম ক্রম (COPY রেকর্ড টাপল এই ক্রমে); side = অ্যাগ্রেসরের দিক ('buy' | 'sell')
+TRADE_COLUMNS = ('time', 'symbol', 'price', 'qty', 'side', 'trade_id')
+# প্রতি মিনিটের আসল অর্ডার-ফ্লো (continuous aggregate); বড় বার এর থেকে যোগ করে
+TRADE_FLOW_VIEW = "market_trade_flow_1m"
+# পলিসির ধরন -> (timescaledb_information.jobs.proc_name, জব config এর ইন্টারভাল কী)
+POLICY_JOBS = {
+    "compression": ("policy_compression", "compress_after"),
+    "retention": ("policy_retention", "drop_after"),
+}
+# PostgreSQL epoch (2000-01-01) নয়, Unix epoch মাইক্রোসেকেন্ড হিসেবে টাইম পাঠানো হয়
+_EPOCH_US = "(extract(epoch FROM c.time) * 1000000)::bigint"
+
+
+def candle_record(data, default_symbol='BTC/USDT'):
+    """ক্যান্ডেল ডিক্ট ({'time', 's', 'open', ...}) -> CANDLE_COLUMNS ক্রমের টাপল (UTC টাইমস্ট্যাম্প)"""
+    ts = pd.to_datetime(data['time'])
+    if ts.tzinfo is None: ts = ts.tz_localize('UTC')
+    else: ts = ts.tz_convert('UTC')
+    return (ts, data.get('s', default_symbol), float(data['open']), float(data['high']),
+            float(data['low']), float(data['close']), float(data['volume']))
+
+
+def decode_candle_columns(time_bytes, column_bytes):
+    """
+    উইন্ডো কোয়েরির কলামার পেলোড -> ডাটাফ্রেম।
+    প্রতিটি কলাম একটি bytea (big-endian int8/float8 পরপর), তাই np.frombuffer এ সরাসরি অ্যারে;
+    রো-প্রতি Record/dict তৈরি হয় না।
+    """
+    index = pd.DatetimeIndex(
+        (np.frombuffer(time_bytes, dtype='>i8').astype(np.int64) * 1000).view('datetime64[ns]'),
+        name='timestamp'
+    ).tz_localize('UTC')
+    data = {name: np.frombuffer(raw, dtype='>f8').astype(np.float64) for name, raw in column_bytes.items()}
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def window_query(source, time_column, columns, start=False, end=False, limit=False):
+    """
+    _read_windows এর SQL: $1 = সিম্বল অ্যারে, তারপর যেগুলো দেওয়া হয়েছে সেই ক্রমে start, end, limit।
+    একই আর্গুমেন্টে হুবহু একই টেক্সট, তাই প্রিপেয়ার্ড স্টেটমেন্টের কী হিসেবেও চলে।
+    """
+    conditions = ["m.symbol = s.symbol"]
+    params = 1
+    for op, used in ((">=", start), ("<", end)):
+        if used:
+            params += 1
+            conditions.append(f"m.{time_column} {op} ${params}")
+    limit_sql = f"LIMIT ${params + 1}" if limit else ""
+
+    aggregates = ",\n               ".join(
+        f"string_agg(float8send(COALESCE(c.{c}, 'NaN'::float8)), ''::bytea ORDER BY c.time) AS {c}" for c in columns
+    )
+    return f"""
+        SELECT s.symbol,
+               string_agg(int8send({_EPOCH_US}), ''::bytea ORDER BY c.time) AS time,
+               {aggregates}
+        FROM unnest($1::text[]) AS s(symbol)
+        CROSS JOIN LATERAL (
+            SELECT m.{time_column} AS time, {", ".join(f"m.{c}" for c in columns)}
+            FROM {source} m
+            WHERE {" AND ".join(conditions)}
+            ORDER BY m.{time_column} DESC
+            {limit_sql}
+        ) c
+        GROUP BY s.symbol;
+    """
+
+
+# ==========================================
+# হট কোয়েরি (পুলের প্রতিটি কানেকশনে init এ একবার প্রিপেয়ার)
+# ==========================================
+SAVE_CANDLE_SQL = """
+    INSERT INTO market_candles (time, symbol, open, high, low, close, volume)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+    ON CONFLICT (time, symbol)
+    DO UPDATE SET
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume;
+"""
+# ON COMMIT DELETE ROWS: প্রতি ব্যাচের পর স্টেজিং খালি, কানেকশন পুলে ফিরলেও টেবিল থেকে যায়
+CANDLE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS market_candles_staging (
+        seq BIGSERIAL,
+        time TIMESTAMPTZ NOT NULL,
+        symbol TEXT NOT NULL,
+        open DOUBLE PRECISION,
+        high DOUBLE PRECISION,
+        low DOUBLE PRECISION,
+        close DOUBLE PRECISION,
+        volume DOUBLE PRECISION
+    ) ON COMMIT DELETE ROWS;
+"""
+# update -> স্টেজিং থেকে market_candles এ মার্জ (True = আপসার্ট, False = বিদ্যমান রো অপরিবর্তিত)
+CANDLE_MERGE_SQL = {
+    update: f"""
+    INSERT INTO market_candles (time, symbol, open, high, low, close, volume)
+    SELECT DISTINCT ON (time, symbol) time, symbol, open, high, low, close, volume
+    FROM market_candles_staging
+    ORDER BY time, symbol, seq DESC
+    ON CONFLICT (time, symbol) {conflict};
+"""
+    for update, conflict in ((True, """DO UPDATE SET
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume"""), (False, "DO NOTHING"))
+}
+SAVE_TRADE_SQL = """
+    INSERT INTO trade_ledger (order_id, symbol, side, price, amount, status, strategy, timestamp, mode, exchange)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    ON CONFLICT (order_id) DO NOTHING;
+"""
+LAST_CANDLE_TIME_SQL = "SELECT max(time) FROM market_candles WHERE symbol = $1;"
+# get_recent_candles / কোল্ড স্টার্ট ওয়ার্ম-আপ: সব কলাম, শুধু LIMIT
+RECENT_WINDOW_SQL = window_query("market_candles", "time", CANDLE_FIELDS, limit=True)
+HOT_STATEMENTS = {
+    "save_candle": SAVE_CANDLE_SQL,
+    "candle_merge": CANDLE_MERGE_SQL[True],
+    "candle_merge_new": CANDLE_MERGE_SQL[False],
+    "save_trade": SAVE_TRADE_SQL,
+    "last_candle_time": LAST_CANDLE_TIME_SQL,
+    "recent_window": RECENT_WINDOW_SQL,
+}
+# এই এররে কানেকশন/সার্ভার হারিয়েছে ধরা হয় (কোয়েরির নিজস্ব SQL এরর নয়);
+# কানেকশন পাওয়ার পরের টাইমআউট (command_timeout) ধীর কোয়েরি, তাই acquire() সেটিকে বাদ দেয়
+CONNECTION_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.exceptions.ConnectionDoesNotExistError,
+    asyncpg.exceptions.OperatorInterventionError,
+)
+
+metrics.describe("db_acquire_wait_seconds", "Time spent waiting for a pool connection")
+metrics.describe("db_query_seconds", "Database query latency by query")
+
+
+class PreparedConnection(asyncpg.Connection):
+    """পুলের কানেকশন + init এ একবার প্রিপেয়ার করা হট স্টেটমেন্ট (SQL টেক্সট -> PreparedStatement)"""
+    __slots__ = ('statements',)
+
+
 class Database:
+    """
+    asyncpg পুল (সাইজ সেটিংস থেকে) + অ্যাক্সেস লেয়ার:
+    - প্রতিটি নতুন কানেকশনে init এ HOT_STATEMENTS একবার প্রিপেয়ার হয়; পরে ওই SQL এ শুধু Bind/Execute যায়।
+    - acquire(): অপেক্ষার সময়, ব্যবহৃত কানেকশন ও অপেক্ষমাণ কলার গোনে (/metrics), _query() প্রতি কোয়েরির ল্যাটেন্সি।
+    - কানেক্ট ব্যর্থ হলে বা পুল হারালে এক্সপোনেনশিয়াল ব্যাকঅফে রিকানেক্ট; এর মধ্যে acquire() সাথে সাথে
+      ConnectionError দেয় (কলার লগ করে / রাইটার ব্যাচ ধরে রাখে), চুপচাপ কিছু না করে বসে থাকে না।
+    """
     def __init__(self):
         self.pool = None
+        # API টাইমফ্রেম -> তৈরি হওয়া continuous aggregate ভিউ (init_db পূরণ করে)
+        self.aggregates = {}
+        # TimescaleDB এক্সটেনশন আছে কিনা (init_db পূরণ করে); না থাকলে পলিসি/আর্কাইভ বন্ধ
+        self.timescale = False
+        # market_trades এর অর্ডার-ফ্লো ভিউ (তৈরি না হলে None, তখন কাঁচা টেবিল থেকে হিসাব)
+        self.trade_flow = None
+        # ব্যাকগ্রাউন্ডে ইতিহাস রিফ্রেশ + পলিসি লাগবে এমন aggregate: (ভিউ, সোর্স টেবিল, বাকেট, উইন্ডোর শুরু, রিফ্রেশ ইন্টারভাল)
+        self._aggregate_backfill = []
+        self._backfill_task = None
 
+        # পুলের অবস্থা
+        self.healthy = False
+        self.in_use = 0
+        self.waiting = 0
+        self.reconnects = 0
+        self._reconnect_task = None
+
+    # ==========================================
+    # কানেকশন পুল
+    # ==========================================
     async def connect(self):
         try:
-            self.pool = await asyncpg.create_pool(
-                dsn=settings.DATABASE_URL, 
-                min_size=1, 
-                max_size=10, 
-                command_timeout=60
-            )
-            await self.init_db()
-            logger.info("✅ Connected to TimescaleDB (Async Pool Ready)")
+            await self._open_pool()
         except Exception as e:
             logger.error(f"❌ DB Connection Failed: {e}")
+            self._schedule_reconnect()
 
-    async def init_db(self):
-        async with self.pool.acquire() as conn:
-            # 1. Market Data Table
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS market_candles (
-                    time TIMESTAMPTZ NOT NULL,
-                    symbol TEXT NOT NULL,
-                    open DOUBLE PRECISION,
-                    high DOUBLE PRECISION,
-                    low DOUBLE PRECISION,
-                    close DOUBLE PRECISION,
-                    volume DOUBLE PRECISION,
-                    UNIQUE(time, symbol)
-                );
-            """)
-            
-            # 2. Trade Ledger Table (NEW: Position Memory)
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS trade_ledger (
-                    order_id TEXT PRIMARY KEY,
-                    symbol TEXT NOT NULL,
-                    side TEXT NOT NULL,
-                    price DOUBLE PRECISION,
-                    amount DOUBLE PRECISION,
-                    status TEXT NOT NULL,
-                    strategy TEXT,
-                    timestamp TIMESTAMPTZ,
-                    mode TEXT,
-                    exchange TEXT
-                );
-            """)
-            
+    async def _open_pool(self):
+        # স্কিমা আগে আলাদা কানেকশনে, যাতে পুলের প্রতিটি কানেকশন init এ হট স্টেটমেন্ট প্রিপেয়ার করতে পারে
+        conn = await asyncpg.connect(dsn=settings.DATABASE_URL, timeout=settings.DB_CONNECT_TIMEOUT)
+        try:
+            await self.init_db(conn)
+        finally:
+            await conn.close()
+
+        self.pool = await asyncpg.create_pool(
+            dsn=settings.DATABASE_URL,
+            min_size=settings.DB_POOL_MIN_SIZE,
+            max_size=settings.DB_POOL_MAX_SIZE,
+            command_timeout=settings.DB_COMMAND_TIMEOUT,
+            max_inactive_connection_lifetime=settings.DB_MAX_INACTIVE_LIFETIME,
+            statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            timeout=settings.DB_CONNECT_TIMEOUT,
+            connection_class=PreparedConnection,
+            init=self._init_connection
+        )
+        self.healthy = True
+        logger.info(f"✅ Connected to TimescaleDB (Async Pool Ready, {settings.DB_POOL_MIN_SIZE}-{settings.DB_POOL_MAX_SIZE} connections)")
+        if self._aggregate_backfill and (self._backfill_task is None or self._backfill_task.done()):
+            self._backfill_task = asyncio.create_task(self._backfill_aggregates())
+
+    async def _init_connection(self, conn):
+        """পুলের প্রতিটি নতুন কানেকশনে একবার: COPY স্টেজিং টেম্প টেবিল ও HOT_STATEMENTS প্রিপেয়ার"""
+        conn.statements = {}
+        try:
+            await conn.execute(CANDLE_STAGING_SQL)
+        except Exception as e:
+            logger.warning(f"Staging table msg: {e}")
+        for name, query in HOT_STATEMENTS.items():
             try:
-                await conn.execute("""
-                    SELECT create_hypertable('market_candles', 'time', if_not_exists => TRUE);
-                """)
-                logger.info("⚡ Tables 'market_candles' & 'trade_ledger' Ready.")
+                conn.statements[query] = await conn.prepare(query)
             except Exception as e:
-                logger.warning(f"Hypertable creation msg: {e}")
-
-    async def save_candle(self, data):
-        if not self.pool: return
-        query = """
-            INSERT INTO market_candles (time, symbol, open, high, low, close, volume)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-            ON CONFLICT (time, symbol) 
-            DO UPDATE SET 
-                open = EXCLUDED.open, 
-                high = EXCLUDED.high, 
-                low = EXCLUDED.low, 
-                close = EXCLUDED.close, 
-                volume = EXCLUDED.volume;
-        """
-        try:
-            ts = pd.to_datetime(data['time'])
-            if ts.tzinfo is None: ts = ts.tz_localize('UTC')
-            else: ts = ts.tz_convert('UTC')
+                # প্রিপেয়ার না হলে _query সাধারণ পথে চলে (asyncpg এর অটো ক্যাশ)
+                logger.warning(f"Prepare {name} msg: {e}")
 
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        pool.acquire() এর মোড়ক: অপেক্ষার সময় (db_acquire_wait_seconds), ব্যবহৃত ও অপেক্ষমাণ কানেকশন গোনা।
+        কানেকশন হারানোর এরর হলে পুল অসুস্থ চিহ্নিত করে রিকানেক্ট শুরু, এররটি কলারের কাছে যায়।
+        """
+        if self.pool is None or not self.healthy:
+            raise ConnectionError("Database unavailable (reconnecting)")
+        acquired = False
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
             async with self.pool.acquire() as conn:
-                await conn.execute(query, ts, data['s'], float(data['open']), float(data['high']), float(data['low']), float(data['close']), float(data['volume']))
+                acquired = True
+                self.waiting -= 1
+                metrics.observe("db_acquire_wait_seconds", time.perf_counter() - started)
+                self.in_use += 1
+                try:
+                    yield conn
+                finally:
+                    self.in_use -= 1
+        except CONNECTION_ERRORS as e:
+            if not (acquired and isinstance(e, asyncio.TimeoutError)):
+                self._connection_lost(e)
+            raise
+        finally:
+            if not acquired:
+                self.waiting -= 1
+
+    async def _query(self, conn, name, method, query, *args):
+        """
+        প্রিপেয়ার্ড স্টেটমেন্ট থাকলে সেটি দিয়ে (পার্স/প্ল্যান নেই), নাহলে সাধারণ কোয়েরি; ল্যাটেন্সি db_query_seconds{query=name}।
+        method: 'fetch' | 'fetchrow' | 'fetchval' | 'execute'
+        """
+        started = time.perf_counter()
+        try:
+            statement = getattr(conn, 'statements', {}).get(query)
+            if statement is not None:
+                # PreparedStatement এ execute নেই; fetch রো না থাকলে [] দেয়
+                return await getattr(statement, 'fetch' if method == 'execute' else method)(*args)
+            return await getattr(conn, method)(query, *args)
+        finally:
+            metrics.observe("db_query_seconds", time.perf_counter() - started, query=name)
+
+    def _connection_lost(self, error):
+        if self.healthy:
+            logger.error(f"❌ DB Connection Lost: {error}")
+        self.healthy = False
+        self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    async def _reconnect(self):
+        """পুল নেই বা হারিয়েছে: এক্সপোনেনশিয়াল ব্যাকঅফে আবার চেষ্টা, সফল হলে থামে"""
+        backoff = 1
+        while True:
+            try:
+                if self.pool is None:
+                    await self._open_pool()
+                else:
+                    # asyncpg পুল মৃত কানেকশন নিজেই নতুন করে খোলে (init সহ); সার্ভার ফিরেছে কিনা যাচাই
+                    await self.pool.fetchval("SELECT 1;", timeout=settings.DB_CONNECT_TIMEOUT)
+                    self.healthy = True
+                self.reconnects += 1
+                logger.info("✅ DB Reconnected.")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"🔁 DB Reconnect Failed ({e}). Retrying in {backoff}s...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, settings.DB_RECONNECT_MAX_BACKOFF_SEC)
+
+    async def close(self):
+        for task in (self._reconnect_task, self._backfill_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+        self.healthy = False
+
+    def stats(self):
+        return {
+            "connected": self.pool is not None and self.healthy,
+            "size": self.pool.get_size() if self.pool is not None else 0,
+            "idle": self.pool.get_idle_size() if self.pool is not None else 0,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "min_size": settings.DB_POOL_MIN_SIZE,
+            "max_size": settings.DB_POOL_MAX_SIZE,
+            "reconnects": self.reconnects
+        }
+
+    def collect_metrics(self):
+        """/metrics এর জন্য পুলের গেজ (স্ক্রেপের সময় পড়া হয়)"""
+        stats = self.stats()
+        return [
+            ("db_up", "gauge", "1 if the database pool is connected", {}, int(stats["connected"])),
+            ("db_pool_connections", "gauge", "Open connections in the database pool", {}, stats["size"]),
+            ("db_pool_in_use", "gauge", "Pool connections currently acquired", {}, stats["in_use"]),
+            ("db_pool_waiting", "gauge", "Callers waiting to acquire a pool connection", {}, stats["waiting"]),
+            ("db_pool_max_size", "gauge", "Configured maximum pool size", {}, stats["max_size"]),
+            ("db_reconnects_total", "counter", "Successful database reconnects", {}, stats["reconnects"])
+        ]
+
+    async def init_db(self, conn):
+        # 1. Market Data Table
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS market_candles (
+                time TIMESTAMPTZ NOT NULL,
+                symbol TEXT NOT NULL,
+                open DOUBLE PRECISION,
+                high DOUBLE PRECISION,
+                low DOUBLE PRECISION,
+                close DOUBLE PRECISION,
+                volume DOUBLE PRECISION,
+                UNIQUE(time, symbol)
+            );
+        """)
+        
+        # 2. Trade Ledger Table (NEW: Position Memory)
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS trade_ledger (
+                order_id TEXT PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                side TEXT NOT NULL,
+                price DOUBLE PRECISION,
+                amount DOUBLE PRECISION,
+                status TEXT NOT NULL,
+                strategy TEXT,
+                timestamp TIMESTAMPTZ,
+                mode TEXT,
+                exchange TEXT
+            );
+        """)
+        
+        # 3. Backtest Jobs Table (জবের স্ট্যাটাস + ফলাফল, param_hash দিয়ে ডুপ্লিকেট খোঁজা)
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS backtest_jobs (
+                job_id TEXT PRIMARY KEY,
+                param_hash TEXT NOT NULL,
+                params JSONB NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                metrics JSONB,
+                result JSONB,
+                created_at TIMESTAMPTZ NOT NULL,
+                finished_at TIMESTAMPTZ
+            );
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS backtest_jobs_param_hash_idx ON backtest_jobs (param_hash, finished_at DESC);
+        """)
+        # সিম্বল-প্রতি সর্বশেষ N ক্যান্ডেল: (symbol, time DESC) ইনডেক্স স্ক্যান, শুরুতেই থেমে যায়
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS market_candles_symbol_time_idx ON market_candles (symbol, time DESC);
+        """)
+
+        # 4. Market Trades (টিক-লেভেল অর্ডার-ফ্লো, append-only)
+        # UNIQUE কনস্ট্রেইন্ট নেই: প্রতি রো ইনসার্টে ইউনিক চেক ও বাড়তি ইনডেক্স ছাড়াই সরাসরি COPY
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS market_trades (
+                time TIMESTAMPTZ NOT NULL,
+                symbol TEXT NOT NULL,
+                price DOUBLE PRECISION NOT NULL,
+                qty DOUBLE PRECISION NOT NULL,
+                side TEXT NOT NULL,
+                trade_id BIGINT
+            );
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS market_trades_symbol_time_idx ON market_trades (symbol, time DESC);
+        """)
+
+        try:
+            await conn.execute("""
+                SELECT create_hypertable('market_candles', 'time',
+                    chunk_time_interval => $1::text::interval, if_not_exists => TRUE);
+            """, settings.CANDLE_CHUNK_INTERVAL)
+            # আগে থেকে থাকা hypertable এ শুধু নতুন চাঙ্কের সাইজ বদলায়
+            await conn.execute("""
+                SELECT set_chunk_time_interval('market_candles', $1::text::interval);
+            """, settings.CANDLE_CHUNK_INTERVAL)
+            logger.info("⚡ Tables 'market_candles' & 'trade_ledger' Ready.")
+        except Exception as e:
+            logger.warning(f"Hypertable creation msg: {e}")
+
+        try:
+            # ঘণ্টাভিত্তিক চাঙ্ক: উচ্চ ইনজেস্টেও সক্রিয় চাঙ্কের ইনডেক্স মেমরিতে থাকে
+            await conn.execute("""
+                SELECT create_hypertable('market_trades', 'time',
+                    chunk_time_interval => $1::text::interval, if_not_exists => TRUE);
+            """, settings.TRADE_CHUNK_INTERVAL)
+            await conn.execute("""
+                SELECT set_chunk_time_interval('market_trades', $1::text::interval);
+            """, settings.TRADE_CHUNK_INTERVAL)
+        except Exception as e:
+            logger.warning(f"Hypertable creation msg (market_trades): {e}")
+
+        self.timescale = await conn.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'timescaledb');"
+        )
+        self._aggregate_backfill = []
+        await self._init_aggregates(conn)
+        await self._init_trade_flow(conn)
+        await self._init_storage_policies(conn)
+
+    @metrics.timed("save_candle")
+    async def save_candle(self, data):
+        try:
+            async with self.acquire() as conn:
+                await self._query(conn, "save_candle", "execute", SAVE_CANDLE_SQL, *candle_record(data))
         except Exception as e:
             logger.error(f"Save Candle Error: {e}")
 
     async def save_bulk_candles(self, data_list):
-        if not self.pool or not data_list: return
-        records = []
-        for d in data_list:
-            ts = pd.to_datetime(d['time'])
-            if ts.tzinfo is None: ts = ts.tz_localize('UTC')
-            else: ts = ts.tz_convert('UTC')
-            records.append((ts, d.get('s', 'BTC/USDT'), d['open'], d['high'], d['low'], d['close'], d['volume']))
-        
+        """ব্যাকফিল: আগে থেকে থাকা ক্যান্ডেল অপরিবর্তিত (DO NOTHING), COPY দিয়ে এক রাউন্ড-ট্রিপে"""
+        if not data_list: return
         try:
-            async with self.pool.acquire() as conn:
-                query = """
-                    INSERT INTO market_candles (time, symbol, open, high, low, close, volume)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7)
-                    ON CONFLICT (time, symbol) DO NOTHING;
-                """
-                await conn.executemany(query, records)
-                logger.info(f"💾 Bulk Saved {len(data_list)} candles to TimescaleDB")
+            records = [candle_record(d) for d in data_list]
+            await self.copy_candles(records, update=False)
+            logger.info(f"💾 Bulk Saved {len(data_list)} candles to TimescaleDB")
         except Exception as e:
             logger.error(f"Bulk Save Error: {e}")
 
-    async def get_recent_candles(self, symbol, limit=300):
-        if not self.pool: return pd.DataFrame()
-        query = "SELECT time, open, high, low, close, volume FROM market_candles WHERE symbol = $1 ORDER BY time ASC LIMIT $2;"
+    @metrics.timed("copy_candles")
+    async def copy_candles(self, records, update=True):
+        """
+        ক্যান্ডেল ব্যাচ: binary COPY দিয়ে সেশন-লোকাল স্টেজিং টেবিলে, তারপর এক INSERT ... SELECT এ মার্জ।
+        update=True হলে save_candle এর মতো আপসার্ট, False হলে বিদ্যমান রো অপরিবর্তিত।
+        একই (time, symbol) একাধিকবার থাকলে শেষেরটিই যায় (ON CONFLICT একই রো দুবার ছুঁতে পারে না)।
+        এরর কলারের কাছে যায়, যাতে ব্যাচটি আবার চেষ্টা করা যায়।
+        """
+        if not records: return 0
+        merge = CANDLE_MERGE_SQL[update]
+        async with self.acquire() as conn:
+            async with conn.transaction():
+                # init এ স্টেজিং টেবিল তৈরি ও মার্জ প্রিপেয়ার হয়; না হয়ে থাকলে এখানে তৈরি
+                if merge not in getattr(conn, 'statements', {}):
+                    await conn.execute(CANDLE_STAGING_SQL)
+                await conn.copy_records_to_table('market_candles_staging', records=records, columns=CANDLE_COLUMNS)
+                await self._query(conn, "candle_merge" if update else "candle_merge_new", "execute", merge)
+        return len(records)
+
+    async def get_recent_candles(self, symbol, limit=300, columns=None):
+        """সিম্বলের সর্বশেষ `limit` টি ক্যান্ডেল, পুরনো থেকে নতুন ক্রমে"""
+        return await self.get_candles(symbol, limit=limit, columns=columns)
+
+    async def get_recent_candles_multi(self, symbols, limit=300, columns=None):
+        """একাধিক সিম্বলের সর্বশেষ `limit` টি করে ক্যান্ডেল এক রাউন্ড-ট্রিপে (কোল্ড স্টার্ট ওয়ার্ম-আপ)"""
+        return await self.get_candles_multi(symbols, limit=limit, columns=columns)
+
+    async def get_candles(self, symbol, start=None, end=None, limit=None, columns=None):
+        """এক সিম্বলের উইন্ডো রিড; বিস্তারিত get_candles_multi তে"""
+        frames = await self.get_candles_multi([symbol], start=start, end=end, limit=limit, columns=columns)
+        return frames.get(symbol, pd.DataFrame())
+
+    @metrics.timed("get_candles")
+    async def get_candles_multi(self, symbols, start=None, end=None, limit=None, columns=None):
+        """
+        উইন্ডো রিড: [start, end) টাইম রেঞ্জ, প্রতি সিম্বলে সর্বোচ্চ সর্বশেষ `limit` টি রো, শুধু চাওয়া `columns`।
+        প্রতি সিম্বলে (symbol, time DESC) ইনডেক্সে উল্টো স্ক্যান করে LIMIT, তারপর সার্ভারেই সময়ের ক্রমে সাজিয়ে
+        প্রতিটি কলাম একটি বাইনারি bytea তে জোড়া লাগানো হয় (NULL -> NaN), তাই সব সিম্বল এক রাউন্ড-ট্রিপে আসে
+        এবং ক্লায়েন্টে np.frombuffer দিয়ে কলামার ডিকোড হয়।
+        রিটার্ন: {symbol: DataFrame (index 'timestamp' UTC)}, ডাটা না থাকলে খালি ডাটাফ্রেম।
+        """
+        return await self._read_windows("market_candles", "time", CANDLE_FIELDS, symbols, start, end, limit, columns)
+
+    async def _read_windows(self, source, time_column, fields, symbols, start=None, end=None, limit=None, columns=None, strict=False):
+        """get_candles_multi এর কোয়েরি, যেকোনো (symbol, time_column, fields...) টেবিল/ভিউ এর জন্য (strict: এরর রেইজ হয়)"""
+        symbols = list(dict.fromkeys(symbols))
+        frames = {symbol: pd.DataFrame() for symbol in symbols}
+        if not self.pool or not symbols: return frames
+
+        columns = list(columns or fields)
+        unknown = [c for c in columns if c not in fields]
+        if unknown:
+            raise ValueError(f"Unknown candle columns: {unknown}")
+
+        args = [symbols]
+        for bound in (start, end):
+            if bound is not None:
+                ts = pd.Timestamp(bound)
+                args.append(ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC'))
+        if limit is not None:
+            args.append(int(limit))
+
+        query = window_query(source, time_column, columns, start is not None, end is not None, limit is not None)
+        name = "recent_window" if query == RECENT_WINDOW_SQL else f"window_{source}"
         try:
-            async with self.pool.acquire() as conn:
-                rows = await conn.fetch(query, symbol, limit)
-                if not rows: return pd.DataFrame()
-                data = [dict(row) for row in rows]
-                df = pd.DataFrame(data)
-                df['time'] = pd.to_datetime(df['time'])
-                df.set_index('time', inplace=True)
-                df.index.name = 'timestamp'
-                return df
+            async with self.acquire() as conn:
+                rows = await self._query(conn, name, "fetch", query, *args)
+            for row in rows:
+                frames[row['symbol']] = decode_candle_columns(row['time'], {c: row[c] for c in columns})
+            return frames
         except Exception as e:
+            if strict: raise
             logger.error(f"Fetch Error: {e}")
+            return frames
+
+    # ==========================================
+    # Continuous Aggregates (উচ্চ টাইমফ্রেম)
+    # ==========================================
+    async def _init_aggregates(self, conn):
+        """
+        CANDLE_AGGREGATES এর প্রতিটি টাইমফ্রেমের continuous aggregate ও রিফ্রেশ পলিসি।
+        TimescaleDB না থাকলে (বা CANDLE_AGGREGATES=false) কিছুই তৈরি হয় না, রিড পাথ ইন-প্রসেস রিস্যাম্পলে ফেরে।
+        """
+        self.aggregates = {}
+        if not settings.CANDLE_AGGREGATES:
+            return
+        if not self.timescale:
+            logger.warning("TimescaleDB extension not found, higher timeframes use in-process resampling.")
+            return
+
+        for timeframe, (view, bucket, start_offset, schedule) in CANDLE_AGGREGATES.items():
+            try:
+                # ১ মিনিট বার থেকে OHLCV + টার্নওভার + ক্যান্ডেল রঙ দিয়ে বাই/সেল ভলিউম
+                # (TimeframeManager.prepare_and_resample এর একই নিয়ম, যাতে দুই পাথের ফলাফল মেলে)
+                # WITH NO DATA: তৈরি সাথে সাথে, ইতিহাস _backfill_aggregates ব্যাকগ্রাউন্ডে ম্যাটেরিয়ালাইজ করে
+                await conn.execute(f"""
+                    CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+                    WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+                    SELECT time_bucket(INTERVAL '{bucket}', time) AS bucket,
+                           symbol,
+                           first(open, time) AS open,
+                           max(high) AS high,
+                           min(low) AS low,
+                           last(close, time) AS close,
+                           sum(volume) AS volume,
+                           sum((high + low + close) / 3 * volume) AS money_flow,
+                           sum(CASE WHEN close >= open THEN volume ELSE 0 END) AS vol_buy,
+                           sum(CASE WHEN close < open THEN volume ELSE 0 END) AS vol_sell
+                    FROM market_candles
+                    GROUP BY bucket, symbol
+                    WITH NO DATA;
+                """)
+                await conn.execute(f"""
+                    CREATE INDEX IF NOT EXISTS {view}_symbol_bucket_idx ON {view} (symbol, bucket DESC);
+                """)
+                self._aggregate_backfill.append((view, "market_candles", bucket, start_offset, schedule))
+                self.aggregates[timeframe] = view
+            except Exception as e:
+                logger.warning(f"Continuous aggregate {view} unavailable: {e}")
+        if self.aggregates:
+            logger.info(f"⚡ Continuous Aggregates Ready: {', '.join(self.aggregates)}")
+
+    async def _backfill_aggregates(self):
+        """
+        WITH NO DATA তৈরি aggregate গুলোর ইতিহাস ব্যাকগ্রাউন্ডে ম্যাটেরিয়ালাইজ (স্টার্টআপ/init_db আটকায় না), তারপর রিফ্রেশ পলিসি।
+        - উইন্ডো: সোর্স টেবিলের সবচেয়ে পুরনো সারি থেকে পলিসি উইন্ডোর শুরু পর্যন্ত; রিটেনশনে মোছা অংশ ছোঁয়া হয় না
+        - TimescaleDB শুধু ইনভ্যালিডেটেড অংশ আবার হিসাব করে, তাই প্রতি কানেক্টে চালানো সস্তা; মাঝপথে থামলে পরেরবার বাকিটা হয়
+        - পলিসি রিফ্রেশের পরে: আগে যোগ হলে ওয়াটারমার্ক সামনে সরে পুরনো ইতিহাস ভিউ থেকে বাদ পড়ত।
+          ততক্ষণ real-time aggregation (materialized_only = false) কাঁচা ডাটা থেকে সঠিক (একটু ধীর) ফলাফল দেয়
+        """
+        conn = None
+        try:
+            # আলাদা কানেকশন, command timeout ছাড়া: দীর্ঘ রিফ্রেশ পুলের কানেকশন আটকে রাখে না
+            conn = await asyncpg.connect(dsn=settings.DATABASE_URL, timeout=settings.DB_CONNECT_TIMEOUT)
+            for view, source, bucket, start_offset, schedule in self._aggregate_backfill:
+                try:
+                    oldest, window_end, bucket_len = await conn.fetchrow(f"""
+                        SELECT min(time), now() - INTERVAL '{start_offset}', INTERVAL '{bucket}' FROM {source};
+                    """)
+                    # রিফ্রেশ উইন্ডোতে অন্তত দুই বাকেট না থাকলে ইতিহাস নেই, পলিসিই সব কভার করে
+                    if oldest is not None and oldest + 2 * bucket_len <= window_end:
+                        started = time.perf_counter()
+                        # refresh_continuous_aggregate ট্রানজ্যাকশন/প্রিপেয়ার্ড স্টেটমেন্টে চলে না, তাই লিটারাল টাইম
+                        await conn.execute(f"""
+                            CALL refresh_continuous_aggregate('{view}',
+                                '{oldest.isoformat()}'::timestamptz, '{window_end.isoformat()}'::timestamptz);
+                        """)
+                        logger.info(f"⚡ Aggregate History Refreshed: {view} in {time.perf_counter() - started:.1f}s")
+                    # শেষের অসম্পূর্ণ অংশ real-time aggregation (materialized_only = false) এ কাঁচা ডাটা থেকে আসে
+                    await conn.execute(f"""
+                        SELECT add_continuous_aggregate_policy('{view}',
+                            start_offset => INTERVAL '{start_offset}',
+                            end_offset => INTERVAL '1 minute',
+                            schedule_interval => INTERVAL '{schedule}',
+                            if_not_exists => TRUE);
+                    """)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ Aggregate Backfill Error ({view}): {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Aggregate Backfill Failed: {e}")
+        finally:
+            if conn is not None:
+                await conn.close()
+
+    @metrics.timed("get_aggregated_candles")
+    async def get_aggregated_candles(self, symbol, timeframe, limit=300, start=None, end=None):
+        """
+        continuous aggregate থেকে টাইমফ্রেমের সর্বশেষ `limit` টি বার (open..volume, money_flow, vol_buy, vol_sell)।
+        টাইমফ্রেমের aggregate না থাকলে None, কলার তখন ১ মিনিট ডাটা রিস্যাম্পল করে।
+        """
+        view = self.aggregates.get(timeframe)
+        if view is None or not self.pool: return None
+        frames = await self._read_windows(view, "bucket", AGGREGATE_FIELDS, [symbol], start, end, limit)
+        return frames[symbol]
+
+    # ==========================================
+    # Market Trades (অর্ডার-ফ্লো)
+    # ==========================================
+    async def _init_trade_flow(self, conn):
+        """
+        market_trades থেকে প্রতি মিনিটের বাই/সেল ভলিউম ও ট্রেড সংখ্যার continuous aggregate।
+        প্রতি রিডে লাখো টিক স্ক্যান না করে মিনিট-বার যোগ হয়; TimescaleDB না থাকলে কাঁচা টেবিল থেকে হিসাব।
+        """
+        self.trade_flow = None
+        if not self.timescale:
+            return
+        try:
+            await conn.execute(f"""
+                CREATE MATERIALIZED VIEW IF NOT EXISTS {TRADE_FLOW_VIEW}
+                WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+                SELECT time_bucket(INTERVAL '1 minute', time) AS bucket,
+                       symbol,
+                       sum(CASE WHEN side = 'buy' THEN qty ELSE 0 END) AS vol_buy,
+                       sum(CASE WHEN side = 'sell' THEN qty ELSE 0 END) AS vol_sell,
+                       count(*) AS trades
+                FROM market_trades
+                GROUP BY bucket, symbol
+                WITH NO DATA;
+            """)
+            await conn.execute(f"""
+                CREATE INDEX IF NOT EXISTS {TRADE_FLOW_VIEW}_symbol_bucket_idx ON {TRADE_FLOW_VIEW} (symbol, bucket DESC);
+            """)
+            self._aggregate_backfill.append((TRADE_FLOW_VIEW, "market_trades", "1 minute", "1 hour", "1 minute"))
+            self.trade_flow = TRADE_FLOW_VIEW
+            logger.info(f"⚡ Trade Flow Aggregate Ready: {TRADE_FLOW_VIEW}")
+        except Exception as e:
+            logger.warning(f"Continuous aggregate {TRADE_FLOW_VIEW} unavailable: {e}")
+
+    @metrics.timed("copy_trades")
+    async def copy_trades(self, records):
+        """
+        ট্রেড ব্যাচ (TRADE_COLUMNS ক্রমের টাপল) binary COPY দিয়ে সরাসরি market_trades এ; append-only, তাই
+        স্টেজিং/মার্জ লাগে না। এরর কলারের কাছে যায়, যাতে ব্যাচটি আবার চেষ্টা করা যায়।
+        """
+        if not records: return 0
+        async with self.acquire() as conn:
+            await conn.copy_records_to_table('market_trades', records=records, columns=TRADE_COLUMNS)
+        return len(records)
+
+    @metrics.timed("get_trade_flow")
+    async def get_trade_flow(self, symbol, bucket="1 minute", start=None, end=None, limit=None):
+        """
+        প্রতি বারে আসল অর্ডার-ফ্লো: vol_buy, vol_sell (অ্যাগ্রেসরের দিক অনুযায়ী qty), smart_delta ও trades (সংখ্যা)।
+        বড় বাকেট মিনিট-aggregate যোগ করে আসে; বাকেটের সীমা market_candles_* aggregate এর time_bucket এর সাথে মেলে।
+        রিটার্ন: DataFrame (index 'timestamp' UTC, পুরনো থেকে নতুন), ট্রেড না থাকলে খালি ডাটাফ্রেম।
+        """
+        if not self.pool: return pd.DataFrame()
+        if self.trade_flow:
+            source, time_column = self.trade_flow, "bucket"
+            buy, sell, count = "sum(vol_buy)", "sum(vol_sell)", "sum(trades)"
+        else:
+            source, time_column = "market_trades", "time"
+            buy = "sum(CASE WHEN side = 'buy' THEN qty ELSE 0 END)"
+            sell = "sum(CASE WHEN side = 'sell' THEN qty ELSE 0 END)"
+            count = "count(*)"
+        if self.timescale:
+            bucket_sql = f"time_bucket($2::text::interval, {time_column})"
+        else:
+            bucket_sql = f"date_bin($2::text::interval, {time_column}, TIMESTAMPTZ 'epoch')"
+
+        args = [symbol, bucket]
+        conditions = ["symbol = $1"]
+        for op, bound in ((">=", start), ("<", end)):
+            if bound is not None:
+                ts = pd.Timestamp(bound)
+                args.append(ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC'))
+                conditions.append(f"{time_column} {op} ${len(args)}")
+        limit_sql = ""
+        if limit is not None:
+            args.append(int(limit))
+            limit_sql = f"LIMIT ${len(args)}"
+
+        query = f"""
+            SELECT {bucket_sql} AS bucket,
+                   {buy} AS vol_buy,
+                   {sell} AS vol_sell,
+                   ({count})::bigint AS trades
+            FROM {source}
+            WHERE {" AND ".join(conditions)}
+            GROUP BY 1
+            ORDER BY 1 DESC
+            {limit_sql};
+        """
+        try:
+            async with self.acquire() as conn:
+                rows = await self._query(conn, "trade_flow", "fetch", query, *args)
+        except Exception as e:
+            logger.error(f"Trade Flow Fetch Error: {e}")
+            return pd.DataFrame()
+        if not rows:
             return pd.DataFrame()
 
+        rows.reverse()
+        index = pd.DatetimeIndex([row['bucket'] for row in rows], name='timestamp')
+        index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+        df = pd.DataFrame({
+            'vol_buy': np.array([row['vol_buy'] for row in rows], dtype=np.float64),
+            'vol_sell': np.array([row['vol_sell'] for row in rows], dtype=np.float64),
+            'trades': np.array([row['trades'] for row in rows], dtype=np.int64)
+        }, index=index)
+        df['smart_delta'] = df['vol_buy'] - df['vol_sell']
+        return df
+
+    # ==========================================
+    # Compression / Retention / কোল্ড আর্কাইভ
+    # ==========================================
+    async def _init_storage_policies(self, conn):
+        """
+        market_candles/market_trades এর নেটিভ কম্প্রেশন (segmentby symbol, orderby time) ও রেজোলিউশন-প্রতি রিটেনশন।
+        সেটিংস বদলালে পরের স্টার্টআপে পলিসি বদলায়; অপরিবর্তিত থাকলে জব যেমন আছে তেমনই থাকে।
+        """
+        if not self.timescale:
+            return
+        for table, compress_after in (("market_candles", settings.CANDLE_COMPRESS_AFTER),
+                                      ("market_trades", settings.TRADE_COMPRESS_AFTER)):
+            try:
+                # None = hypertable নয় (create_hypertable ব্যর্থ হয়েছে)
+                enabled = await conn.fetchval("""
+                    SELECT compression_enabled FROM timescaledb_information.hypertables
+                    WHERE hypertable_name = $1;
+                """, table)
+                if enabled is None:
+                    continue
+                # একই সিম্বলের রো একসাথে, সময়ের উল্টো ক্রমে কলামার কম্প্রেস হয় (সর্বশেষ-N রিডের ক্রম)
+                if compress_after and not enabled:
+                    await conn.execute(f"""
+                        ALTER TABLE {table} SET (
+                            timescaledb.compress,
+                            timescaledb.compress_segmentby = 'symbol',
+                            timescaledb.compress_orderby = 'time DESC'
+                        );
+                    """)
+                await self._set_policy(conn, "compression", table, compress_after)
+            except Exception as e:
+                logger.warning(f"Compression policy {table} msg: {e}")
+
+        retention = {"market_candles": settings.CANDLE_RETENTION.get("1m"), "market_trades": settings.TRADE_RETENTION}
+        retention.update({view: settings.CANDLE_RETENTION.get(timeframe) for timeframe, view in self.aggregates.items()})
+        if self.trade_flow:
+            retention[self.trade_flow] = settings.CANDLE_RETENTION.get("1m")
+        for relation, interval in retention.items():
+            try:
+                await self._set_policy(conn, "retention", relation, interval)
+            except Exception as e:
+                logger.warning(f"Retention policy {relation} msg: {e}")
+
+    async def _set_policy(self, conn, kind, relation, interval):
+        """
+        add_{kind}_policy(relation, interval); একই ইন্টারভালে আগে থেকেই থাকলে কিছু করা হয় না (জবের শিডিউল
+        রিসেট হলে ঘনঘন রিস্টার্টে জব কখনো চলত না), ভিন্ন হলে বদলানো হয়, interval খালি হলে পলিসি বাদ।
+        """
+        if not interval:
+            await conn.execute(f"SELECT remove_{kind}_policy($1::text::regclass, if_exists => TRUE);", relation)
+            return
+        proc, key = POLICY_JOBS[kind]
+        # continuous aggregate এর জব তার materialization hypertable এর নামে থাকে
+        same = await conn.fetchval("""
+            SELECT (j.config->>$2)::interval = $4::text::interval
+            FROM timescaledb_information.jobs j
+            WHERE j.proc_name = $1 AND j.hypertable_name = COALESCE(
+                (SELECT materialization_hypertable_name FROM timescaledb_information.continuous_aggregates
+                 WHERE view_name = $3), $3);
+        """, proc, key, relation, interval)
+        if same:
+            return
+        if same is not None:
+            await conn.execute(f"SELECT remove_{kind}_policy($1::text::regclass, if_exists => TRUE);", relation)
+        await conn.execute(f"SELECT add_{kind}_policy($1::text::regclass, $2::text::interval);", relation, interval)
+        logger.info(f"🗜️ {kind.title()} policy: {relation} after {interval}")
+
+    async def export_cold_chunks(self, older_than=None):
+        """
+        কোল্ড (কম্প্রেশনের বয়স পার হওয়া) market_candles চাঙ্ক সিম্বল-প্রতি Parquet ফাইলে (candle_store.write_archive),
+        যাতে রিটেনশন চাঙ্ক ড্রপ করার পরও ব্যাকটেস্ট ইঞ্জিন সেই ইতিহাস লোকালি পায়। আগে এক্সপোর্ট হওয়া চাঙ্ক বাদ।
+        রিটার্ন: এক্সপোর্ট হওয়া চাঙ্ক সংখ্যা
+        """
+        if not self.pool or not self.timescale: return 0
+        if not PARQUET_AVAILABLE:
+            logger.warning("⚠️ pyarrow not installed, cold chunk archive disabled")
+            return 0
+
+        older_than = older_than or settings.CANDLE_COMPRESS_AFTER or "7 days"
+        async with self.acquire() as conn:
+            chunks = await conn.fetch("""
+                SELECT chunk_schema, chunk_name, range_start, range_end
+                FROM timescaledb_information.chunks
+                WHERE hypertable_name = 'market_candles' AND range_end <= now() - $1::text::interval
+                ORDER BY range_start;
+            """, older_than)
+
+        archived = candle_store.archived_chunks()
+        exported = 0
+        for chunk in chunks:
+            if chunk['chunk_name'] in archived:
+                continue
+            async with self.acquire() as conn:
+                rows = await conn.fetch(f'SELECT DISTINCT symbol FROM "{chunk["chunk_schema"]}"."{chunk["chunk_name"]}";')
+            symbols = [row['symbol'] for row in rows]
+            # strict: রিড ব্যর্থ হলে চাঙ্কটি এক্সপোর্টেড চিহ্নিত হয় না, পরের বার আবার চেষ্টা হয়
+            frames = await self._read_windows(
+                "market_candles", "time", CANDLE_FIELDS, symbols, chunk['range_start'], chunk['range_end'], strict=True
+            )
+            start_ms, end_ms = (int(pd.Timestamp(chunk[key]).timestamp() * 1000) for key in ('range_start', 'range_end'))
+            candles = 0
+            for symbol, df in frames.items():
+                candles += await asyncio.to_thread(candle_store.write_archive, symbol, ARCHIVE_TIMEFRAME, start_ms, end_ms, df)
+            candle_store.mark_archived(chunk['chunk_name'])
+            exported += 1
+            logger.info(f"🧊 Archived chunk {chunk['chunk_name']} ({len(symbols)} symbols, {candles} candles)")
+        return exported
+
+    async def run_archive(self):
+        """প্রতি CANDLE_ARCHIVE_INTERVAL_HOURS এ export_cold_chunks (0 হলে বন্ধ); স্টার্টআপেই প্রথমবার চলে"""
+        interval = settings.CANDLE_ARCHIVE_INTERVAL_HOURS * 3600
+        if interval <= 0:
+            return
+        try:
+            while True:
+                try:
+                    await self.export_cold_chunks()
+                except Exception as e:
+                    logger.error(f"❌ Cold Chunk Archive Error: {e}")
+                await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            logger.info("🛑 Candle Archive Stopped.")
+            raise
+
+    async def get_last_candle_time(self, symbol):
+        """সিম্বলের সর্বশেষ সেভ হওয়া ক্যান্ডেলের টাইম (না থাকলে None)"""
+        if not self.pool: return None
+        try:
+            async with self.acquire() as conn:
+                last_time = await self._query(conn, "last_candle_time", "fetchval", LAST_CANDLE_TIME_SQL, symbol)
+                return pd.Timestamp(last_time) if last_time is not None else None
+        except Exception as e:
+            logger.error(f"Fetch Error: {e}")
+            return None
+
     # ==========================================
     # NEW: Trade Persistence Methods
     # ==========================================
     async def save_trade(self, trade_data):
         """নতুন ট্রেড ডাটাবেসে সেভ করা (Atomic Write)"""
-        if not self.pool: return
-        query = """
-            INSERT INTO trade_ledger (order_id, symbol, side, price, amount, status, strategy, timestamp, mode, exchange)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-            ON CONFLICT (order_id) DO NOTHING;
-        """
         try:
             ts = pd.to_datetime(trade_data['timestamp'])
             if ts.tzinfo is None: ts = ts.tz_localize('UTC')
             
-            async with self.pool.acquire() as conn:
-                await conn.execute(query, 
+            async with self.acquire() as conn:
+                await self._query(conn, "save_trade", "execute", SAVE_TRADE_SQL,
                     str(trade_data['id']), 
                     trade_data['symbol'], 
                     trade_data['side'], 
@@ -162,8 +930,8 @@ class Database:
         if not self.pool: return []
         query = "SELECT * FROM trade_ledger WHERE status = 'OPEN' OR status = 'FILLED' OR status = 'FILLED (PAPER)';"
         try:
-            async with self.pool.acquire() as conn:
-                rows = await conn.fetch(query)
+            async with self.acquire() as conn:
+                rows = await self._query(conn, "open_trades", "fetch", query)
                 return [dict(row) for row in rows]
         except Exception as e:
             logger.error(f"❌ Failed to fetch open trades: {e}")
@@ -171,13 +939,76 @@ class Database:
 
     async def update_trade_status(self, order_id, new_status):
         """ট্রেড ক্লোজ হলে স্ট্যাটাস আপডেট করা"""
-        if not self.pool: return
         query = "UPDATE trade_ledger SET status = $1 WHERE order_id = $2;"
         try:
-            async with self.pool.acquire() as conn:
-                await conn.execute(query, new_status, str(order_id))
+            async with self.acquire() as conn:
+                await self._query(conn, "update_trade_status", "execute", query, new_status, str(order_id))
                 logger.info(f"🔄 DB Updated: Order {order_id} -> {new_status}")
         except Exception as e:
             logger.error(f"❌ Failed to update trade status: {e}")
 
+    # ==========================================
+    # Backtest Job Persistence
+    # ==========================================
+    async def save_backtest_job(self, job):
+        """জবের স্ট্যাটাস/ফলাফল আপসার্ট (BacktestJob.record() ফরম্যাট)"""
+        query = """
+            INSERT INTO backtest_jobs (job_id, param_hash, params, status, error, metrics, result, created_at, finished_at)
+            VALUES ($1, $2, $3::jsonb, $4, $5, $6::jsonb, $7::jsonb, $8, $9)
+            ON CONFLICT (job_id) DO UPDATE SET
+                status = EXCLUDED.status,
+                error = EXCLUDED.error,
+                metrics = EXCLUDED.metrics,
+                result = EXCLUDED.result,
+                finished_at = EXCLUDED.finished_at;
+        """
+        try:
+            async with self.acquire() as conn:
+                await self._query(conn, "save_backtest_job", "execute", query,
+                    job['job_id'],
+                    job['param_hash'],
+                    json.dumps(job['params']),
+                    job['status'],
+                    job.get('error'),
+                    json.dumps(job['metrics']) if job.get('metrics') is not None else None,
+                    json.dumps(job['result']) if job.get('result') is not None else None,
+                    job['created_at'],
+                    job.get('finished_at')
+                )
+        except Exception as e:
+            logger.error(f"❌ Failed to Save Backtest Job: {e}")
+
+    def _backtest_row(self, row):
+        record = dict(row)
+        for key in ('params', 'metrics', 'result'):
+            if record.get(key) is not None:
+                record[key] = json.loads(record[key])
+        return record
+
+    async def get_backtest_job(self, job_id):
+        if not self.pool: return None
+        query = "SELECT * FROM backtest_jobs WHERE job_id = $1;"
+        try:
+            async with self.acquire() as conn:
+                row = await self._query(conn, "get_backtest_job", "fetchrow", query, job_id)
+                return self._backtest_row(row) if row else None
+        except Exception as e:
+            logger.error(f"❌ Failed to fetch backtest job: {e}")
+            return None
+
+    async def find_backtest_result(self, param_hash):
+        """একই প্যারামিটারের সর্বশেষ সফল জব (ডুপ্লিকেট রিকোয়েস্টে আবার চালাতে হয় না)"""
+        if not self.pool: return None
+        query = """
+            SELECT * FROM backtest_jobs WHERE param_hash = $1 AND status = 'done'
+            ORDER BY finished_at DESC LIMIT 1;
+        """
+        try:
+            async with self.acquire() as conn:
+                row = await self._query(conn, "find_backtest_result", "fetchrow", query, param_hash)
+                return self._backtest_row(row) if row else None
+        except Exception as e:
+            logger.error(f"❌ Failed to fetch backtest result: {e}")
+            return None
+
 db = Database()
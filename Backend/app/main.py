@@ -1,20 +1,30 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse
 import pandas as pd
 import asyncio
+import json
 import logging
-import ccxt.async_support as ccxt
 
 # সার্ভিস ইমপোর্ট
-from app.services.timeframe_manager import TimeframeManager
-from app.services.technical_indicators import TechnicalIndicators
 from app.services.stream_engine import StreamEngine
+from app.services.market_feed import MarketFeed
+from app.services.feed_codec import ENCODINGS
+from app.services.response_cache import market_status_cache
+from app.services.market_status import render_market_status
+from app.services.compute_executor import compute_executor, loop_lag_monitor
+from app.services.metrics import metrics
 from app.services.strategy_manager import strategy_manager
 from app.services.arbitrage_engine import arbitrage_engine
 from app.services.trade_executor import trade_executor # Executor ইমপোর্ট
 from app.services.backtest_engine import backtest_engine # Backtest Engine
-from app.database import db # DB ইমপোর্ট
-from pydantic import BaseModel
+from app.services.parameter_sweep import parameter_sweep
+from app.services.portfolio_backtest import portfolio_backtest
+from app.services.backtest_jobs import backtest_jobs
+from app.database import db, CANDLE_AGGREGATES # DB ইমপোর্ট
+from app.core.config import settings
+from pydantic import BaseModel, Field
+from typing import Optional, List
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("MainAPI")
@@ -30,44 +40,39 @@ app.add_middleware(
 )
 
 stream_engine = StreamEngine()
-tf_manager = TimeframeManager()
-ti_engine = TechnicalIndicators()
+
+def collect_runtime_metrics():
+    """/metrics গেজ: ইভেন্ট লুপ ল্যাগ, এক্সিকিউটর, ক্যাশ ও ব্যাকটেস্ট জব"""
+    lag = loop_lag_monitor.stats()
+    samples = [
+        ("event_loop_lag_max_seconds", "gauge", "Highest event loop lag seen", {}, lag["max_ms"] / 1000),
+        ("event_loop_stalls_total", "counter", "Event loop lag samples above LOOP_LAG_WARN_MS", {}, lag["stalls"])
+    ]
+    for pool, stats in compute_executor.stats().items():
+        samples.append(("executor_in_flight", "gauge", "Tasks submitted to a compute pool and not finished", {"pool": pool.rstrip("s")}, stats["in_flight"]))
+    cache = market_status_cache.stats()
+    samples += [
+        ("market_status_cache_bytes", "gauge", "Bytes held by the market-status cache", {}, cache["size_bytes"]),
+        ("market_status_cache_hits_total", "counter", "Market-status cache hits", {}, cache["hits"]),
+        ("market_status_cache_misses_total", "counter", "Market-status cache misses", {}, cache["misses"])
+    ]
+    for status, count in backtest_jobs.stats()["jobs"].items():
+        samples.append(("backtest_jobs", "gauge", "Backtest jobs held in memory by status", {"status": status}, count))
+    return samples
+
+metrics.register_collector(stream_engine.collect_metrics)
+metrics.register_collector(collect_runtime_metrics)
+metrics.register_collector(db.collect_metrics)
 
 # ============================================================
-# MARKET LISTENER SERVICE (Optimized)
+# MARKET LISTENER SERVICE (WebSocket Push Feed)
 # ============================================================
 async def start_market_listener():
-    exchange = ccxt.binance({
-        'enableRateLimit': True,
-        'options': {'defaultType': 'future'} 
-    })
-    symbol = "BTC/USDT"
-    logger.info(f"📡 Market Listener Started for {symbol}...")
-
-    try:
-        while True:
-            try:
-                ohlcv = await exchange.fetch_ohlcv(symbol, '1m', limit=1)
-                if ohlcv:
-                    latest_candle = ohlcv[-1]
-                    candle_data = {
-                        'time': latest_candle[0], 'open': latest_candle[1], 
-                        'high': latest_candle[2], 'low': latest_candle[3], 
-                        'close': latest_candle[4], 'volume': latest_candle[5], 
-                        's': symbol
-                    }
-                    await stream_engine.broadcast(candle_data)
-                
-                await asyncio.sleep(1)
-
-            except Exception as inner_e:
-                logger.warning(f"⚠️ Fetch Error: {inner_e}. Retrying...")
-                await asyncio.sleep(5) 
-
-    except asyncio.CancelledError:
-        logger.info("🛑 Market Listener Stopped.")
-    finally:
-        await exchange.close()
+    # এক্সচেঞ্জের kline স্ট্রিম থেকে প্রতিটি আপডেট সরাসরি StreamEngine এ যায় (REST পোলিং নেই)
+    # MARKET_TRADES: aggTrade টিক সরাসরি TradeWriter এ (market_trades, আসল অর্ডার-ফ্লো)
+    trade_handler = stream_engine.trade_writer.add if settings.MARKET_TRADES else None
+    feed = MarketFeed(stream_engine.symbols, stream_engine.broadcast, trade_handler=trade_handler)
+    await feed.run()
 
 # ============================================================
 # LIFECYCLE EVENTS (Startup Logic Updated)
@@ -83,13 +88,25 @@ async def startup_event():
     # এটিই সেই ম্যাজিক লাইন যা রিস্টার্টের পর সব ঠিক করে দিবে
     await trade_executor.sync_positions()
     
-    # ৩. লিসেনার চালু
+    # ৩. সিম্বল স্ট্রিম ও লিসেনার চালু
+    loop_lag_monitor.start()
+    await compute_executor.start()
+    stream_engine.start()
+    backtest_jobs.start()
     asyncio.create_task(start_market_listener())
+    # কোল্ড চাঙ্ক -> Parquet আর্কাইভ (ব্যাকটেস্ট স্টোরের ব্যাকফিল)
+    asyncio.create_task(db.run_archive())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("🌙 System Shutting Down...")
+    await stream_engine.stop()
+    await backtest_jobs.stop()
+    await loop_lag_monitor.stop()
+    compute_executor.shutdown()
     await trade_executor.close_connections()
+    # রাইটার ফ্লাশ ও জব সেভ শেষ হওয়ার পর পুল বন্ধ
+    await db.close()
 
 # ============================================================
 # API ENDPOINTS
@@ -99,36 +116,66 @@ def read_root():
     return {"status": "active", "system": "Metron AI Protected", "positions": len(trade_executor.positions)}
 
 @app.get("/api/v1/market-status")
-async def get_market_status(timeframe: str = Query("1H")):
+async def get_market_status(timeframe: str = Query("1H"), symbol: str = Query("BTC/USDT")):
     try:
-        # রিয়েল ডাটাবেস কানেকশন (Mock ডাটা সরানো হয়েছে)
-        raw_df = await db.get_recent_candles("BTC/USDT", limit=300)
-        
-        if raw_df.empty:
+        # ক্যাশ কী: (সিম্বল, টাইমফ্রেম, শেষ ক্লোজড বার) — নতুন বার না আসা পর্যন্ত একই রেসপন্স
+        last_bar = stream_engine.last_closed_bar(symbol)
+        if last_bar is None:
+            last_bar = await db.get_last_candle_time(symbol)
+        if last_bar is None:
              return {"status": "waiting", "message": "Data syncing..."}
 
-        tf_map = {"1H": "1h", "4H": "4h", "15m": "15T", "1D": "1D"}
-        target_tf = tf_map.get(timeframe, "1h")
-        
-        resampled_df = tf_manager.prepare_and_resample(raw_df, target_tf)
-        final_df = ti_engine.apply_all_indicators(resampled_df)
-        
-        records = final_df.reset_index().to_dict(orient='records')
-        clean_records = [{k: (v if pd.notna(v) else None) for k, v in rec.items()} for rec in records]
-        
-        current_phase = final_df.iloc[-1].get('market_phase', 'Unknown') if not final_df.empty else "Unknown"
-
-        return {
-            "status": "success",
-            "timeframe": timeframe,
-            "current_phase": current_phase,
-            "data": clean_records
-        }
+        payload = await market_status_cache.get_or_compute(
+            (symbol, timeframe, last_bar),
+            lambda: build_market_status(symbol, timeframe)
+        )
+        if payload is None:
+             return {"status": "waiting", "message": "Data syncing..."}
+
+        return Response(content=payload, media_type="application/json")
 
     except Exception as e:
         logger.error(f"API Error: {e}")
         return {"status": "error", "message": str(e)}
 
+async def build_market_status(symbol, timeframe):
+    """DB -> রিস্যাম্পল -> ইন্ডিকেটর -> সিরিয়ালাইজড JSON (bytes); ডাটা না থাকলে None"""
+    # উচ্চ টাইমফ্রেম সরাসরি continuous aggregate থেকে (ইনডেক্স লুকআপ, রিস্যাম্পল নেই)
+    bars_df = await db.get_aggregated_candles(symbol, timeframe, limit=settings.MARKET_STATUS_BARS)
+    if bars_df is not None:
+        if bars_df.empty:
+            return None
+        # একই বাকেটে market_trades এর আসল অর্ডার-ফ্লো (ট্রেড না থাকলে খালি, তখন ক্যান্ডেল রঙের আনুমানিক ভ্যালু)
+        flow = None
+        if settings.MARKET_TRADES:
+            flow = await db.get_trade_flow(symbol, CANDLE_AGGREGATES[timeframe][1], start=bars_df.index[0])
+        return await compute_executor.run_in_process(render_market_status, bars_df, symbol, timeframe, True, flow)
+
+    # ফলব্যাক (TimescaleDB/aggregate নেই): ১ মিনিট ডাটা এনে ইন-প্রসেস রিস্যাম্পল
+    raw_df = await db.get_recent_candles(symbol, limit=300)
+    
+    if raw_df.empty:
+        return None
+    flow = await db.get_trade_flow(symbol, "1 minute", start=raw_df.index[0]) if settings.MARKET_TRADES else None
+
+    # CPU-ভারী অংশ প্রসেস পুলে, ইভেন্ট লুপ ফ্রি থাকে
+    return await compute_executor.run_in_process(render_market_status, raw_df, symbol, timeframe, False, flow)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition (latency summaries, queue depths, event loop lag)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/v1/pipeline-stats")
+async def get_pipeline_stats():
+    """স্ট্রিম পাইপলাইনের প্রতিটি স্টেজের কিউ ডেপথ ও ব্যাকপ্রেশার মেট্রিক + ইভেন্ট লুপ ল্যাগ ও এক্সিকিউটর"""
+    return {
+        **stream_engine.get_pipeline_stats(),
+        "event_loop": loop_lag_monitor.stats(),
+        "compute": compute_executor.stats(),
+        "database": db.stats()
+    }
+
 @app.get("/api/strategy")
 async def get_strategy_config():
     return {
@@ -158,35 +205,180 @@ class BacktestRequest(BaseModel):
     exchange: str = "binance"
     symbol: str = "BTC/USDT"
     timeframe: str = "1h"
-    limit: int = 1000
+    # ক্লায়েন্টের limit ডাউনলোড ও ডিস্ক রাইটের গভীরতা ঠিক করে, তাই সীমিত
+    limit: int = Field(1000, ge=50, le=settings.BACKTEST_MAX_BARS)
     strategy: str = "MACD_RSI_VWAP"
     initial_balance: float = 1000.0
 
+def backtest_params(request: BacktestRequest):
+    return {
+        "exchange": request.exchange,
+        "symbol": request.symbol,
+        "timeframe": request.timeframe,
+        "limit": request.limit,
+        "strategy_mode": request.strategy,
+        "initial_balance": request.initial_balance
+    }
+
 @app.post("/api/backtest")
 async def run_backtest(request: BacktestRequest):
     """
     Run a simulation backtest.
+    Runs as a job in a worker process and waits for the result (same response as before).
     """
     try:
-        result = await backtest_engine.run_backtest(
-            exchange=request.exchange,
-            symbol=request.symbol,
-            timeframe=request.timeframe,
-            limit=request.limit,
-            strategy_mode=request.strategy,
-            initial_balance=request.initial_balance
-        )
-        return result
+        job = await backtest_jobs.submit(backtest_params(request))
+        return await job.wait()
     except Exception as e:
         logger.error(f"Backtest Error: {e}")
         return {"status": "error", "message": str(e)}
 
+@app.post("/api/backtest/jobs")
+async def submit_backtest_job(request: BacktestRequest):
+    """Queue a backtest and return its job ID immediately (identical requests share one job)."""
+    try:
+        job = await backtest_jobs.submit(backtest_params(request))
+        return job.snapshot()
+    except Exception as e:
+        logger.error(f"Backtest Job Error: {e}")
+        return {"status": "error", "message": str(e)}
+
+@app.get("/api/backtest/jobs/{job_id}")
+async def get_backtest_job(job_id: str):
+    """Job status and progress; includes the full result once done."""
+    job = await backtest_jobs.get(job_id)
+    if job is None:
+        return {"status": "error", "message": "Job not found"}
+    return job.snapshot(include_result=True)
+
+@app.get("/api/backtest/jobs/{job_id}/events")
+async def stream_backtest_job(job_id: str):
+    """Streams NDJSON status snapshots until the job finishes."""
+    job = await backtest_jobs.get(job_id)
+    if job is None:
+        return {"status": "error", "message": "Job not found"}
+
+    async def event_stream():
+        async for snapshot in job.watch():
+            yield json.dumps(snapshot) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@app.delete("/api/backtest/jobs/{job_id}")
+async def cancel_backtest_job(job_id: str):
+    job = await backtest_jobs.cancel(job_id)
+    if job is None:
+        return {"status": "error", "message": "Job not found"}
+    return job.snapshot()
+
+class SweepRequest(BacktestRequest):
+    # গ্রিড: {"take_profit": [1.5, 2.0, 3.0], "stop_loss": [-0.5, -1.0]}
+    grid: Optional[dict] = None
+    # র‍্যান্ডম সার্চ: {"take_profit": [0.5, 5.0], "min_score": {"choices": [2, 3, 4]}}
+    search_space: Optional[dict] = None
+    samples: int = 50
+    seed: Optional[int] = None
+    rank_by: str = "sharpe_ratio"
+    top: int = 10
+
+@app.post("/api/backtest/sweep")
+async def run_parameter_sweep(request: SweepRequest):
+    """
+    Parameter sweep (grid / random search). Streams NDJSON events:
+    started -> progress (per config) -> result (ranked by calculate_metrics).
+    """
+    try:
+        if request.grid:
+            configs = parameter_sweep.grid_configs(request.grid)
+        elif request.search_space:
+            configs = parameter_sweep.random_configs(request.search_space, request.samples, request.seed)
+        else:
+            return {"status": "error", "message": "grid or search_space required"}
+
+        df_analyzed = await backtest_engine.prepare_data(request.exchange, request.symbol, request.timeframe, request.limit)
+        if df_analyzed is None:
+            return {"status": "error", "message": "Failed to fetch data"}
+    except Exception as e:
+        logger.error(f"Sweep Error: {e}")
+        return {"status": "error", "message": str(e)}
+
+    async def event_stream():
+        try:
+            async for event in parameter_sweep.run(
+                df_analyzed, configs, request.strategy, request.initial_balance, request.rank_by, request.top
+            ):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Sweep Error: {e}")
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+class PortfolioRequest(BacktestRequest):
+    symbols: List[str]
+    fee_percent: float = 0.1
+    slippage_percent: float = 0.0
+    position_size: float = 0.95
+    # একসাথে সর্বোচ্চ খোলা পজিশন (0 = সিম্বল সংখ্যা)
+    max_positions: int = 0
+    # ওয়াক-ফরওয়ার্ড: {"train_bars": 1000, "test_bars": 250, "step": 250}
+    walk_forward: Optional[dict] = None
+    # ট্রেইন উইন্ডোর গ্রিড: {"take_profit": [1.5, 2.0], "min_score": [2, 3]}
+    grid: Optional[dict] = None
+    rank_by: str = "sharpe_ratio"
+
+@app.post("/api/backtest/portfolio")
+async def run_portfolio_backtest(request: PortfolioRequest):
+    """
+    Multi-symbol portfolio backtest with a shared balance and optional walk-forward windows.
+    Streams NDJSON events: started -> progress (per shard) -> result (portfolio equity curve + metrics).
+    """
+    try:
+        configs = parameter_sweep.grid_configs(request.grid) if request.grid else []
+        symbols = list(dict.fromkeys(request.symbols))
+        if not symbols or len(symbols) > settings.PORTFOLIO_MAX_SYMBOLS:
+            return {"status": "error", "message": f"symbols must contain 1-{settings.PORTFOLIO_MAX_SYMBOLS} entries"}
+        # ডাটা আনার আগেই ভুল উইন্ডো সেটিংস বাতিল
+        if request.walk_forward:
+            portfolio_backtest.walk_forward_settings(request.walk_forward)
+
+        # প্রতি সিম্বলের ডাউনলোড CandleStore এর এক্সচেঞ্জ-প্রতি সেমাফোর দিয়ে সীমিত
+        frames = await asyncio.gather(*[
+            backtest_engine.fetch_historical_data(request.exchange, symbol, request.timeframe, request.limit)
+            for symbol in symbols
+        ])
+        data = {symbol: df for symbol, df in zip(symbols, frames) if df is not None}
+        if not data:
+            return {"status": "error", "message": "Failed to fetch data"}
+    except Exception as e:
+        logger.error(f"Portfolio Backtest Error: {e}")
+        return {"status": "error", "message": str(e)}
+
+    async def event_stream():
+        try:
+            async for event in portfolio_backtest.run(
+                data, request.strategy, request.initial_balance, request.fee_percent, request.slippage_percent,
+                request.position_size, request.max_positions, request.walk_forward, configs, request.rank_by
+            ):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Portfolio Backtest Error: {e}")
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @app.websocket("/ws/feed")
-async def websocket_endpoint(websocket: WebSocket):
-    await stream_engine.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, symbols: str = Query(None), encoding: str = Query("json"), delta: bool = Query(False)):
+    # ?symbols=BTC/USDT,ETH/USDT দিলে শুধু সেগুলোর আপডেট যাবে, না দিলে সব সিম্বল
+    # ?encoding=binary&delta=true দিলে কমপ্যাক্ট বাইনারি ফ্রেম ও ডেল্টা আপডেট (ডিফল্ট পুরো JSON)
+    subscribed = [s.strip() for s in symbols.split(",") if s.strip()] if symbols else None
+    if encoding not in ENCODINGS:
+        encoding = "json"
+    await stream_engine.connect(websocket, subscribed, encoding=encoding, delta=delta)
     try:
         while True:
-            await websocket.receive_text()
+            text = await websocket.receive_text()
+            stream_engine.handle_client_message(websocket, text)
     except WebSocketDisconnect:
         stream_engine.disconnect(websocket)
     except Exception as e:
@@ -1,5 +1,5 @@
+import numpy as np
 import pandas as pd
-import ccxt.async_support as ccxt
 import time
 import os
 import asyncio
@@ -7,41 +7,32 @@ from datetime import datetime
 from app.services.technical_indicators import technical_indicators
 from app.services.signal_engine import signal_engine
 from app.services.strategy_manager import strategy_manager
+from app.services.candle_store import candle_store
+from app.services.compute_executor import compute_executor
 from app.core.config import settings
 
 class BacktestEngine:
-    def __init__(self):
-        # Reports ডিরেক্টরি তৈরি
-        self.report_dir = "Reports"
-        if not os.path.exists(self.report_dir):
-            os.makedirs(self.report_dir)
-
-    async def fetch_historical_data(self, exchange_name, symbol, timeframe, limit=1000):
-        """CCXT দিয়ে ঐতিহাসিক ডাটা ফেচ করে"""
-        exchange_class = getattr(ccxt, exchange_name)()
+    # _signal_arrays যে ইন্ডিকেটর কলাম পড়ে; বাকি ইন্ডিকেটর ব্যাকটেস্টে হিসাব হয় না
+    SIGNAL_FEATURES = ("EMA_20", "RSI_14", "MACD_12_26_9", "MACDs_12_26_9")
+
+    async def fetch_historical_data(self, exchange_name, symbol, timeframe, limit=1000, start=None, end=None):
+        """
+        লোকাল ক্যান্ডেল স্টোর থেকে ঐতিহাসিক ডাটা (শুধু মিসিং রেঞ্জ এক্সচেঞ্জ থেকে ডাউনলোড হয়)।
+        start/end (ms) দিলে সেই [start, end) রেঞ্জ, না দিলে শেষ `limit` টি ক্লোজড ক্যান্ডেল।
+        """
         try:
-            # এক্সচেঞ্জ কনফিগারেশন (Public Data এর জন্য API Key দরকার নেই, তবে থাকলে ভালো)
-            if exchange_name == 'binance':
-                exchange_class = ccxt.binance({'enableRateLimit': True, 'options': {'defaultType': 'future'}})
-            
-            print(f"⏳ Fetching {limit} candles for {symbol} ({timeframe}) from {exchange_name}...")
-            # CCXT fetch_ohlcv
-            ohlcv = await exchange_class.fetch_ohlcv(symbol, timeframe, limit=limit)
-            
-            if not ohlcv or len(ohlcv) < 50:
+            print(f"⏳ Loading {limit} candles for {symbol} ({timeframe}) from {exchange_name} (local store)...")
+            df = await candle_store.get_candles(exchange_name, symbol, timeframe, limit=limit, start_ms=start, end_ms=end)
+
+            if df is None or len(df) < 50:
                 print("❌ Not enough data fetched.")
                 return None
 
-            # DataFrame তৈরি
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
             return df
-        
+
         except Exception as e:
             print(f"❌ Error fetching data: {e}")
             return None
-        finally:
-            await exchange_class.close()
 
     def calculate_metrics(self, trades, initial_balance, final_balance, equity_curve):
         """Advanced Metrics Calculation"""
@@ -93,135 +84,203 @@ class BacktestEngine:
             "final_balance": round(float(final_balance), 2)
         }
 
-    async def run_backtest(self, exchange, symbol, timeframe, limit, strategy_mode, initial_balance=1000, fee_percent=0.1, slippage_percent=0.0):
+    # ============================================================
+    # সিমুলেশন কোর
+    # ============================================================
+    def _signal_arrays(self, df_analyzed):
+        """
+        প্রতি ক্যান্ডেলের স্কোর, এন্ট্রি ও সেল সিগন্যাল NumPy অ্যারে হিসেবে একবারে হিসাব।
+        কলাম না থাকলে লুপের current_candle.get(col, default) এর মতো একই ডিফল্ট ব্যবহার হয়।
+        """
+        n = len(df_analyzed)
+
+        def column(name, default):
+            if name in df_analyzed.columns:
+                return df_analyzed[name].to_numpy()
+            return np.full(n, default)
+
+        close = df_analyzed['close'].to_numpy(dtype='float64')
+
+        # --- SIGNAL MOCKING (Strategy Logic) --- (লুপের লজিকের হুবহু ভেক্টর রূপ)
+        score = (close > column('EMA_20', 0)).astype('int64')
+        score += 2 * (column('RSI_14', 50) < 30)
+        score += column('MACD_12_26_9', 0) > column('MACDs_12_26_9', 0)
+        score += close > column('VWAP', 0)
+
+        phase = column('Market_Phase', 'Consolidation')
+
+        # সিদ্ধান্ত শুধু (score, phase) এর ওপর নির্ভর করে, তাই প্রতিটি ইউনিক জোড়ার জন্য একবারই কল
+        entry_signal = np.zeros(n, dtype=bool)
+        pairs = pd.DataFrame({'score': score, 'phase': phase})
+        for (pair_score, pair_phase), rows in pairs.groupby(['score', 'phase'], sort=False).indices.items():
+            mock_result = {"score": pair_score, "verdict": "BUY" if pair_score > 0 else "SELL"}
+            decision = strategy_manager.get_strategy_decision(mock_result, pair_phase)
+            if decision['should_trade'] and decision['final_verdict'] in ["BUY", "STRONG BUY"]:
+                entry_signal[rows] = True
+
+        return {
+            "close": close,
+            "timestamp": df_analyzed['timestamp'].to_numpy(),
+            "score": score,
+            "entry_signal": entry_signal
+        }
+
+    def simulate(self, df_analyzed, strategy_mode, initial_balance=1000, fee_percent=0.1, slippage_percent=0.0, start=50,
+                 take_profit=2.0, stop_loss=-1.0, sell_score=-2, min_score=None, position_size=0.95, signals=None):
+        """
+        ভেক্টরাইজড সিমুলেশন: সিগন্যাল অ্যারে একবারে হিসাব করে পজিশন স্টেট মেশিন শুধু ট্রেড ইভেন্টে চলে।
+        ফ্ল্যাট থাকলে পরের এন্ট্রি searchsorted দিয়ে, পজিশনে থাকলে প্রথম SL/TP/সেল বার অ্যারে স্ক্যানে খোঁজা হয়।
+        ডিফল্ট প্যারামিটারে পুরনো বার-বাই-বার লুপের সাথে হুবহু একই ট্রেড, ফি, স্লিপেজ ও ইকুইটি কার্ভ দেয় (tests/test_backtest_parity.py)।
+
+        take_profit / stop_loss: raw PnL% এক্সিট সীমা, sell_score: এর সমান বা কম স্কোরে সেল,
+        min_score: দিলে ফেজ-ভিত্তিক সিদ্ধান্তের বদলে score >= min_score এ এন্ট্রি,
+        signals: আগে থেকে হিসাব করা _signal_arrays() (প্যারামিটার সুইপে একবারই হিসাব হয়)।
+        রিটার্ন: (trades, final_balance, equity_curve)
+        """
+        if signals is None:
+            signals = self._signal_arrays(df_analyzed)
+        close = signals['close']
+        score = signals['score']
+        sell_signal = score <= sell_score
+        if min_score is None:
+            entry_signal = signals['entry_signal']
+        else:
+            entry_signal = (score >= min_score) & (score > 0)
+        timestamps = signals['timestamp']
+        datetimes = df_analyzed['datetime']
+        n = len(close)
+
+        trades = []
+        balance = initial_balance
+        equity_curve = [{"time": df_analyzed['timestamp'].iloc[0], "balance": balance}]
+        if n <= start:
+            return trades, balance, equity_curve
+
+        # প্রতি বারের শেষে ক্যাশ ব্যালেন্স, পজিশন আছে কিনা ও তার amount (ইকুইটি = balance + amount * close)
+        bar_balance = np.empty(n - start)
+        bar_amount = np.zeros(n - start)
+        bar_in_position = np.zeros(n - start, dtype=bool)
+
+        entry_bars = np.flatnonzero(entry_signal)
+        i = start
+        while i < n:
+            # ENTRY CHECK: i বা তার পরের প্রথম এন্ট্রি বার
+            k = np.searchsorted(entry_bars, i)
+            if k == len(entry_bars):
+                bar_balance[i - start:] = balance
+                break
+            j = int(entry_bars[k])
+            bar_balance[i - start:j - start] = balance
+
+            price = close[j]
+            entry_price = price * (1 + slippage_percent/100)
+            usable_balance = balance * position_size # ডিফল্ট: রিস্ক ম্যানেজমেন্টের জন্য ৫% বাফার
+            fee = usable_balance * (fee_percent/100)
+            net_investment = usable_balance - fee
+            amount = net_investment / entry_price
+            entry_fee = fee
+            entry_time = str(datetimes.iloc[j])
+            balance -= usable_balance
+
+            bar_balance[j - start] = balance
+            bar_amount[j - start] = amount
+            bar_in_position[j - start] = True
+
+            # EXIT CHECK: এন্ট্রির পরের বার থেকে প্রথম সেল সিগন্যাল অথবা SL/TP
+            exit_bar, raw_pnl_pct = self._find_exit(close, sell_signal, j + 1, amount, entry_price, take_profit, stop_loss)
+            if exit_bar is None:
+                bar_balance[j + 1 - start:] = balance
+                bar_amount[j + 1 - start:] = amount
+                bar_in_position[j + 1 - start:] = True
+                break
+
+            bar_balance[j + 1 - start:exit_bar - start] = balance
+            bar_amount[j + 1 - start:exit_bar - start] = amount
+            bar_in_position[j + 1 - start:exit_bar - start] = True
+
+            price = close[exit_bar]
+            exit_price = price * (1 - slippage_percent/100)
+            gross_return = amount * exit_price
+            exit_fee = gross_return * (fee_percent/100)
+            net_return = gross_return - exit_fee
+            balance += net_return
+            total_fee = entry_fee + exit_fee
+            net_profit = net_return - (amount * entry_price) - entry_fee
+
+            trades.append({
+                "entry_time": entry_time,
+                "exit_time": str(datetimes.iloc[exit_bar]),
+                "entry_price": entry_price,
+                "exit_price": exit_price,
+                "profit_usdt": net_profit,
+                "profit_pct": raw_pnl_pct,
+                "fees_paid": total_fee,
+                "strategy": strategy_mode
+            })
+
+            bar_balance[exit_bar - start] = balance
+            i = exit_bar + 1
+
+        # --- EQUITY CURVE --- (লুপের round(balance + amount * price, 2) এর সাথে বিট-বাই-বিট মেলাতে পাইথন round)
+        equity = np.where(bar_in_position, bar_balance + bar_amount * close[start:], bar_balance)
+        equity_curve.extend(
+            {"time": int(t), "balance": round(e, 2)}
+            for t, e in zip(timestamps[start:].tolist(), equity.tolist())
+        )
+        return trades, balance, equity_curve
+
+    def _find_exit(self, close, sell_signal, begin, amount, entry_price, take_profit=2.0, stop_loss=-1.0, chunk=256):
+        """begin থেকে প্রথম এক্সিট বার ও সেই বারের raw PnL%; না পেলে (None, None)। বড় ডাটায় ছোট থেকে বড় চাংকে স্ক্যান।"""
+        n = len(close)
+        entry_val = amount * entry_price
+        while begin < n:
+            end = min(begin + chunk, n)
+            current_value = amount * close[begin:end]
+            raw_pnl_pct = (current_value - entry_val) / entry_val * 100
+            hits = np.flatnonzero(sell_signal[begin:end] | (raw_pnl_pct > take_profit) | (raw_pnl_pct < stop_loss))
+            if len(hits):
+                return begin + int(hits[0]), raw_pnl_pct[hits[0]]
+            begin = end
+            chunk *= 2
+        return None, None
+
+    async def prepare_data(self, exchange, symbol, timeframe, limit):
+        """ঐতিহাসিক ডাটা ফেচ + ইন্ডিকেটর (সিমুলেশনের ইনপুট); ডাটা না পেলে None"""
+        df = await self.fetch_historical_data(exchange, symbol, timeframe, limit)
+        if df is None:
+            return None
+
+        print(f"⚙️ Calculating Indicators for {symbol}...")
+        # রিকোয়েস্ট হ্যান্ডলার থেকে ডাকা হয়, তাই ইন্ডিকেটর প্রসেস পুলে (ফ্রেমটি এই কলের নিজস্ব)
+        return await compute_executor.indicators(df, self.SIGNAL_FEATURES, owned=True)
+
+    async def run_backtest(self, exchange, symbol, timeframe, limit, strategy_mode, initial_balance=1000, fee_percent=0.1, slippage_percent=0.0, progress=None):
         """
         Main Backtest Loop with Advanced Features
+        progress: ঐচ্ছিক callback(stage, fraction), জব কিউ এটি দিয়ে অগ্রগতি রিপোর্ট করে
         """
-        # ১. ডাটা আনা
+        report = progress or (lambda stage, fraction: None)
+
+        # ১+২. ডাটা আনা ও টেকনিক্যাল ইন্ডিকেটর ক্যালকুলেশন
+        report("fetching", 0.1)
         df = await self.fetch_historical_data(exchange, symbol, timeframe, limit)
         if df is None:
             return {"status": "error", "message": "Failed to fetch data"}
 
-        # ২. টেকনিক্যাল ইন্ডিকেটর ক্যালকুলেশন
+        report("indicators", 0.3)
         print(f"⚙️ Calculating Indicators for {symbol}...")
-        df_analyzed = technical_indicators.apply_all_indicators(df)
-        
-        # ৩. সিমুলেশন লুপ ভেরিয়েবল
-        trades = []
-        balance = initial_balance
-        equity_curve = [{"time": df_analyzed.iloc[0]['timestamp'], "balance": balance}]
-        
-        position = None # { "entry_price": 100, "amount": 10, "type": "BUY" }
+        df_analyzed = technical_indicators.apply_indicators(df, self.SIGNAL_FEATURES)
         
+        # ৩. ভেক্টরাইজড সিমুলেশন
+        report("simulating", 0.7)
         print(f"🚀 Running Simulation: Modes={strategy_mode} | Fee={fee_percent}% | Slippage={slippage_percent}%")
-        
-        # ৫০তম ক্যান্ডেল থেকে শুরু (Indicator Warmup)
-        for i in range(50, len(df_analyzed)):
-            current_candle = df_analyzed.iloc[i]
-            price = current_candle['close']
-            timestamp = current_candle['datetime'] # Timestamp অবজেক্ট
-            ts_str = str(timestamp)
-            
-            # --- SIGNAL MOCKING (Strategy Logic) ---
-            # রিয়েল টাইম Signal Engine এর লজিক এখানে ইমুলেট করা হচ্ছে
-            score = 0
-            # Simple Logic for Demonstration (Replace with rigorous Signal Engine calls if needed)
-            if current_candle['close'] > current_candle.get('EMA_20', 0): score += 1
-            if current_candle.get('RSI_14', 50) < 30: score += 2 # Oversold Buy
-            if current_candle.get('MACD_12_26_9', 0) > current_candle.get('MACDs_12_26_9', 0): score += 1
-            if current_candle['close'] > current_candle.get('VWAP', 0): score += 1
-            
-            # Phase Detection
-            phase = current_candle.get('Market_Phase', 'Consolidation')
-            
-            mock_result = {"score": score, "verdict": "BUY" if score > 0 else "SELL"}
-            decision = strategy_manager.get_strategy_decision(mock_result, phase)
-            
-            # --- TRADE EXECUTION ---
-            if position is None:
-                # ENTRY CHECK
-                if decision['should_trade'] and decision['final_verdict'] in ["BUY", "STRONG BUY"]:
-                    # Slippage Apply
-                    entry_price = price * (1 + slippage_percent/100)
-                    
-                    # Fee Calculation (Entry)
-                    usable_balance = balance * 0.95 # রিস্ক ম্যানেজমেন্টের জন্য ৫% বাফার
-                    fee = usable_balance * (fee_percent/100)
-                    net_investment = usable_balance - fee
-                    
-                    amount = net_investment / entry_price
-                    
-                    position = {
-                        "entry_price": entry_price, 
-                        "amount": amount, 
-                        "entry_time": ts_str,
-                        "entry_fee": fee
-                    }
-                    balance -= usable_balance # ব্যালেন্স থেকে টাকা পজিশনে গেল
-                    # Equity stays same at entry moment roughly, but fees deducted
-                    # print(f"🟢 BUY at {entry_price:.2f}")
-
-            else:
-                # EXIT CHECK
-                current_value = position['amount'] * price
-                entry_val = position['amount'] * position['entry_price']
-                raw_pnl_pct = (current_value - entry_val) / entry_val * 100
-                
-                # Sell Signal or SL/TP
-                is_sell_signal = score <= -2
-                
-                if is_sell_signal or raw_pnl_pct > 2.0 or raw_pnl_pct < -1.0:
-                    # Slippage on Exit
-                    exit_price = price * (1 - slippage_percent/100)
-                    
-                    gross_return = position['amount'] * exit_price
-                    exit_fee = gross_return * (fee_percent/100)
-                    net_return = gross_return - exit_fee
-                    
-                    # ক্যাশ ব্যাক পাওয়া গেল
-                    balance += net_return # অবশিষ্ট ক্যাশের সাথে যোগ
-                    
-                    # Profit Calc
-                    total_fee = position['entry_fee'] + exit_fee
-                    net_profit = net_return - (position['amount'] * position['entry_price']) - position['entry_fee'] # Actually balance change is exact profit
-                    
-                    # Accurate Balance Delta Check:
-                    # Old Balance (before Buy) -> New Balance (after Sell)
-                    # Profit = New Balance - Old Balance
-                    
-                    trades.append({
-                        "entry_time": position['entry_time'],
-                        "exit_time": ts_str,
-                        "entry_price": position['entry_price'],
-                        "exit_price": exit_price,
-                        "profit_usdt": net_profit, # This might be slight approx, better to diff balance
-                        "profit_pct": raw_pnl_pct, # Raw Price move
-                        "fees_paid": total_fee,
-                        "strategy": strategy_mode
-                    })
-                    
-                    # print(f"🔴 SELL at {exit_price:.2f} | PnL: {net_profit:.2f}")
-                    position = None
-
-            # --- EQUITY CURVE UPDATE ---
-            # প্রতি ক্যান্ডেলে বর্তমান পোর্টফোলিও ভ্যালু
-            current_equity = balance
-            if position:
-                # যদি পজিশন থাকে, তার বর্তমান ভ্যালু যোগ হবে
-                current_equity += (position['amount'] * price)
-            
-            equity_curve.append({
-                "time": int(current_candle['timestamp']), # JS এর জন্য মিলিসেকেন্ড
-                "balance": round(current_equity, 2)
-            })
+        trades, balance, equity_curve = self.simulate(
+            df_analyzed, strategy_mode, initial_balance, fee_percent, slippage_percent
+        )
 
-        # ৪. ক্যালকুলেশন এবং রেসপন্স
+        # ৪. ক্যালকুলেশন এবং রেসপন্স (ফলাফল জব কিউ TimescaleDB তে সেভ করে)
+        report("metrics", 0.9)
         metrics = self.calculate_metrics(trades, initial_balance, balance, equity_curve)
-        
-        # ৫. ফাইল সেভ (ঐচ্ছিক, ডিবাগিংয়ের জন্য)
-        if trades:
-            filename = f"{self.report_dir}/Sim_{symbol.replace('/','-')}_{timeframe}.csv"
-            pd.DataFrame(trades).to_csv(filename, index=False)
 
         # Sanitizing Data for JSON serialization (fixing numpy errors)
         candles_df = df_analyzed[['timestamp', 'open', 'high', 'low', 'close']].tail(500).copy()
@@ -0,0 +1,356 @@
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.database import db
+from app.services.candle_store import candle_store
+
+logger = logging.getLogger("BacktestJobs")
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+TERMINAL = (DONE, FAILED, CANCELLED)
+
+# চাইল্ড প্রসেসের পাইপ কত ঘন ঘন দেখা হবে (সেকেন্ড)
+POLL_INTERVAL_SEC = 0.25
+
+
+# ============================================================
+# ওয়ার্কার প্রসেস
+# ============================================================
+def _job_process(conn):
+    """
+    লং-লিভড ওয়ার্কার প্রসেস: import একবারই হয়, তারপর পাইপ থেকে একের পর এক জব নেয় (None = থামো)।
+    প্রতিটি জবে পুরো ব্যাকটেস্ট (ডাটা + ইন্ডিকেটর + সিমুলেশন); অগ্রগতি ও ফলাফল একই পাইপে ফেরত যায়।
+    """
+    from app.services.backtest_engine import backtest_engine
+
+    def progress(stage, fraction):
+        conn.send(("progress", stage, fraction))
+
+    # একটাই ইভেন্ট লুপ, যাতে candle_store এর lock/semaphore জবগুলোর মধ্যে বৈধ থাকে
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        while True:
+            try:
+                params = conn.recv()
+            except (EOFError, OSError):
+                break
+            if params is None:
+                break
+            try:
+                result = loop.run_until_complete(backtest_engine.run_backtest(**params, progress=progress))
+                conn.send(("result", result))
+            except Exception as e:
+                conn.send(("error", str(e)))
+    finally:
+        loop.close()
+        conn.close()
+
+
+class BacktestJob:
+    def __init__(self, params, param_hash):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.param_hash = param_hash
+        self.status = QUEUED
+        self.stage = None
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now(tz=timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+        self.process = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self):
+        return self.status in TERMINAL
+
+    def update(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        # অপেক্ষমাণ সবাইকে জাগিয়ে নতুন ইভেন্ট (একাধিক আপডেট একটিতে মিশে যেতে পারে)
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self):
+        while not self.done:
+            await self._changed.wait()
+        return self.response()
+
+    async def watch(self):
+        """স্ট্যাটাস স্ট্রিম: প্রতিটি পরিবর্তনে snapshot, জব শেষ হলে থামে"""
+        while True:
+            changed = self._changed
+            yield self.snapshot()
+            if self.done:
+                return
+            await changed.wait()
+
+    def response(self):
+        """POST /api/backtest এর আগের রেসপন্স ফরম্যাট"""
+        if self.status == DONE:
+            return self.result
+        return {"status": "error", "message": self.error or self.status}
+
+    def snapshot(self, include_result=False):
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "params": self.params,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+        if self.status == DONE:
+            data["metrics"] = (self.result or {}).get("metrics")
+            if include_result:
+                data["result"] = self.result
+        return data
+
+    def record(self):
+        """database.save_backtest_job এর ফরম্যাট"""
+        return {
+            "job_id": self.id,
+            "param_hash": self.param_hash,
+            "params": self.params,
+            "status": self.status,
+            "error": self.error,
+            "metrics": (self.result or {}).get("metrics") if self.status == DONE else None,
+            "result": self.result if self.status == DONE else None,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        job = cls(record['params'], record['param_hash'])
+        job.id = record['job_id']
+        job.status = record['status']
+        job.progress = 1.0 if job.status == DONE else 0.0
+        job.result = record.get('result')
+        job.error = record.get('error')
+        job.created_at = record['created_at']
+        job.finished_at = record.get('finished_at')
+        return job
+
+
+class BacktestJobQueue:
+    """
+    ব্যাকটেস্ট জব কিউ: জবগুলো আলাদা (spawn) প্রসেসে চলে, তাই ইভেন্ট লুপ (/ws/feed, মার্কেট লিসেনার) ফ্রি থাকে।
+
+    - `max_workers` টি লং-লিভড ওয়ার্কার প্রসেস start() এ আগেই চালু হয় (import খরচ প্রতি জবে নয়), বাকি জব FIFO কিউতে অপেক্ষা করে
+    - জব ও অগ্রগতি পাইপে আসা-যাওয়া করে; cancel() কিউতে থাকলে বাদ দেয়, চলমান হলে সেই প্রসেস terminate করে নতুন একটি চালু করে
+    - ডুপ্লিকেট: প্যারামিটার + শেষ ক্লোজড বারের হ্যাশ; একই হ্যাশের চলমান/সম্পন্ন জব (মেমরি বা DB) থাকলে সেটিই ফেরত
+    - শেষ স্ট্যাটাস ও ফলাফল TimescaleDB এর backtest_jobs টেবিলে সেভ হয়
+    """
+    def __init__(self, max_workers=None, history=None):
+        self.max_workers = max_workers or settings.BACKTEST_JOB_WORKERS
+        self.history = history or settings.BACKTEST_JOB_HISTORY
+        self.jobs = OrderedDict()
+        self.by_hash = {}
+        self.queue = None
+        self.workers = []
+        self.processes = []
+
+    # ============================================================
+    # লাইফসাইকেল
+    # ============================================================
+    def start(self):
+        if self.workers:
+            return
+        self.queue = asyncio.Queue()
+        self.processes = [self._spawn() for _ in range(self.max_workers)]
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_workers)]
+        logger.info(f"🧵 Backtest Job Queue Started ({self.max_workers} workers)")
+
+    async def stop(self):
+        for job in list(self.jobs.values()):
+            if not job.done:
+                await self.cancel(job.id)
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        for index in range(len(self.processes)):
+            self._retire(index, graceful=True)
+        self.processes = []
+
+    # ============================================================
+    # সাবমিট / খোঁজা / বাতিল
+    # ============================================================
+    @staticmethod
+    def param_hash(params):
+        """একই ডাটা উইন্ডোতে একই প্যারামিটার = একই হ্যাশ (নতুন বার ক্লোজ হলে হ্যাশ বদলায়)"""
+        tf_ms = candle_store.timeframe_ms(params['timeframe'])
+        last_closed = int(time.time() * 1000) // tf_ms * tf_ms
+        payload = json.dumps({"params": params, "data_end": last_closed}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def submit(self, params):
+        if not self.workers:
+            self.start()
+        param_hash = self.param_hash(params)
+
+        existing = self.jobs.get(self.by_hash.get(param_hash))
+        if existing and existing.status in (QUEUED, RUNNING, DONE):
+            return existing
+
+        record = await db.find_backtest_result(param_hash)
+        if record:
+            job = BacktestJob.from_record(record)
+            self._remember(job)
+            return job
+
+        job = BacktestJob(params, param_hash)
+        self._remember(job)
+        await db.save_backtest_job(job.record())
+        self.queue.put_nowait(job.id)
+        logger.info(f"📥 Backtest Job Queued: {job.id} ({params.get('symbol')} {params.get('timeframe')})")
+        return job
+
+    async def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            record = await db.get_backtest_job(job_id)
+            if record:
+                job = BacktestJob.from_record(record)
+        return job
+
+    async def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return job
+        if job.process is not None and job.process.is_alive():
+            job.process.terminate()
+        job.update(status=CANCELLED, finished_at=datetime.now(tz=timezone.utc))
+        await db.save_backtest_job(job.record())
+        logger.info(f"🛑 Backtest Job Cancelled: {job.id}")
+        return job
+
+    def _remember(self, job):
+        self.jobs[job.id] = job
+        self.by_hash[job.param_hash] = job.id
+        # পুরনো শেষ হওয়া জব মেমরি থেকে বাদ (DB তে থেকে যায়)
+        while len(self.jobs) > self.history:
+            old_id, old = next(iter(self.jobs.items()))
+            if not old.done:
+                break
+            del self.jobs[old_id]
+            if self.by_hash.get(old.param_hash) == old_id:
+                del self.by_hash[old.param_hash]
+
+    def stats(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.max_workers, "queued": self.queue.qsize() if self.queue else 0, "jobs": counts}
+
+    # ============================================================
+    # ওয়ার্কার প্রসেস পুল
+    # ============================================================
+    @staticmethod
+    def _spawn():
+        ctx = multiprocessing.get_context("spawn")
+        parent, child = ctx.Pipe()
+        process = ctx.Process(target=_job_process, args=(child,), daemon=True)
+        process.start()
+        child.close()
+        return process, parent
+
+    def _retire(self, index, graceful=False):
+        process, conn = self.processes[index]
+        if graceful and process.is_alive():
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(1)
+        if process.is_alive():
+            process.terminate()
+        process.join(1)
+        conn.close()
+
+    # ============================================================
+    # ওয়ার্কার
+    # ============================================================
+    async def _worker(self, index):
+        while True:
+            job_id = await self.queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                continue
+            try:
+                await self._execute(index, job)
+            except asyncio.CancelledError:
+                if job.process is not None and job.process.is_alive():
+                    job.process.terminate()
+                raise
+            except Exception as e:
+                logger.error(f"❌ Backtest Job Error ({job.id}): {e}")
+                job.update(status=FAILED, error=str(e), finished_at=datetime.now(tz=timezone.utc))
+            if job.done:
+                await db.save_backtest_job(job.record())
+
+    async def _execute(self, index, job):
+        process, reader = self.processes[index]
+        if not process.is_alive():
+            # আগের জবে crash/OOM হলে নতুন প্রসেস
+            self._retire(index)
+            process, reader = self.processes[index] = self._spawn()
+        job.process = process
+        job.update(status=RUNNING, started_at=datetime.now(tz=timezone.utc), stage="starting")
+        reader.send(job.params)
+
+        loop = asyncio.get_running_loop()
+        try:
+            while not job.done:
+                # ব্লকিং poll থ্রেডে, ইভেন্ট লুপ আটকায় না
+                ready = await loop.run_in_executor(None, reader.poll, POLL_INTERVAL_SEC)
+                if not ready:
+                    if not process.is_alive() and not reader.poll():
+                        break
+                    continue
+                try:
+                    message = reader.recv()
+                except (EOFError, OSError):
+                    break
+                kind = message[0]
+                if kind == "progress":
+                    job.update(stage=message[1], progress=message[2])
+                elif kind == "result":
+                    result = message[1]
+                    if result.get("status") == "success":
+                        job.update(status=DONE, stage="done", progress=1.0, result=result, finished_at=datetime.now(tz=timezone.utc))
+                    else:
+                        job.update(status=FAILED, error=result.get("message"), finished_at=datetime.now(tz=timezone.utc))
+                elif kind == "error":
+                    job.update(status=FAILED, error=message[1], finished_at=datetime.now(tz=timezone.utc))
+        finally:
+            job.process = None
+            if job.status == CANCELLED or not process.is_alive():
+                # বাতিল জবের প্রসেস terminate হয়েছে; পাইপে আধা-পাঠানো মেসেজ থাকতে পারে, তাই পুরোটাই বদলানো হয়
+                self._retire(index)
+                self.processes[index] = self._spawn()
+
+        if not job.done:
+            # ফলাফল পাঠানোর আগেই প্রসেস শেষ (crash/OOM)
+            job.update(status=FAILED, error=f"Worker exited with code {process.exitcode}", finished_at=datetime.now(tz=timezone.utc))
+
+        elapsed = (job.finished_at - job.started_at).total_seconds()
+        logger.info(f"✅ Backtest Job {job.status.upper()}: {job.id} in {elapsed:.2f}s")
+
+
+backtest_jobs = BacktestJobQueue()
@@ -0,0 +1,370 @@
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import ccxt.async_support as ccxt
+
+from app.core.config import settings
+
+try:
+    import pyarrow  # noqa: F401  (pandas to_parquet/read_parquet ইঞ্জিন)
+    PARQUET_AVAILABLE = True
+except ImportError:  # pyarrow ঐচ্ছিক; না থাকলে ডাটাবেস আর্কাইভ বন্ধ, ব্যাকটেস্ট এক্সচেঞ্জ থেকে ডাউনলোড করে
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger("CandleStore")
+
+# প্রতি রো: টাইমস্ট্যাম্প (ms) + OHLCV; মাসভিত্তিক একটি .npy ফাইল, np.load(mmap_mode='r') দিয়ে পড়া হয়
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'), ('open', '<f8'), ('high', '<f8'),
+    ('low', '<f8'), ('close', '<f8'), ('volume', '<f8')
+])
+PAGE_LIMIT = 1000
+# এতগুলো পেজ ডাউনলোডের পর একবার ডিস্কে লেখা (ডিপ হিস্ট্রিতে মেমরি সীমিত রাখতে)
+PAGES_PER_FLUSH = 20
+# market_candles (MarketFeed এর Binance Futures 1m kline) এর Parquet আর্কাইভ এই সিরিজের ব্যাকফিল হিসেবে পড়া হয়
+ARCHIVE_EXCHANGE = 'binance'
+ARCHIVE_TIMEFRAME = '1m'
+# সিরিজ লক অন্য প্রসেসের হাতে থাকলে আবার চেষ্টার বিরতি (সেকেন্ড)
+LOCK_RETRY_SEC = 0.1
+
+
+class CandleStore:
+    """
+    লোকাল ঐতিহাসিক OHLCV স্টোর: {root}/{exchange}/{BTC-USDT}/{timeframe}/{YYYY-MM}.npy
+
+    প্রতিটি exchange/symbol/timeframe এর _ranges.json এ কোন [start, end) রেঞ্জ ডাউনলোড হয়েছে তা থাকে,
+    তাই ensure() শুধু মিসিং রেঞ্জ এক্সচেঞ্জ থেকে আনে (পেজিনেটেড)। রেঞ্জ পুরো থাকলে নেটওয়ার্ক ছোঁয় না।
+    শুধু ক্লোজড ক্যান্ডেল রাখা হয়; চলমান (অসম্পূর্ণ) বার কখনো ক্যাশ হয় না।
+    """
+    def __init__(self, root=None, archive_root=None):
+        self.root = root or settings.CANDLE_STORE_DIR
+        self.archive_root = archive_root or settings.CANDLE_ARCHIVE_DIR
+        self._locks = {}
+        # এক্সচেঞ্জ -> সেমাফোর: একসাথে সর্বোচ্চ CANDLE_DOWNLOAD_CONCURRENCY টি সিরিজ ডাউনলোড (IP রেট লিমিট)
+        self._download_slots = {}
+
+    # ============================================================
+    # পাথ ও মেটাডাটা
+    # ============================================================
+    @staticmethod
+    def timeframe_ms(timeframe):
+        return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+    def _series_dir(self, exchange, symbol, timeframe):
+        return os.path.join(self.root, exchange, symbol.replace('/', '-'), timeframe)
+
+    @staticmethod
+    def _month(ts_ms):
+        return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime('%Y-%m')
+
+    @staticmethod
+    def _months(start_ms, end_ms):
+        """[start, end) রেঞ্জের সব মাস ('YYYY-MM')"""
+        if end_ms <= start_ms:
+            return []
+        first = datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc)
+        last = datetime.fromtimestamp((end_ms - 1) / 1000, tz=timezone.utc)
+        months = []
+        year, month = first.year, first.month
+        while (year, month) <= (last.year, last.month):
+            months.append(f"{year:04d}-{month:02d}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+
+    def _load_ranges(self, series_dir):
+        path = os.path.join(series_dir, '_ranges.json')
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [tuple(r) for r in json.load(f)]
+
+    def _save_ranges(self, series_dir, ranges):
+        os.makedirs(series_dir, exist_ok=True)
+        with self._replacing(os.path.join(series_dir, '_ranges.json'), 'w') as f:
+            json.dump([list(r) for r in ranges], f)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _replacing(path, mode='wb'):
+        """ইউনিক টেম্প ফাইলে লিখে os.replace; একাধিক প্রসেস একই ফাইল লিখলেও কারো টেম্প অন্যজন মুছে/বদলে দেয় না"""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, mode) as f:
+                yield f
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp)
+            raise
+
+    @contextlib.asynccontextmanager
+    async def _series_lock(self, series_dir):
+        """
+        সিরিজ-প্রতি fcntl.flock: মেইন সার্ভার, ব্যাকটেস্ট জব ও সুইপ ওয়ার্কার প্রসেস একই সিরিজে একসাথে
+        ডাউনলোড/রাইট/রেঞ্জ আপডেট করে না। non-blocking চেষ্টা, তাই অপেক্ষায় ইভেন্ট লুপ আটকায় না এবং cancel কাজ করে।
+        """
+        os.makedirs(series_dir, exist_ok=True)
+        fd = os.open(os.path.join(series_dir, '_lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(LOCK_RETRY_SEC)
+            yield
+        finally:
+            # fd বন্ধ হলে লকও ছেড়ে যায়
+            os.close(fd)
+
+    @staticmethod
+    def _merge(ranges):
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def missing_ranges(self, exchange, symbol, timeframe, start_ms, end_ms):
+        """[start, end) এর যেসব অংশ এখনো ডাউনলোড হয়নি"""
+        missing = []
+        cursor = start_ms
+        for r_start, r_end in self._load_ranges(self._series_dir(exchange, symbol, timeframe)):
+            if r_end <= cursor:
+                continue
+            if r_start >= end_ms:
+                break
+            if r_start > cursor:
+                missing.append((cursor, r_start))
+            cursor = max(cursor, r_end)
+            if cursor >= end_ms:
+                break
+        if cursor < end_ms:
+            missing.append((cursor, end_ms))
+        return missing
+
+    # ============================================================
+    # রিড / রাইট
+    # ============================================================
+    def _partition(self, series_dir, month, mmap=True):
+        path = os.path.join(series_dir, f"{month}.npy")
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r' if mmap else None)
+
+    def write(self, exchange, symbol, timeframe, rows):
+        """[[ts, o, h, l, c, v], ...] মাসভিত্তিক পার্টিশনে মার্জ (একই টাইমস্ট্যাম্প হলে নতুনটি থাকে)"""
+        if not rows:
+            return
+        series_dir = self._series_dir(exchange, symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+
+        new = np.array([tuple(row[:6]) for row in rows], dtype=CANDLE_DTYPE)
+        months = np.array([self._month(ts) for ts in new['timestamp'].tolist()])
+        for month in np.unique(months):
+            chunk = new[months == month]
+            existing = self._partition(series_dir, month, mmap=False)
+            if existing is not None:
+                chunk = np.concatenate([chunk, existing])
+            # stable sort + প্রথম অকারেন্স রাখা = নতুন ডাটা অগ্রাধিকার পায়
+            _, first = np.unique(chunk['timestamp'], return_index=True)
+            chunk = chunk[first]
+
+            with self._replacing(os.path.join(series_dir, f"{month}.npy")) as f:
+                np.save(f, chunk)
+
+    def read(self, exchange, symbol, timeframe, start_ms, end_ms):
+        """[start, end) রেঞ্জের ক্যান্ডেল মেমরি-ম্যাপড পার্টিশন থেকে; fetch_historical_data এর মতো ফরম্যাটে DataFrame"""
+        series_dir = self._series_dir(exchange, symbol, timeframe)
+        parts = []
+        for month in self._months(start_ms, end_ms):
+            data = self._partition(series_dir, month)
+            if data is None or not len(data):
+                continue
+            ts = data['timestamp']
+            lo, hi = np.searchsorted(ts, start_ms), np.searchsorted(ts, end_ms)
+            if hi > lo:
+                parts.append(data[lo:hi])
+
+        if parts:
+            rows = np.concatenate(parts)
+        else:
+            rows = np.empty(0, dtype=CANDLE_DTYPE)
+        df = pd.DataFrame({name: np.asarray(rows[name]) for name in CANDLE_DTYPE.names})
+        df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    # ============================================================
+    # Parquet আর্কাইভ (ডাটাবেসের কোল্ড চাঙ্ক)
+    # ============================================================
+    def _archive_dir(self, symbol, timeframe):
+        return os.path.join(self.archive_root, symbol.replace('/', '-'), timeframe)
+
+    def archived_chunks(self):
+        """আগে এক্সপোর্ট হওয়া market_candles চাঙ্কের নাম"""
+        path = os.path.join(self.archive_root, '_chunks.json')
+        if not os.path.exists(path):
+            return set()
+        with open(path) as f:
+            return set(json.load(f))
+
+    def mark_archived(self, chunk_name):
+        os.makedirs(self.archive_root, exist_ok=True)
+        with self._replacing(os.path.join(self.archive_root, '_chunks.json'), 'w') as f:
+            json.dump(sorted(self.archived_chunks() | {chunk_name}), f)
+
+    def write_archive(self, symbol, timeframe, start_ms, end_ms, df):
+        """
+        একটি চাঙ্কের [start, end) ক্যান্ডেল Parquet ফাইলে: {archive}/{BTC-USDT}/{timeframe}/{start}_{end}.parquet
+        df: Database.get_candles এর ফরম্যাট (index 'timestamp' UTC, open..volume)। রিটার্ন: রো সংখ্যা
+        """
+        if df is None or df.empty:
+            return 0
+        series_dir = self._archive_dir(symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        table = pd.DataFrame({'timestamp': df.index.as_unit('ms').asi8})
+        for name in CANDLE_DTYPE.names[1:]:
+            table[name] = df[name].to_numpy()
+
+        with self._replacing(os.path.join(series_dir, f"{start_ms}_{end_ms}.parquet")) as f:
+            table.to_parquet(f, index=False, compression='zstd')
+        return len(table)
+
+    def _import_archive(self, exchange, symbol, timeframe, missing):
+        """
+        মিসিং রেঞ্জের সাথে মেলে এমন আর্কাইভ ফাইল লোকাল স্টোরে তোলা, যাতে সেই অংশ এক্সচেঞ্জ থেকে আনতে না হয়।
+        শুধু আসল ডাটার টানা রানগুলো ডাউনলোড হয়েছে ধরা হয়; চাঙ্কের শুরু/শেষ বা ভেতরের ফাঁক (ফিড বন্ধ ছিল) এক্সচেঞ্জ থেকে আসে।
+        রিটার্ন: ইমপোর্ট হওয়া ক্যান্ডেল সংখ্যা
+        """
+        if exchange != ARCHIVE_EXCHANGE or not PARQUET_AVAILABLE:
+            return 0
+        archive_dir = self._archive_dir(symbol, timeframe)
+        if not os.path.isdir(archive_dir):
+            return 0
+
+        series_dir = self._series_dir(exchange, symbol, timeframe)
+        tf_ms = self.timeframe_ms(timeframe)
+        imported = 0
+        for name in sorted(os.listdir(archive_dir)):
+            if not name.endswith('.parquet'):
+                continue
+            file_start, file_end = map(int, name[:-len('.parquet')].split('_'))
+            if not any(file_start < gap_end and gap_start < file_end for gap_start, gap_end in missing):
+                continue
+            table = pd.read_parquet(os.path.join(archive_dir, name), columns=list(CANDLE_DTYPE.names))
+            if table.empty:
+                continue
+            self.write(exchange, symbol, timeframe, list(table.itertuples(index=False, name=None)))
+            # ফিড বন্ধ থাকার ফাঁক (diff > tf) এ ভাগ: শুধু টানা ডাটার রানগুলোই ডাউনলোড হয়েছে ধরা হয়
+            ts = np.sort(table['timestamp'].to_numpy(dtype='int64'))
+            breaks = np.flatnonzero(np.diff(ts) > tf_ms)
+            runs = zip(ts[np.r_[0, breaks + 1]].tolist(), (ts[np.r_[breaks, len(ts) - 1]] + tf_ms).tolist())
+            self._save_ranges(series_dir, self._merge(self._load_ranges(series_dir) + list(runs)))
+            imported += len(table)
+
+        if imported:
+            logger.info(f"🧊 [{exchange}:{symbol}:{timeframe}] Loaded {imported} candles from DB archive")
+        return imported
+
+    # ============================================================
+    # ডাউনলোড
+    # ============================================================
+    async def ensure(self, exchange, symbol, timeframe, start_ms, end_ms):
+        """
+        [start, end) রেঞ্জ লোকালি পুরো আছে নিশ্চিত করা; শুধু মিসিং অংশ পেজিনেটেড ডাউনলোড।
+        রিটার্ন: ডাউনলোড হওয়া ক্যান্ডেল সংখ্যা
+        """
+        key = (exchange, symbol, timeframe)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        # প্রসেসের ভেতরে asyncio.Lock, প্রসেসগুলোর মধ্যে ফাইল লক (flock একই প্রসেসের দুই fd কেও আলাদা ধরে)
+        async with lock, self._series_lock(self._series_dir(exchange, symbol, timeframe)):
+            # চলমান বার বাদ: শুধু শেষ ক্লোজড বার পর্যন্ত
+            tf_ms = self.timeframe_ms(timeframe)
+            now_ms = int(datetime.now(tz=timezone.utc).timestamp() * 1000)
+            end_ms = min(end_ms, now_ms // tf_ms * tf_ms)
+
+            # ফাইল I/O থ্রেডে, যাতে ইভেন্ট লুপ (লাইভ ফিড) আটকে না থাকে
+            missing = await asyncio.to_thread(self.missing_ranges, exchange, symbol, timeframe, start_ms, end_ms)
+            if missing and await asyncio.to_thread(self._import_archive, exchange, symbol, timeframe, missing):
+                missing = await asyncio.to_thread(self.missing_ranges, exchange, symbol, timeframe, start_ms, end_ms)
+            if not missing:
+                return 0
+
+            slots = self._download_slots.setdefault(exchange, asyncio.Semaphore(max(1, settings.CANDLE_DOWNLOAD_CONCURRENCY)))
+            async with slots:
+                client = self._create_client(exchange)
+                downloaded = 0
+                try:
+                    for gap_start, gap_end in missing:
+                        downloaded += await self._download(client, exchange, symbol, timeframe, gap_start, gap_end, tf_ms)
+                finally:
+                    await client.close()
+
+            logger.info(f"📥 [{exchange}:{symbol}:{timeframe}] Downloaded {downloaded} candles in {len(missing)} range(s)")
+            return downloaded
+
+    @staticmethod
+    def _create_client(exchange):
+        if exchange == 'binance':
+            return ccxt.binance({'enableRateLimit': True, 'options': {'defaultType': 'future'}})
+        return getattr(ccxt, exchange)({'enableRateLimit': True})
+
+    async def _download(self, client, exchange, symbol, timeframe, start_ms, end_ms, tf_ms):
+        series_dir = self._series_dir(exchange, symbol, timeframe)
+        since = start_ms
+        pending = []
+        pages = 0
+        total = 0
+
+        def flush(upto):
+            nonlocal pending
+            self.write(exchange, symbol, timeframe, pending)
+            ranges = self._load_ranges(series_dir) + [(start_ms, upto)]
+            self._save_ranges(series_dir, self._merge(ranges))
+            pending = []
+
+        while since < end_ms:
+            batch = await client.fetch_ohlcv(symbol, timeframe, since=since, limit=PAGE_LIMIT)
+            batch = [row for row in batch or [] if since <= row[0] < end_ms]
+            if not batch:
+                break
+            pending.extend(batch)
+            total += len(batch)
+            since = batch[-1][0] + tf_ms
+            pages += 1
+            if pages % PAGES_PER_FLUSH == 0:
+                await asyncio.to_thread(flush, since)
+
+        # এক্সচেঞ্জে ডাটা না থাকলেও (লিস্টিংয়ের আগে/মেইনটেন্যান্স) রেঞ্জটি ডাউনলোড হয়েছে ধরা হয়, যাতে বারবার না আনে
+        await asyncio.to_thread(flush, end_ms)
+        return total
+
+    async def get_candles(self, exchange, symbol, timeframe, limit=1000, start_ms=None, end_ms=None):
+        """
+        শেষ `limit` টি ক্লোজড ক্যান্ডেল (অথবা start/end রেঞ্জ); দরকার হলে আগে মিসিং অংশ ডাউনলোড।
+        """
+        tf_ms = self.timeframe_ms(timeframe)
+        if end_ms is None:
+            now_ms = int(datetime.now(tz=timezone.utc).timestamp() * 1000)
+            end_ms = now_ms // tf_ms * tf_ms
+        if start_ms is None:
+            start_ms = end_ms - limit * tf_ms
+
+        await self.ensure(exchange, symbol, timeframe, start_ms, end_ms)
+        df = await asyncio.to_thread(self.read, exchange, symbol, timeframe, start_ms, end_ms)
+        if limit and len(df) > limit:
+            df = df.iloc[-limit:].reset_index(drop=True)
+        return df
+
+
+candle_store = CandleStore()
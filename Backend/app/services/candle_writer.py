@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from app.core.config import settings
+from app.database import db, candle_record
+from app.services.metrics import metrics
+
+logger = logging.getLogger("CandleWriter")
+metrics.describe("candle_flush_seconds", "Latency of one batched candle write (COPY + merge)")
+
+
+class CandleWriter:
+    """
+    write-behind ক্যান্ডেল পারসিস্টেন্স: সব সিম্বলের ক্লোজড ক্যান্ডেল মেমরিতে জমে, তারপর
+    `flush_size` এ পৌঁছালে অথবা প্রতি `flush_interval` সেকেন্ডে এক ব্যাচে db.copy_candles (COPY + মার্জ) এ যায়।
+    প্রতি ক্যান্ডেলে একটি কানেকশন ও একটি আপসার্টের বদলে প্রতি ব্যাচে একটি রাউন্ড-ট্রিপ।
+
+    - একই (symbol, time) আবার এলে আগেরটি প্রতিস্থাপিত হয়, তাই আপসার্ট সেমান্টিক অপরিবর্তিত।
+    - ফ্লাশ ব্যর্থ হলে ব্যাচ আবার পেন্ডিং এ ফেরে (নতুন আসা ভ্যালু থাকলে সেটিই রাখা হয়) এবং পরের বার চেষ্টা হয়;
+      ডাটাবেস দীর্ঘক্ষণ বন্ধ থাকলে `max_pending` এর বেশি পুরনো ক্যান্ডেল বাদ দিয়ে মেমরি সীমিত রাখা হয়।
+    - on_flush(candles): সফলভাবে সেভ হওয়া ক্যান্ডেল ডিক্টগুলো নিয়ে কলব্যাক (যেমন ক্যাশ ইনভ্যালিডেশন)।
+    """
+    def __init__(self, flush_size=None, flush_interval=None, max_pending=None, on_flush=None):
+        self.flush_size = flush_size or settings.CANDLE_FLUSH_SIZE
+        self.flush_interval = flush_interval or settings.CANDLE_FLUSH_INTERVAL_SEC
+        self.max_pending = max_pending or self.flush_size * 20
+        self.on_flush = on_flush
+        # (symbol, time) -> ক্যান্ডেল ডিক্ট; dict এর ক্রম = আসার ক্রম
+        self.pending = {}
+        self._lock = asyncio.Lock()
+        self._last_flush = time.monotonic()
+
+        # স্ট্যাটস
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    async def add(self, candle):
+        """ক্যান্ডেল পেন্ডিং এ রাখা; সাইজ থ্রেশহোল্ডে পৌঁছালে সাথে সাথে ফ্লাশ (কলার অপেক্ষা করে = ব্যাকপ্রেশার)"""
+        key = (candle.get('s'), candle['time'])
+        self.pending.pop(key, None)
+        self.pending[key] = candle
+        if len(self.pending) >= self.flush_size:
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        """পেন্ডিং সব ক্যান্ডেল এক ব্যাচে সেভ; সফল হলে True"""
+        async with self._lock:
+            self._last_flush = time.monotonic()
+            if not self.pending:
+                return True
+            batch, self.pending = self.pending, {}
+            candles = list(batch.values())
+            started = time.perf_counter()
+            try:
+                await db.copy_candles([candle_record(candle) for candle in candles])
+            except Exception as e:
+                self.failed += 1
+                metrics.inc("candle_flush_failures")
+                logger.error(f"❌ Candle Flush Error ({len(candles)} candles, retry pending): {e}")
+                self._requeue(batch)
+                return False
+
+            metrics.observe("candle_flush_seconds", time.perf_counter() - started)
+            self.flushed += len(candles)
+            self.batches += 1
+            if self.on_flush:
+                try:
+                    self.on_flush(candles)
+                except Exception as e:
+                    logger.error(f"Candle Flush Callback Error: {e}")
+            return True
+
+    def _requeue(self, batch):
+        # ব্যর্থ ব্যাচ আগে, এর মাঝে আসা নতুন ক্যান্ডেল পরে (একই কী হলে নতুনটিই থাকে)
+        batch.update(self.pending)
+        self.pending = batch
+        overflow = len(self.pending) - self.max_pending
+        if overflow > 0:
+            for key in list(self.pending)[:overflow]:
+                del self.pending[key]
+            self.dropped += overflow
+            metrics.inc("candles_dropped", overflow)
+            logger.error(f"⚠️ Candle Writer Overflow: dropped {overflow} oldest unsaved candles")
+
+    async def run(self):
+        """টাইম থ্রেশহোল্ড: শেষ ফ্লাশের পর `flush_interval` পার হলে পেন্ডিং ক্যান্ডেল সেভ"""
+        try:
+            while True:
+                await asyncio.sleep(max(0.0, self._last_flush + self.flush_interval - time.monotonic()))
+                if time.monotonic() - self._last_flush >= self.flush_interval:
+                    # স্টেজ বন্ধ হলেও চলমান ব্যাচ মাঝপথে বাতিল হয় না; close() লক নিয়ে এটি শেষ হওয়ার অপেক্ষা করে
+                    await asyncio.shield(self.flush())
+        except asyncio.CancelledError:
+            logger.info("🛑 Candle Writer Stopped.")
+            raise
+
+    async def close(self):
+        """শাটডাউন: বাকি থাকা ক্যান্ডেল সেভ (ব্যর্থ হলে একবার আবার চেষ্টা)"""
+        if not await self.flush():
+            await self.flush()
+        if self.pending:
+            logger.error(f"❌ {len(self.pending)} candles could not be saved at shutdown")
+
+    def stats(self):
+        return {
+            "pending": len(self.pending),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "flush_size": self.flush_size,
+            "flush_interval_sec": self.flush_interval
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from app.services.feed_codec import ENCODINGS
+from app.services.metrics import metrics
+
+logger = logging.getLogger("ClientSession")
+
+# একটি send এ এর বেশি সময় লাগলে ক্লায়েন্ট স্লো ধরে বাদ দেওয়া হয়
+SEND_TIMEOUT_SEC = 5.0
+# টানা এতগুলো আপডেট কোয়ালেস (পুরনোটি বাদ) হলে ক্লায়েন্ট বাদ
+MAX_CONSECUTIVE_DROPS = 1000
+# ডেল্টা মোডে প্রতি সিম্বলে এতগুলো ডেল্টা অথবা এত সেকেন্ড পরপর পুরো snapshot
+SNAPSHOT_EVERY = 100
+SNAPSHOT_INTERVAL_SEC = 10.0
+
+
+class ClientSession:
+    """
+    একটি WebSocket ক্লায়েন্টের নিজস্ব সেন্ড কিউ ও রাইটার টাস্ক।
+
+    কিউটি সিম্বল অনুযায়ী কোয়ালেস করা: একটি সিম্বলের আপডেট পাঠানোর আগেই নতুন আপডেট এলে
+    পুরনোটি বাদ দিয়ে শুধু সর্বশেষটি রাখা হয়, তাই কিউয়ের আকার সাবস্ক্রাইব করা সিম্বলের সংখ্যার বেশি হয় না।
+    একটি ধীর ক্লায়েন্ট শুধু নিজের আপডেট হারায়, অন্য ক্লায়েন্ট বা পাইপলাইনকে আটকায় না।
+
+    এনকোডিং ক্লায়েন্ট ঠিক করে (json/binary, delta অন/অফ)। কিউতে FeedUpdate থাকে এবং পাঠানোর
+    মুহূর্তে এনকোড হয়, তাই কোয়ালেস হয়ে বাদ পড়া আপডেটের পরও ডেল্টা ক্লায়েন্টের শেষ পাওয়া মেসেজের সাপেক্ষেই হয়।
+    """
+    def __init__(self, websocket, on_evict=None, encoding="json", delta=False,
+                 send_timeout=SEND_TIMEOUT_SEC, max_consecutive_drops=MAX_CONSECUTIVE_DROPS):
+        self.websocket = websocket
+        # সাবস্ক্রাইব করা সিম্বলের সেট (None = সব সিম্বল)
+        self.symbols = None
+        self.encoding = "json"
+        self.delta = False
+        self.configure(encoding, delta)
+        # সিম্বল -> (শেষ পাঠানো seq, শেষ পাঠানো ফিল্ড, শেষ snapshot এর পর ডেল্টা সংখ্যা, শেষ snapshot সময়)
+        self.delta_state = {}
+        self.on_evict = on_evict
+        self.send_timeout = send_timeout
+        self.max_consecutive_drops = max_consecutive_drops
+
+        # key (সিম্বল) -> সিরিয়ালাইজ করা মেসেজ
+        self.pending = OrderedDict()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.closed = False
+
+        # মেট্রিক
+        self.sent = 0
+        self.dropped = 0
+        self.consecutive_drops = 0
+        self.last_send_ms = 0.0
+
+    def wants(self, symbol):
+        return self.symbols is None or symbol in self.symbols
+
+    def configure(self, encoding=None, delta=None):
+        if encoding is not None:
+            if encoding not in ENCODINGS:
+                raise ValueError(f"Unsupported encoding: {encoding}")
+            self.encoding = encoding
+        if delta is not None:
+            self.delta = bool(delta)
+        # এনকোডিং বদলালে পরের মেসেজ অবশ্যই snapshot
+        self.delta_state = {}
+
+    def render(self, update):
+        """FeedUpdate -> এই ক্লায়েন্টের জন্য মেসেজ (str অথবা bytes)"""
+        if not self.delta:
+            return update.snapshot(self.encoding, with_seq=self.encoding != "json")
+
+        now = time.monotonic()
+        state = self.delta_state.get(update.symbol)
+        if state is None or state[2] >= SNAPSHOT_EVERY or now - state[3] >= SNAPSHOT_INTERVAL_SEC:
+            message = update.snapshot(self.encoding)
+            self.delta_state[update.symbol] = (update.seq, update.fields, 0, now)
+            return message
+
+        last_seq, last_fields, count, snapshot_time = state
+        if last_seq == update.seq - 1:
+            # বাকি ক্লায়েন্টদের সাথে শেয়ার্ড (ক্যাশড) ডেল্টা
+            message = update.delta(self.encoding)
+        else:
+            message = update.delta(self.encoding, last_fields)
+        self.delta_state[update.symbol] = (update.seq, update.fields, count + 1, snapshot_time)
+        return message
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._writer())
+
+    def enqueue(self, key, update):
+        """নন-ব্লকিং: একই key এর আগের না-পাঠানো আপডেট সর্বশেষটি দিয়ে রিপ্লেস হয়"""
+        if self.closed:
+            return
+        if key in self.pending:
+            del self.pending[key]
+            self.dropped += 1
+            self.consecutive_drops += 1
+            if self.consecutive_drops >= self.max_consecutive_drops:
+                self.evict(f"{self.consecutive_drops} updates coalesced without a send")
+                return
+        self.pending[key] = update
+        self.wakeup.set()
+
+    async def _writer(self):
+        try:
+            while not self.closed:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.pending and not self.closed:
+                    _, update = self.pending.popitem(last=False)
+                    started = time.perf_counter()
+                    try:
+                        message = self.render(update)
+                        if isinstance(message, bytes):
+                            await asyncio.wait_for(self.websocket.send_bytes(message), timeout=self.send_timeout)
+                        else:
+                            await asyncio.wait_for(self.websocket.send_text(message), timeout=self.send_timeout)
+                    except asyncio.TimeoutError:
+                        self.evict(f"send took longer than {self.send_timeout}s")
+                        return
+                    except Exception as e:
+                        self.evict(f"send failed: {e}")
+                        return
+                    elapsed = time.perf_counter() - started
+                    self.last_send_ms = elapsed * 1000
+                    metrics.observe("stage_latency_seconds", elapsed, stage="ws_send")
+                    self.sent += 1
+                    self.consecutive_drops = 0
+        except asyncio.CancelledError:
+            pass
+
+    def evict(self, reason):
+        if self.closed:
+            return
+        logger.warning(f"⚠️ Evicting Slow Client: {reason}")
+        self.close()
+        if self.on_evict:
+            self.on_evict(self)
+        asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            # 1013 = Try Again Later
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    def close(self):
+        self.closed = True
+        self.pending.clear()
+        if self.task is not None and self.task is not asyncio.current_task():
+            self.task.cancel()
+        self.task = None
+
+    def stats(self):
+        return {
+            "symbols": sorted(self.symbols) if self.symbols is not None else "all",
+            "encoding": self.encoding,
+            "delta": self.delta,
+            "pending": len(self.pending),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "last_send_ms": round(self.last_send_ms, 3)
+        }
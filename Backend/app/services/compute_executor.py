@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core.config import settings
+from app.services.metrics import metrics
+
+logger = logging.getLogger("ComputeExecutor")
+
+
+# ============================================================
+# প্রসেস পুলের টাস্ক (spawn এ ইমপোর্টযোগ্য মডিউল-লেভেল ফাংশন)
+# ============================================================
+def _warmup():
+    # pandas_ta ইমপোর্ট ও নেটিভ কার্নেলের JIT প্রথম কলেই, যাতে প্রথম রিকোয়েস্টে কয়েক সেকেন্ডের দেরি না হয়
+    from app.services.technical_indicators import technical_indicators
+    if technical_indicators.kernels is not None:
+        technical_indicators.kernels.warmup()
+    return True
+
+
+def _apply_indicators(df, features=None):
+    from app.services.technical_indicators import technical_indicators
+    return technical_indicators.apply_indicators(df, features)
+
+
+def _apply_indicators_owned(df, features=None):
+    # ফ্রেমটি শুধু এই কলের জন্য কপি করা, তাই ওয়ার্কারে আরেকবার কপি লাগে না
+    from app.services.technical_indicators import technical_indicators
+    return technical_indicators.apply_indicators(df, features, copy=False)
+
+
+class PoolStats:
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms, ok=True):
+        self.completed += 1
+        if not ok:
+            self.failed += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def to_dict(self):
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "in_flight": self.submitted - self.completed,
+            "failed": self.failed,
+            "avg_ms": round(self.total_ms / self.completed, 3) if self.completed else 0.0,
+            "max_ms": round(self.max_ms, 3)
+        }
+
+
+class ComputeExecutor:
+    """
+    CPU-ভারী কাজের জন্য এক্সিকিউটর লেয়ার, যাতে ইভেন্ট লুপ (WebSocket ping, মার্কেট লিসেনার) আটকে না যায়।
+
+    - run_in_thread: GIL ছেড়ে দেয় এমন NumPy/sklearn কাজ (ভোটিং, predict_proba)
+    - run_in_process: pandas_ta-ভারী কাজ (apply_all_indicators), spawn প্রসেস পুলে
+    COMPUTE_PROCESSES=0 হলে প্রসেস পুল বন্ধ, সেই কাজও থ্রেড পুলে যায়; পুল ভেঙে গেলে (ওয়ার্কার ক্র্যাশ)
+    নতুন পুল তৈরি হয় এবং ওই কাজটি থ্রেড পুলে আবার চলে।
+    """
+    def __init__(self, threads=None, processes=None):
+        self.threads = threads if threads is not None else settings.COMPUTE_THREADS
+        self.processes = processes if processes is not None else settings.COMPUTE_PROCESSES
+        self._thread_pool = None
+        self._process_pool = None
+        self.thread_stats = PoolStats()
+        self.process_stats = PoolStats()
+
+    # ============================================================
+    # লাইফসাইকেল
+    # ============================================================
+    def _threads(self):
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="compute")
+        return self._thread_pool
+
+    def _processes(self):
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    async def start(self):
+        """প্রসেস পুলের ওয়ার্কারগুলো আগেই চালু ও ওয়ার্ম-আপ করা"""
+        self._threads()
+        if self.processes > 0:
+            await asyncio.gather(*[self.run_in_process(_warmup) for _ in range(self.processes)])
+        logger.info(f"⚙️ Compute Executor Ready (threads={self.threads}, processes={self.processes})")
+
+    def shutdown(self):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+
+    # ============================================================
+    # সাবমিট
+    # ============================================================
+    async def _run(self, pool, stats, fn, *args):
+        stats.submitted += 1
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.record(elapsed * 1000, ok)
+            metrics.observe("executor_task_seconds", elapsed, pool="process" if stats is self.process_stats else "thread")
+
+    async def run_in_thread(self, fn, *args):
+        return await self._run(self._threads(), self.thread_stats, fn, *args)
+
+    async def run_in_process(self, fn, *args):
+        if self.processes <= 0:
+            return await self.run_in_thread(fn, *args)
+        try:
+            return await self._run(self._processes(), self.process_stats, fn, *args)
+        except BrokenProcessPool:
+            logger.error("❌ Compute process pool broken, recreating (task retried in thread pool)")
+            self._process_pool = None
+            return await self.run_in_thread(fn, *args)
+
+    async def indicators(self, df, features=None, copy=True, owned=False):
+        """
+        apply_indicators প্রসেস পুলে (features=None হলে সব ইন্ডিকেটর)।
+        চাওয়া ফিচার ফ্রেমে আগেই থাকলে (ইনক্রিমেন্টাল ফ্রেম বা আগের ধাপে হিসাব করা) কোনো হপ ছাড়াই ফেরত।
+        copy=False: ফ্রেমটি অপরিবর্তনীয় স্ন্যাপশট (FeatureFrame), তাই লুপে কপি ছাড়াই পাঠানো যায়।
+        owned=True: স্ন্যাপশটটি কলারের নিজস্ব, তাই ওয়ার্কারেও কপি নয়, কলাম সরাসরি এতেই বসে।
+        """
+        from app.services.technical_indicators import technical_indicators
+        if df is None or df.empty or technical_indicators.covers(df, features):
+            return df
+        if owned:
+            return await self.run_in_process(_apply_indicators_owned, df, features)
+        if copy:
+            # রিং বাফারের ভিউ পরের টিকে বদলে যায়, আর পিকল/থ্রেড রিড হয় লুপের বাইরে, তাই আগেই কপি
+            return await self.run_in_process(_apply_indicators_owned, df.copy(), features)
+        # শেয়ার্ড স্ন্যাপশট বদলানো যাবে না: নতুন কলাম বসানোর কপি হয় ওয়ার্কারে (copy-on-write)
+        return await self.run_in_process(_apply_indicators, df, features)
+
+    def stats(self):
+        return {
+            "threads": {"workers": self.threads, **self.thread_stats.to_dict()},
+            "processes": {"workers": self.processes, **self.process_stats.to_dict()}
+        }
+
+
+class LoopLagMonitor:
+    """
+    ইভেন্ট লুপ ল্যাগ: প্রতি `interval` সেকেন্ডে ঘুমিয়ে দেখা হয় কত দেরিতে জাগল।
+    দেরি মানে ওই সময়ে লুপে কোনো সিঙ্ক্রোনাস কাজ আটকে ছিল; warn_ms ছাড়ালে স্টল হিসেবে গোনা ও লগ।
+    """
+    def __init__(self, interval=0.25, warn_ms=None, window=2400):
+        self.interval = interval
+        self.warn_ms = warn_ms if warn_ms is not None else settings.LOOP_LAG_WARN_MS
+        self.samples = deque(maxlen=window)
+        self.max_ms = 0.0
+        self.stalls = 0
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.samples.append(lag_ms)
+            metrics.observe("event_loop_lag_seconds", lag_ms / 1000)
+            self.max_ms = max(self.max_ms, lag_ms)
+            if lag_ms > self.warn_ms:
+                self.stalls += 1
+                logger.warning(f"🐢 Event loop stalled for {lag_ms:.1f}ms")
+
+    def stats(self):
+        if not self.samples:
+            return {"samples": 0, "last_ms": 0.0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "stalls": 0}
+        ordered = sorted(self.samples)
+        return {
+            "samples": len(ordered),
+            "last_ms": round(self.samples[-1], 3),
+            "avg_ms": round(sum(ordered) / len(ordered), 3),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+            "max_ms": round(self.max_ms, 3),
+            "stalls": self.stalls
+        }
+
+
+compute_executor = ComputeExecutor()
+loop_lag_monitor = LoopLagMonitor()
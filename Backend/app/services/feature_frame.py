@@ -0,0 +1,81 @@
+class FeatureFrame:
+    """
+    এক টিকের শেয়ার্ড ফিচার ফ্রেম: একবার তৈরি হয়ে রেফারেন্স হিসেবে StrategyManager -> HybridStrategyEngine /
+    SignalEngine পর্যন্ত যায়, পথে কোনো স্টেজ কপি করে না।
+
+    - অপরিবর্তনীয়: ভেতরের ডাটাফ্রেম কেউ বদলায় না; column() রিড-অনলি ndarray ভিউ দেয় (ক্যাশড)।
+    - copy-on-write: নতুন ইন্ডিকেটর লাগলে require() নতুন FeatureFrame ফেরত দেয় (পুরনোটি অক্ষত),
+      আর বদলানো একান্তই দরকার হলে mutable() একটি নিজস্ব কপি দেয়।
+    - cached(): একই টিকে একাধিক জায়গায় লাগে এমন ডেরাইভড অ্যারে (যেমন এআই ফিচার) একবারই হিসাব।
+
+    রিং বাফারের লাইভ ভিউ দিয়ে তৈরি করা যাবে না (পরের টিকে বদলে যায়); আগে স্ন্যাপশট নিতে হবে।
+    owned=True: ফ্রেমটি শুধু এই টিকের জন্য তৈরি স্ন্যাপশট (অন্য কেউ রেফারেন্স রাখে না), তাই require()
+    নতুন কলাম সরাসরি এতেই বসায়; মালিকানা ফেরত আসা FeatureFrame এ চলে যায়, পুরনোটি আর ব্যবহার হয় না।
+    """
+    __slots__ = ("frame", "owned", "_arrays", "_cache")
+
+    def __init__(self, frame, owned=False):
+        self.frame = frame
+        self.owned = owned
+        self._arrays = {}
+        self._cache = {}
+
+    @classmethod
+    def wrap(cls, data):
+        """ডাটাফ্রেম অথবা FeatureFrame -> FeatureFrame (আগে থেকেই হলে একই অবজেক্ট)"""
+        return data if isinstance(data, cls) else cls(data)
+
+    @property
+    def empty(self):
+        return self.frame is None or self.frame.empty
+
+    @property
+    def columns(self):
+        return self.frame.columns
+
+    def __len__(self):
+        return 0 if self.frame is None else len(self.frame)
+
+    def __contains__(self, column):
+        return column in self.frame.columns
+
+    def column(self, name):
+        """কলামের রিড-অনলি ndarray (না থাকলে None)"""
+        array = self._arrays.get(name)
+        if array is None:
+            if name not in self.frame.columns:
+                return None
+            array = self.frame[name].to_numpy().view()
+            array.flags.writeable = False
+            self._arrays[name] = array
+        return array
+
+    def value(self, name, default=None, offset=0):
+        """শেষ রো (offset=1 হলে আগের রো) এর একটি ভ্যালু; iloc[-1] এর মতো পুরো রো Series তৈরি হয় না"""
+        array = self.column(name)
+        if array is None or len(array) <= offset:
+            return default
+        return array[-1 - offset]
+
+    def cached(self, key, factory):
+        """factory(self) এর ফলাফল এই ফ্রেমের জন্য একবারই"""
+        if key not in self._cache:
+            self._cache[key] = factory(self)
+        return self._cache[key]
+
+    def mutable(self):
+        """বদলানোর জন্য নিজস্ব কপি (copy-on-write)"""
+        return self.frame.copy()
+
+    async def require(self, features):
+        """
+        চাওয়া ইন্ডিকেটর সহ ফ্রেম: আগে থেকেই থাকলে নিজেকেই, নাহলে নতুন কলাম সহ নতুন FeatureFrame।
+        ফ্রেম অপরিবর্তনীয় বলে লুপে আর কপি লাগে না; শেয়ার্ড হলে কপি হয় ওয়ার্কারে, নতুন কলাম বসানোর সময়।
+        """
+        from app.services.compute_executor import compute_executor
+        from app.services.technical_indicators import technical_indicators
+        if self.empty or not features or technical_indicators.covers(self.frame, features):
+            return self
+        frame = await compute_executor.indicators(self.frame, features, copy=False, owned=self.owned)
+        return FeatureFrame(frame, owned=self.owned)
+
@@ -0,0 +1,151 @@
+import json
+import struct
+
+# ============================================================
+# /ws/feed এনকোডিং
+#   json   -> আগের মতো পুরো market_update JSON (ডিফল্ট)
+#   binary -> ফিক্সড struct লেআউট (little-endian):
+#       u8 kind (1 = snapshot, 2 = delta) | u8 len + symbol (utf-8) | u32 seq | u16 field mask
+#       তারপর mask এ সেট থাকা প্রতিটি ফিল্ড FIELDS এর ক্রমে (f8 অথবা u8)
+# delta মোডে শুধু আগের মেসেজের পর বদলানো ফিল্ড যায়, মাঝে মাঝে পুরো snapshot।
+# ============================================================
+
+ENCODINGS = ("json", "binary")
+
+SNAPSHOT = 1
+DELTA = 2
+
+# (ফিল্ড, struct ফরম্যাট) — ক্রম বদলালে ক্লায়েন্ট ডিকোডারও বদলাতে হবে
+FIELDS = (
+    ('open', 'd'), ('high', 'd'), ('low', 'd'), ('close', 'd'), ('volume', 'd'),
+    ('trade_signal', 'B'), ('vote', 'd'), ('confidence', 'd'), ('is_ai', 'B')
+)
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+PRICE_FIELDS = FIELD_NAMES[:5]
+AI_FIELDS = ('vote', 'confidence', 'is_ai')
+
+# অচেনা সিগন্যাল (যেমন None) NEUTRAL হিসেবে যায়, ট্রেড শুধু BUY/SELL এ হয়
+SIGNAL_CODES = {"NEUTRAL": 0, "BUY": 1, "SELL": 2}
+SIGNAL_NAMES = {code: name for name, code in SIGNAL_CODES.items()}
+
+_HEADER = struct.Struct('<BB')
+_SEQ_MASK = struct.Struct('<IH')
+_VALUE = {fmt: struct.Struct('<' + fmt) for fmt in ('d', 'B')}
+
+
+def flatten(update):
+    """নেস্টেড market_update -> ফ্ল্যাট ফিল্ড ডিকশনারি (ডেল্টা তুলনার জন্য)"""
+    price = update["price_data"]
+    analysis = update.get("analysis") or {}
+    fields = {name: price.get(name) for name in PRICE_FIELDS}
+    fields['trade_signal'] = analysis.get("trade_signal", "NEUTRAL")
+    ai_data = analysis.get("ai_data")
+    if ai_data:
+        fields['is_ai'] = bool(ai_data.get('is_ai', False))
+        if 'vote' in ai_data:
+            fields['vote'] = ai_data.get('vote')
+        if 'confidence' in ai_data:
+            fields['confidence'] = ai_data.get('confidence')
+    return fields
+
+
+def diff(previous, current):
+    """আগের মেসেজের পর বদলানো ফিল্ড; কোনো ফিল্ড হারিয়ে গেলে None (তখন snapshot পাঠাতে হবে)"""
+    if any(name not in current for name in previous):
+        return None
+    return {name: value for name, value in current.items() if previous.get(name) != value}
+
+
+def encode_json(kind, symbol, seq, update, changes=None):
+    if kind == SNAPSHOT:
+        if seq is None:
+            return json.dumps(update)
+        return json.dumps(dict(update, seq=seq))
+    return json.dumps({"type": "market_delta", "s": symbol, "seq": seq, "changes": changes})
+
+
+def encode_binary(kind, symbol, seq, fields):
+    symbol_bytes = symbol.encode('utf-8')
+    mask = 0
+    parts = []
+    for bit, (name, fmt) in enumerate(FIELDS):
+        if name not in fields:
+            continue
+        value = fields[name]
+        if name == 'trade_signal':
+            value = SIGNAL_CODES.get(value, 0)
+        elif fmt == 'B':
+            value = int(bool(value))
+        else:
+            value = float(value or 0.0)
+        mask |= 1 << bit
+        parts.append(_VALUE[fmt].pack(value))
+    return b''.join([
+        _HEADER.pack(kind, len(symbol_bytes)), symbol_bytes,
+        _SEQ_MASK.pack(seq & 0xFFFFFFFF, mask)
+    ] + parts)
+
+
+def decode_binary(data):
+    """binary ফ্রেম -> (kind, symbol, seq, fields); টেস্ট ও পাইথন ক্লায়েন্টের জন্য"""
+    kind, length = _HEADER.unpack_from(data, 0)
+    offset = _HEADER.size
+    symbol = data[offset:offset + length].decode('utf-8')
+    offset += length
+    seq, mask = _SEQ_MASK.unpack_from(data, offset)
+    offset += _SEQ_MASK.size
+    fields = {}
+    for bit, (name, fmt) in enumerate(FIELDS):
+        if not mask & (1 << bit):
+            continue
+        value, = _VALUE[fmt].unpack_from(data, offset)
+        offset += _VALUE[fmt].size
+        if name == 'trade_signal':
+            value = SIGNAL_NAMES.get(value, "NEUTRAL")
+        elif fmt == 'B':
+            value = bool(value)
+        fields[name] = value
+    return kind, symbol, seq, fields
+
+
+class FeedUpdate:
+    """
+    একটি সিম্বলের একটি পাবলিশড আপডেট। এনকোড করা ফলাফল ক্যাশ হয়, তাই একই এনকোডিং ও একই
+    বেস (আগের seq) এর সব ক্লায়েন্ট একই bytes/str শেয়ার করে — সিরিয়ালাইজেশন প্রতি টিকে একবারই।
+    """
+    __slots__ = ('symbol', 'seq', 'update', 'fields', 'previous', '_cache')
+
+    def __init__(self, symbol, seq, update, previous=None):
+        self.symbol = symbol
+        self.seq = seq
+        self.update = update
+        self.fields = flatten(update)
+        # আগের seq এর ফিল্ড (শেয়ার্ড ডেল্টার বেস)
+        self.previous = previous
+        self._cache = {}
+
+    def snapshot(self, encoding, with_seq=True):
+        key = (encoding, SNAPSHOT, with_seq)
+        if key not in self._cache:
+            if encoding == "binary":
+                self._cache[key] = encode_binary(SNAPSHOT, self.symbol, self.seq, self.fields)
+            else:
+                self._cache[key] = encode_json(SNAPSHOT, self.symbol, self.seq if with_seq else None, self.update)
+        return self._cache[key]
+
+    def delta(self, encoding, base_fields=None):
+        """base_fields None হলে আগের seq এর সাপেক্ষে (ক্যাশড), নাহলে ক্লায়েন্টের নিজস্ব বেসের সাপেক্ষে"""
+        shared = base_fields is None
+        key = (encoding, DELTA)
+        if shared and key in self._cache:
+            return self._cache[key]
+        changes = diff(self.previous if shared else base_fields, self.fields)
+        if changes is None:
+            return self.snapshot(encoding)
+        if encoding == "binary":
+            message = encode_binary(DELTA, self.symbol, self.seq, changes)
+        else:
+            message = encode_json(DELTA, self.symbol, self.seq, None, changes)
+        if shared:
+            self._cache[key] = message
+        return message
@@ -5,12 +5,17 @@ import os
 import joblib
 from sklearn.ensemble import RandomForestClassifier
 from app.services.technical_indicators import TechnicalIndicators
+from app.services.compute_executor import compute_executor
+from app.services.feature_frame import FeatureFrame
 
 # লগিং কনফিগারেশন
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("HybridEngine")
 
 class HybridStrategyEngine:
+    # ভোটিং কাউন্সিল যে কলামগুলো পড়ে (RSI ও EMA ট্রেন্ড); এআই ফিচার শুধু OHLCV থেকে তৈরি হয়
+    REQUIRED_FEATURES = ("RSI_14", "EMA_20", "EMA_50", "EMA_200")
+
     def __init__(self):
         self.ti_engine = TechnicalIndicators()
         self.model_path = "app/models/hybrid_ai_model.pkl"
@@ -44,83 +49,96 @@ class HybridStrategyEngine:
         logger.info("🌱 Initializing New AI Brain (Random Forest)...")
         return RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
 
-    def _get_voting_score(self, df):
+    def _get_voting_score(self, frame):
         """
         লেয়ার ১: ভোটিং কাউন্সিল (The Council of Indicators)
         ৭০+ ইন্ডিকেটর স্ক্যান করে ভোটিং স্কোর তৈরি করে।
         (Core i3 Optimized: Vectorized Calculation)
+        শেয়ার্ড FeatureFrame এর রিড-অনলি কলাম অ্যারে থেকে ভোট জমা হয়; ফ্রেম কপি বা নতুন কলাম লাগে না।
         """
         try:
-            # কপি তৈরি করি যাতে মূল ডাটা নষ্ট না হয়
-            work_df = df.copy()
-            
-            # ভোটিং কলাম তৈরি (শুরুতে সব ০)
-            work_df['vote_score'] = 0
+            columns = list(frame.columns)
+            column = frame.column
+
+            # ভোটিং অ্যারে (শুরুতে সব ০)
+            vote_score = np.zeros(len(frame), dtype=np.int64)
             
             # ---------------------------------------------------------
             # ডায়নামিক ইন্ডিকেটর স্ক্যানিং (Dynamic Scanning)
             # ---------------------------------------------------------
             
             # ১. RSI চেক (যেকোনো কলাম যার নামে RSI আছে)
-            rsi_cols = [c for c in work_df.columns if 'RSI' in c]
+            rsi_cols = [c for c in columns if 'RSI' in c]
             for col in rsi_cols:
-                work_df['vote_score'] += np.where(work_df[col] < self.rules['RSI']['buy'], 1, 0)
-                work_df['vote_score'] -= np.where(work_df[col] > self.rules['RSI']['sell'], 1, 0)
+                vote_score += column(col) < self.rules['RSI']['buy']
+                vote_score -= column(col) > self.rules['RSI']['sell']
 
             # ২. MACD চেক
-            if 'MACD' in work_df.columns and 'MACD_Signal' in work_df.columns:
-                work_df['vote_score'] += np.where(work_df['MACD'] > work_df['MACD_Signal'], 1, 0) # Cross Up
-                work_df['vote_score'] -= np.where(work_df['MACD'] < work_df['MACD_Signal'], 1, 0) # Cross Down
+            if 'MACD' in frame and 'MACD_Signal' in frame:
+                vote_score += column('MACD') > column('MACD_Signal') # Cross Up
+                vote_score -= column('MACD') < column('MACD_Signal') # Cross Down
 
             # ৩. Bollinger Bands চেক
-            if 'BB_Lower' in work_df.columns and 'close' in work_df.columns:
-                work_df['vote_score'] += np.where(work_df['close'] <= work_df['BB_Lower'], 1, 0) # Oversold
-                work_df['vote_score'] -= np.where(work_df['close'] >= work_df['BB_Upper'], 1, 0) # Overbought
+            if 'BB_Lower' in frame and 'close' in frame:
+                vote_score += column('close') <= column('BB_Lower') # Oversold
+                vote_score -= column('close') >= column('BB_Upper') # Overbought
 
             # ৪. EMA Trend চেক (Trend Following)
-            ema_cols = [c for c in work_df.columns if 'EMA' in c]
+            ema_cols = [c for c in columns if 'EMA' in c]
             if len(ema_cols) >= 2:
-                # ছোট ইএমএ (যেমন EMA 9) বড় ইএমএ (যেমন EMA 21) এর উপরে থাকলে বুলিশ
+                # ছোট ইএমএ (যেমন EMA 9) বড় ইএমএ (যেমন EMA 21) এর উপরে থাকলে বুলিশ
                 sorted_emas = sorted(ema_cols, key=lambda x: int(x.split('_')[-1]) if '_' in x else 0)
                 if len(sorted_emas) > 1:
-                    fast_ema = sorted_emas[0]
-                    slow_ema = sorted_emas[-1]
-                    work_df['vote_score'] += np.where(work_df[fast_ema] > work_df[slow_ema], 1, 0)
-                    work_df['vote_score'] -= np.where(work_df[fast_ema] < work_df[slow_ema], 1, 0)
+                    fast_ema = column(sorted_emas[0])
+                    slow_ema = column(sorted_emas[-1])
+                    vote_score += fast_ema > slow_ema
+                    vote_score -= fast_ema < slow_ema
 
             # ৫. SuperTrend (যদি থাকে)
-            if 'SuperTrend' in work_df.columns:
-                 work_df['vote_score'] += np.where(work_df['close'] > work_df['SuperTrend'], 2, 0) # পাওয়ারফুল সিগন্যাল (+2)
-                 work_df['vote_score'] -= np.where(work_df['close'] < work_df['SuperTrend'], 2, 0)
+            if 'SuperTrend' in frame:
+                 vote_score += 2 * (column('close') > column('SuperTrend')) # পাওয়ারফুল সিগন্যাল (+2)
+                 vote_score -= 2 * (column('close') < column('SuperTrend'))
 
             # স্কোর নরমালাইজেশন (-১০০ থেকে +১০০ এর মধ্যে আনা)
-            # ধরে নিলাম মোট ইন্ডিকেটর বা লজিক চেক হয়েছে প্রায় ২০-৩০টি।
+            # ধরে নিলাম মোট ইন্ডিকেটর বা লজিক চেক হয়েছে প্রায় ২০-৩০টি।
             # আমরা এটাকে স্কেল করবো।
             max_possible_score = len(rsi_cols) + len(ema_cols) + 5 # আনুমানিক সর্বোচ্চ ভোট
-            normalized_score = (work_df['vote_score'] / max_possible_score) * 100
-            
-            return normalized_score.fillna(0)
+            return (vote_score / max_possible_score) * 100
 
         except Exception as e:
             logger.error(f"❌ Voting Calculation Error: {e}")
-            return pd.Series([0]*len(df), index=df.index)
+            return np.zeros(len(frame))
 
-    def _get_ai_prediction(self, df, sentiment_score):
+    @staticmethod
+    def _market_features(frame):
+        """
+        এআই এর OHLCV ফিচার (price_change, volatility, volume_change) কলাম অ্যারে থেকে;
+        একই টিকে আবার লাগলে FeatureFrame এর ক্যাশ থেকে আসে।
+        """
+        close = frame.column('close').astype(np.float64, copy=False)
+        high = frame.column('high').astype(np.float64, copy=False)
+        low = frame.column('low').astype(np.float64, copy=False)
+        volume = frame.column('volume').astype(np.float64, copy=False)
+
+        def pct_change(values):
+            # pandas pct_change().fillna(0) এর সমান: প্রথম ভ্যালু ০, 0/0 -> ০
+            change = np.zeros(len(values))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                change[1:] = values[1:] / values[:-1] - 1
+            change[np.isnan(change)] = 0
+            return change
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volatility = (high - low) / close
+        volatility[np.isnan(volatility)] = 0
+        return pct_change(close), volatility, pct_change(volume)
+
+    def _get_ai_prediction(self, frame, sentiment_score):
         """
         লেয়ার ২: এআই জাজ (The AI Supreme Court)
         মডেল ব্যবহার করে ট্রেডের কনফিডেন্স চেক করে।
         """
         try:
-            # ফিচার ইঞ্জিনিয়ারিং (AI এর জন্য ইনপুট)
-            features = pd.DataFrame()
-            features['sentiment'] = sentiment_score
-            features['price_change'] = df['close'].pct_change().fillna(0)
-            features['volatility'] = (df['high'] - df['low']) / df['close']
-            features['volume_change'] = df['volume'].pct_change().fillna(0)
-            
-            # NaN ভ্যালু ক্লিন করা
-            features = features.fillna(0)
-            
             # মডেল যদি ট্রেইন করা না থাকে (শুরুর দিকে), তাহলে আমরা ভোটিং স্কোরকেই বিশ্বাস করব
             # এটি "Cold Start" সমস্যা সমাধান করে।
             try:
@@ -131,10 +149,19 @@ class HybridStrategyEngine:
                 is_fitted = False
 
             if not is_fitted:
-                # মডেল এখনো বাচ্চা, তাই সে ভোটিং স্কোরের ওপর ভিত্তি করে রায় দিবে
+                # মডেল এখনো বাচ্চা, তাই সে ভোটিং স্কোরের ওপর ভিত্তি করে রায় দিবে
                 # কিন্তু ডাটাগুলো মনে রাখবে শেখার জন্য (Future Logic)
                 probabilities = np.where(sentiment_score > 20, 0.6, 0.4) # >20 হলে ৬০% কনফিডেন্স
                 return probabilities
+
+            # ফিচার ইঞ্জিনিয়ারিং (AI এর জন্য ইনপুট), শুধু মডেল থাকলে তৈরি হয়
+            price_change, volatility, volume_change = frame.cached('hybrid_market_features', self._market_features)
+            features = pd.DataFrame({
+                'sentiment': np.nan_to_num(sentiment_score),
+                'price_change': price_change,
+                'volatility': volatility,
+                'volume_change': volume_change
+            })
             
             # আসল প্রেডিকশন
             # [Prob_Sell, Prob_Buy] -> আমরা Prob_Buy (index 1) নিব
@@ -143,25 +170,33 @@ class HybridStrategyEngine:
 
         except Exception as e:
             logger.error(f"❌ AI Prediction Error: {e}")
-            return np.zeros(len(df))
+            return np.zeros(len(frame))
+
+    def _score(self, frame):
+        """শেষ ক্যান্ডেলের (ভোটিং স্কোর, এআই কনফিডেন্স %)"""
+        # লেয়ার ১: ভোটিং স্কোর (Sentiment)
+        sentiment_scores = self._get_voting_score(frame)
+        current_sentiment = sentiment_scores[-1]
+        
+        # লেয়ার ২: এআই কনফিডেন্স (AI Probability)
+        ai_confidences = self._get_ai_prediction(frame, sentiment_scores)
+        current_confidence = ai_confidences[-1] * 100 # শতাংশে কনভার্ট
+        return current_sentiment, current_confidence
 
     async def get_hybrid_signal(self, dataframe):
         """
-        মেইন ফাংশন: এটি ভোটিং এবং এআই মিলিয়ে ফাইনাল সিদ্ধান্ত দিবে।
+        মেইন ফাংশন: এটি ভোটিং এবং এআই মিলিয়ে ফাইনাল সিদ্ধান্ত দিবে।
+        dataframe: ডাটাফ্রেম অথবা শেয়ার্ড FeatureFrame (রেফারেন্সেই পড়া হয়, কপি নয়)।
         """
-        if dataframe.empty:
+        frame = FeatureFrame.wrap(dataframe)
+        if frame.empty:
             return None
 
-        # ১. ইন্ডিকেটর ক্যালকুলেশন (TechnicalIndicators.py ব্যবহার করে)
-        df_with_indicators = self.ti_engine.apply_all_indicators(dataframe)
-        
-        # ২. লেয়ার ১: ভোটিং স্কোর (Sentiment)
-        sentiment_scores = self._get_voting_score(df_with_indicators)
-        current_sentiment = sentiment_scores.iloc[-1]
+        # ১. ইন্ডিকেটর ক্যালকুলেশন (শুধু ভোটিংয়ে লাগে এমনগুলো, প্রসেস পুলে; ইভেন্ট লুপ ফ্রি থাকে)
+        frame = await frame.require(self.REQUIRED_FEATURES)
         
-        # ৩. লেয়ার ২: এআই কনফিডেন্স (AI Probability)
-        ai_confidences = self._get_ai_prediction(df_with_indicators, sentiment_scores)
-        current_confidence = ai_confidences[-1] * 100 # শতাংশে কনভার্ট
+        # ২+৩. ভোটিং স্কোর ও এআই কনফিডেন্স (NumPy/sklearn, থ্রেড পুলে)
+        current_sentiment, current_confidence = await compute_executor.run_in_thread(self._score, frame)
         
         # ৪. ফাইনাল সিদ্ধান্ত (Decision Logic)
         signal = "NEUTRAL"
@@ -179,7 +214,7 @@ class HybridStrategyEngine:
             "sentiment_score": float(current_sentiment),
             "ai_confidence": float(current_confidence),
             "meta_data": {
-                "indicators_used": len(df_with_indicators.columns),
+                "indicators_used": len(frame.columns),
                 "strategy_mode": "Hybrid-Ensemble-v1"
             }
         }
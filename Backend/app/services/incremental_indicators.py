@@ -0,0 +1,609 @@
+import logging
+import math
+import pickle
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from app.services.ring_buffer import RingBuffer
+
+logger = logging.getLogger("IncrementalIndicators")
+
+NAN = float("nan")
+EPSILON = np.finfo(float).eps
+
+# ব্যাচ পাথ (TechnicalIndicators.apply_all_indicators) যে ক্রমে কলাম তৈরি করে, হুবহু সেই ক্রম
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+INDICATOR_COLUMNS = [
+    # Trend
+    'SMA_20', 'EMA_20', 'EMA_50', 'EMA_200',
+    'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9',
+    'PSARl_0.02_0.2', 'PSARs_0.02_0.2', 'PSARaf_0.02_0.2', 'PSARr_0.02_0.2',
+    'ADX_14', 'ADXR_14_2', 'DMP_14', 'DMN_14',
+    'ISA_9', 'ISB_26', 'ITS_9', 'IKS_26', 'ICS_26',
+    'SUPERT_7_3.0', 'SUPERTd_7_3.0', 'SUPERTl_7_3.0', 'SUPERTs_7_3.0',
+    'LINREG_14',
+    # Momentum
+    'RSI_14', 'STOCHk_14_3_3', 'STOCHd_14_3_3', 'STOCHh_14_3_3',
+    'CCI_14_0.015', 'WILLR_14', 'AO_5_34', 'ROC_10', 'MOM_10', 'UO_7_14_28',
+    # Volume
+    'OBV', 'MFI_14', 'CMF_20', 'AD', 'EOM_14_100000000',
+    'vp_poc', 'vp_vah', 'vp_val',
+    # Volatility
+    'BBL_5_2.0_2.0', 'BBM_5_2.0_2.0', 'BBU_5_2.0_2.0', 'BBB_5_2.0_2.0', 'BBP_5_2.0_2.0',
+    'ATRr_14', 'KCLe_20_2', 'KCBe_20_2', 'KCUe_20_2', 'CHOP_14_1_100.0',
+    # Special
+    'ewo', 'fractal_top', 'pivot_p', 'gann_angle',
+    'market_phase',
+]
+COLUMNS = OHLCV_COLUMNS + INDICATOR_COLUMNS
+
+MARKET_PHASES = np.array(['Accumulation', 'Markup', 'Distribution', 'Markdown', 'Consolidation'], dtype=object)
+CONSOLIDATION = 4.0
+
+# ব্যাচ পাথের লেন্থ-গেট (EMA_200 এর জন্য len > 200) পার না হওয়া পর্যন্ত ইনক্রিমেন্টাল আউটপুট ব্যবহার করা যাবে না
+WARMUP_BARS = 201
+
+# ফিউচার-লুকিং কলাম: Chikou (ICS) = close.shift(-25), Fractal = high.shift(-1/-2)
+ICHIMOKU_LAG = 25
+FRACTAL_LAG = 2
+
+
+def _div(a, b):
+    """NumPy এর মতো ভাগ: শূন্য দিয়ে ভাগে exception এর বদলে inf/NaN।"""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != a or a == 0:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def _log10(x):
+    if x != x or x < 0:
+        return NAN
+    return math.log10(x) if x > 0 else -math.inf
+
+
+def _non_zero(x):
+    # pandas_ta non_zero_range: শূন্য রেঞ্জে epsilon যোগ
+    return x if x != 0 else EPSILON
+
+
+def _nanmean(values):
+    valid = [v for v in values if v == v]
+    return sum(valid) / len(valid) if valid else NAN
+
+
+class _Ewm:
+    """
+    pandas `Series.ewm(...).mean()` (ignore_na=False) এর হুবহু রিকার্সিভ রূপ।
+    প্রতি বারে O(1)।
+    """
+    def __init__(self, alpha, adjust=False, min_periods=0):
+        self.factor = 1.0 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        is_obs = x == x
+        self.nobs += is_obs
+        if self.weighted == self.weighted:
+            self.old_wt *= self.factor
+            if is_obs:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + self.new_wt * x) / (self.old_wt + self.new_wt)
+                self.old_wt = self.old_wt + self.new_wt if self.adjust else 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+
+class _Ema:
+    """pandas_ta ema (presma=True): প্রথম `length` টি ভ্যালিড ভ্যালুর SMA দিয়ে সিড, তারপর ewm(span)।"""
+    def __init__(self, length):
+        self.length = length
+        self.seed = []
+        self.ewm = _Ewm(2.0 / (length + 1))
+
+    def update(self, x):
+        if len(self.seed) < self.length:
+            # শুরুর NaN বাদ (pandas_ta first_valid_index থেকে স্লাইস করে)
+            if x != x and not self.seed:
+                return NAN
+            self.seed.append(x)
+            if len(self.seed) < self.length:
+                return NAN
+            x = _nanmean(self.seed)
+        return self.ewm.update(x)
+
+
+class _Atr:
+    """pandas_ta atr (presma=True, mamode='rma')। True Range বাইরে থেকে দেওয়া হয়।"""
+    def __init__(self, length):
+        self.length = length
+        self.seed = []
+        self.rma = _Ewm(1.0 / length)
+
+    def update(self, tr):
+        if len(self.seed) < self.length:
+            self.seed.append(tr)
+            if len(self.seed) < self.length:
+                return NAN
+            tr = _nanmean(self.seed)
+        return self.rma.update(tr)
+
+
+class _Window:
+    """ফিক্সড সাইজ রোলিং উইন্ডো। pandas rolling(n) এর মতো উইন্ডো পূর্ণ না হলে NaN।"""
+    def __init__(self, length):
+        self.length = length
+        self.values = deque(maxlen=length)
+
+    def push(self, x):
+        self.values.append(x)
+
+    @property
+    def full(self):
+        return len(self.values) == self.length
+
+    def sum(self):
+        return sum(self.values) if self.full else NAN
+
+    def mean(self):
+        return sum(self.values) / self.length if self.full else NAN
+
+    def std(self):
+        if not self.full:
+            return NAN
+        m = sum(self.values) / self.length
+        return math.sqrt(sum((v - m) ** 2 for v in self.values) / (self.length - 1))
+
+    def max(self):
+        return max(self.values) if self.full else NAN
+
+    def min(self):
+        return min(self.values) if self.full else NAN
+
+
+class _Psar:
+    """pandas_ta psar (af0=0.02, max_af=0.2, close=None) এর স্টেট মেশিন।"""
+    def __init__(self, af0=0.02, max_af=0.2):
+        self.af0 = af0
+        self.max_af = max_af
+        self.count = 0
+        self.prev_high = NAN
+        self.prev_low = NAN
+
+    def update(self, high, low):
+        if self.count == 0:
+            self.count = 1
+            self.prev_high, self.prev_low = high, low
+            return NAN, NAN, self.af0, 0.0
+
+        if self.count == 1:
+            # প্রথম দুই ক্যান্ডেলের -DM দেখে দিক নির্ধারণ (_falling)
+            up = high - self.prev_high
+            dn = self.prev_low - low
+            dmn = dn if (dn > up and dn > 0) else 0.0
+            self.falling = abs(dmn) >= EPSILON and dmn > 0
+            self.ep = self.prev_low if self.falling else self.prev_high
+            self.sar = self.prev_high if self.falling else self.prev_low
+            self.af = self.af0
+            self.count = 2
+
+        sar = self.sar + self.af * (self.ep - self.sar)
+        if self.falling:
+            reverse = high > sar
+            if low < self.ep:
+                self.ep = low
+                self.af = min(self.af + self.af0, self.max_af)
+            sar = max(self.prev_high, sar)
+        else:
+            reverse = low < sar
+            if high > self.ep:
+                self.ep = high
+                self.af = min(self.af + self.af0, self.max_af)
+            sar = min(self.prev_low, sar)
+
+        if reverse:
+            sar = self.ep
+            self.af = self.af0
+            self.falling = not self.falling
+            self.ep = low if self.falling else high
+
+        self.sar = sar
+        self.prev_high, self.prev_low = high, low
+        long_, short_ = (NAN, sar) if self.falling else (sar, NAN)
+        return long_, short_, self.af, float(reverse)
+
+
+class _IndicatorState:
+    """
+    একটি সিম্বলের সব ইন্ডিকেটরের রানিং স্টেট।
+    সব উইন্ডো সর্বোচ্চ ৫২ বার লম্বা, তাই কপি/আপডেট খরচ বাফারের দৈর্ঘ্যের ওপর নির্ভর করে না।
+    """
+    def __init__(self):
+        self.count = 0
+        self.last = None  # আগের ক্যান্ডেলের (open, high, low, close, volume)
+
+        # Trend
+        self.sma20 = _Window(20)
+        self.ema20, self.ema50, self.ema200 = _Ema(20), _Ema(50), _Ema(200)
+        self.ema12, self.ema26, self.macd_signal = _Ema(12), _Ema(26), _Ema(9)
+        self.psar = _Psar()
+        self.adx_atr = _Atr(14)
+        self.adx_pos, self.adx_neg, self.adx_dx = _Ewm(1 / 14), _Ewm(1 / 14), _Ewm(1 / 14)
+        self.adx_history = deque([NAN, NAN], maxlen=2)
+        self.high9, self.low9 = _Window(9), _Window(9)
+        self.high26, self.low26 = _Window(26), _Window(26)
+        self.high52, self.low52 = _Window(52), _Window(52)
+        self.span_a = deque([NAN] * ICHIMOKU_LAG, maxlen=ICHIMOKU_LAG)
+        self.span_b = deque([NAN] * ICHIMOKU_LAG, maxlen=ICHIMOKU_LAG)
+        self.st_atr = _Atr(7)
+        self.st_dir = 1.0
+        self.st_lb = NAN
+        self.st_ub = NAN
+        self.close14 = _Window(14)
+
+        # Momentum
+        self.rsi_pos, self.rsi_neg = _Ewm(1 / 14), _Ewm(1 / 14)
+        self.high14, self.low14 = _Window(14), _Window(14)
+        self.stoch_k, self.stoch_d = _Window(3), _Window(3)
+        self.tp14 = _Window(14)
+        self.median5, self.median34 = _Window(5), _Window(34)
+        self.close11 = _Window(11)
+        self.uo_bp = (_Window(7), _Window(14), _Window(28))
+        self.uo_tr = (_Window(7), _Window(14), _Window(28))
+
+        # Volume
+        self.obv = NAN
+        self.last_tp = NAN
+        self.mfi_pos, self.mfi_neg = _Window(14), _Window(14)
+        self.cmf_ad, self.cmf_vol = _Window(20), _Window(20)
+        self.ad = 0.0
+        self.eom = _Window(14)
+        self.close24 = _Window(24)
+
+        # Volatility
+        self.close5 = _Window(5)
+        self.atr14 = _Atr(14)
+        self.kc_basis, self.kc_band = _Ema(20), _Ema(20)
+        self.chop_tr = _Window(14)
+
+        # Special / Phase
+        self.close35 = _Window(35)
+        self.atr_avg = _Window(20)
+
+    def step(self, o, h, l, c, v):
+        """একটি ক্যান্ডেল প্রসেস করে INDICATOR_COLUMNS ক্রমে ভ্যালুর লিস্ট রিটার্ন করে।"""
+        first = self.last is None
+        pc = NAN if first else self.last[3]
+        ph = NAN if first else self.last[1]
+        pl = NAN if first else self.last[2]
+
+        hl = h - l
+        tr = abs(hl) if first else max(abs(hl), abs(h - pc), abs(pc - l))
+        hl2 = 0.5 * (h + l)
+
+        # ---------------- Trend ----------------
+        self.sma20.push(c)
+        sma20 = self.sma20.mean()
+        ema20, ema50, ema200 = self.ema20.update(c), self.ema50.update(c), self.ema200.update(c)
+
+        macd = self.ema12.update(c) - self.ema26.update(c)
+        macd_s = self.macd_signal.update(macd)
+        macd_h = macd - macd_s
+
+        psar_l, psar_s, psar_af, psar_r = self.psar.update(h, l)
+
+        # ADX: atr(prenan=True) -> প্রথম TR বাদ
+        adx_atr = self.adx_atr.update(NAN if first else tr)
+        if first:
+            pos = neg = NAN
+        else:
+            up, dn = h - ph, pl - l
+            pos = up if (up > dn and up > 0) else 0.0
+            neg = dn if (dn > up and dn > 0) else 0.0
+            pos = 0.0 if abs(pos) < EPSILON else pos
+            neg = 0.0 if abs(neg) < EPSILON else neg
+        k = _div(100.0, adx_atr)
+        dmp = k * self.adx_pos.update(pos)
+        dmn = k * self.adx_neg.update(neg)
+        dx = _div(100.0 * abs(dmp - dmn), dmp + dmn)
+        adx = self.adx_dx.update(dx)
+        adxr = 0.5 * (adx + self.adx_history[0])
+        self.adx_history.append(adx)
+
+        # Ichimoku (ISA/ISB ২৫ বার পিছিয়ে, ICS পরে প্যাচ হবে)
+        for w, x in ((self.high9, h), (self.high26, h), (self.high52, h)):
+            w.push(x)
+        for w, x in ((self.low9, l), (self.low26, l), (self.low52, l)):
+            w.push(x)
+        tenkan = 0.5 * (self.low9.min() + self.high9.max())
+        kijun = 0.5 * (self.low26.min() + self.high26.max())
+        isa, isb = self.span_a[0], self.span_b[0]
+        self.span_a.append(0.5 * (tenkan + kijun))
+        self.span_b.append(0.5 * (self.low52.min() + self.high52.max()))
+
+        # SuperTrend (7, 3.0)
+        st_atr = self.st_atr.update(tr)
+        lb, ub = hl2 - 3.0 * st_atr, hl2 + 3.0 * st_atr
+        if first:
+            st_dir = 1.0
+        elif c > self.st_ub:
+            st_dir = 1.0
+        elif c < self.st_lb:
+            st_dir = -1.0
+        else:
+            st_dir = self.st_dir
+            if st_dir > 0 and lb < self.st_lb:
+                lb = self.st_lb
+            if st_dir < 0 and ub > self.st_ub:
+                ub = self.st_ub
+        self.st_dir, self.st_lb, self.st_ub = st_dir, lb, ub
+        if st_dir > 0:
+            supert, supert_l, supert_s = lb, lb, NAN
+        else:
+            supert, supert_l, supert_s = ub, NAN, ub
+        if first:
+            supert = NAN
+        supert_d = st_dir if self.count >= 7 else NAN
+
+        # Linear Regression (14)
+        self.close14.push(c)
+        linreg = NAN
+        if self.close14.full:
+            n = 14
+            x_sum = 0.5 * n * (n + 1)
+            x2_sum = x_sum * (2 * n + 1) / 3
+            divisor = n * x2_sum - x_sum * x_sum
+            y_sum = sum(self.close14.values)
+            xy_sum = sum((i + 1) * y for i, y in enumerate(self.close14.values))
+            m = (n * xy_sum - x_sum * y_sum) / divisor
+            b = (y_sum * x2_sum - x_sum * xy_sum) / divisor
+            linreg = m * n + b
+
+        # ---------------- Momentum ----------------
+        diff = c - pc
+        rsi_p = self.rsi_pos.update(NAN if first else max(diff, 0.0))
+        rsi_n = self.rsi_neg.update(NAN if first else min(diff, 0.0))
+        rsi = _div(100.0 * rsi_p, rsi_p + abs(rsi_n))
+
+        self.high14.push(h)
+        self.low14.push(l)
+        hh14, ll14 = self.high14.max(), self.low14.min()
+        rng14 = hh14 - ll14
+        stoch_raw = _div(100.0 * (c - ll14), _non_zero(rng14))
+        self.stoch_k.push(stoch_raw)
+        stoch_k = self.stoch_k.mean()
+        self.stoch_d.push(stoch_k)
+        stoch_d = self.stoch_d.mean()
+
+        tp = (h + l + c) / 3.0
+        self.tp14.push(tp)
+        cci = NAN
+        if self.tp14.full:
+            tp_mean = self.tp14.mean()
+            mad = sum(abs(x - tp_mean) for x in self.tp14.values) / 14
+            # pandas_ta এর অপারেটর প্রিসিডেন্স হুবহু রাখা হয়েছে (ব্যাচ প্যারিটির জন্য)
+            cci = tp - _div(tp_mean, 0.015 * mad)
+
+        willr = 100.0 * (_div(c - ll14, rng14) - 1)
+
+        self.median5.push(hl2)
+        self.median34.push(hl2)
+        ao = self.median5.mean() - self.median34.mean()
+
+        self.close11.push(c)
+        c10 = self.close11.values[0] if self.close11.full else NAN
+        roc = _div(100.0 * (c - c10), c10)
+        mom = c - c10
+
+        max_h_pc = h if first else max(h, pc)
+        min_l_pc = l if first else min(l, pc)
+        uo_avgs = []
+        for bp_w, tr_w in zip(self.uo_bp, self.uo_tr):
+            bp_w.push(c - min_l_pc)
+            tr_w.push(max_h_pc - min_l_pc)
+            uo_avgs.append(_div(bp_w.sum(), tr_w.sum()))
+        uo = 100.0 * (4.0 * uo_avgs[0] + 2.0 * uo_avgs[1] + uo_avgs[2]) / 7.0
+
+        # ---------------- Volume ----------------
+        if not first:
+            sign = 1.0 if diff > 0 else (-1.0 if diff < 0 else 0.0)
+            self.obv = sign * v if self.obv != self.obv else self.obv + sign * v
+        obv = self.obv
+
+        smf = tp * v * (1.0 if (not first and tp > self.last_tp) else -1.0)
+        self.last_tp = tp
+        self.mfi_pos.push(max(smf, 0.0))
+        self.mfi_neg.push(max(-smf, 0.0))
+        mfi = NAN
+        if self.count >= 14:
+            gain, loss = self.mfi_pos.sum(), self.mfi_neg.sum()
+            mfi = _div(100.0 * gain, gain + loss + EPSILON)
+
+        ad_bar = (2 * c - (h + l)) * _div(v, _non_zero(hl))
+        self.cmf_ad.push(ad_bar)
+        self.cmf_vol.push(v)
+        cmf = _div(self.cmf_ad.sum(), self.cmf_vol.sum())
+        self.ad += ad_bar
+
+        eom_bar = NAN if first else _div(hl2 - 0.5 * (ph + pl), v / 100000000 / _non_zero(hl))
+        self.eom.push(eom_bar)
+        eom = self.eom.mean()
+
+        self.close24.push(c)
+        vp_mean, vp_std = self.close24.mean(), self.close24.std()
+
+        # ---------------- Volatility ----------------
+        self.close5.push(c)
+        bbm = self.close5.mean()
+        bb_std = self.close5.std()
+        bbl, bbu = bbm - 2.0 * bb_std, bbm + 2.0 * bb_std
+        bb_range = _non_zero(bbu - bbl)
+        bbb = _div(100 * bb_range, bbm)
+        bbp = _div(_non_zero(c - bbl), bb_range)
+
+        atr14 = self.atr14.update(tr)
+        kc_basis = self.kc_basis.update(c)
+        kc_band = self.kc_band.update(tr)
+
+        self.chop_tr.push(tr)
+        chop = 100.0 * (_log10(self.chop_tr.sum()) - _log10(rng14)) / math.log10(14)
+
+        # ---------------- Special ----------------
+        self.close35.push(c)
+        ewo = bbm - self.close35.mean()
+
+        # ---------------- Market Phase ----------------
+        # র ১ মিনিট স্ট্রিমে turnover/vol_buy/vol_sell নেই, তাই vwap = close এবং delta = 0
+        self.atr_avg.push(atr14)
+        atr_avg = self.atr_avg.mean()
+        is_high_vol = atr14 > atr_avg
+        vwap, delta = c, 0.0
+        if c <= vwap and not is_high_vol and delta > 0:
+            phase = 0.0
+        elif c > vwap and delta > 0:
+            phase = 1.0
+        elif c > vwap and is_high_vol and delta < 0:
+            phase = 2.0
+        elif c < vwap and delta < 0:
+            phase = 3.0
+        else:
+            phase = CONSOLIDATION
+
+        self.last = (o, h, l, c, v)
+        self.count += 1
+
+        return [
+            sma20, ema20, ema50, ema200,
+            macd, macd_h, macd_s,
+            psar_l, psar_s, psar_af, psar_r,
+            adx, adxr, dmp, dmn,
+            isa, isb, tenkan, kijun, NAN,
+            supert, supert_d, supert_l, supert_s,
+            linreg,
+            rsi, stoch_k, stoch_d, stoch_k - stoch_d,
+            cci, willr, ao, roc, mom, uo,
+            obv, mfi, cmf, self.ad, eom,
+            vp_mean, vp_mean + vp_std, vp_mean - vp_std,
+            bbl, bbm, bbu, bbb, bbp,
+            atr14, kc_basis - 2 * kc_band, kc_basis, kc_basis + 2 * kc_band, chop,
+            ewo, 0.0, tp, 45.0,
+            phase,
+        ]
+
+
+class IncrementalIndicators:
+    """
+    স্টেটফুল (স্ট্রিমিং) ইন্ডিকেটর ইঞ্জিন।
+    প্রতিটি নতুন বা রিভাইজড ক্যান্ডেলে সব ইন্ডিকেটর O(1) এ আপডেট হয়, পুরো বাফার রি-ক্যালকুলেট হয় না।
+    আউটপুট কলামের নাম ও ভ্যালু TechnicalIndicators.apply_all_indicators এর সাথে মিলে যায়
+    (একই হিস্ট্রির ওপর চালালে)। OBV/AD এর মতো কিউমুলেটিভ কলাম ইঞ্জিনের প্রথম ক্যান্ডেল থেকে গোনা হয়।
+    """
+    def __init__(self, capacity=1500):
+        self.capacity = capacity
+        self._live = _IndicatorState()
+        self._committed = None
+        self._history = RingBuffer(COLUMNS, capacity)
+        self._high_history = deque(maxlen=FRACTAL_LAG * 2 + 1)
+
+    @property
+    def count(self):
+        """এ পর্যন্ত প্রসেস হওয়া ক্যান্ডেল সংখ্যা।"""
+        return self._live.count
+
+    @property
+    def is_ready(self):
+        return self._live.count >= WARMUP_BARS
+
+    def reset(self):
+        self.__init__(self.capacity)
+
+    def warmup(self, df):
+        """হিস্টোরিক্যাল ডাটাফ্রেম (OHLCV, DatetimeIndex) দিয়ে স্টেট তৈরি করে।"""
+        self.reset()
+        if df is None or df.empty:
+            return self
+        data = df[OHLCV_COLUMNS].apply(pd.to_numeric, errors='coerce').ffill().fillna(0)
+        index = pd.DatetimeIndex(data.index)
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        for ts, row in zip(index, data.itertuples(index=False, name=None)):
+            self.update(ts, *row, new_bar=True)
+        logger.info(f"⚡ Incremental indicators warmed up with {len(data)} candles")
+        return self
+
+    def update(self, timestamp, open_, high, low, close, volume, new_bar=True):
+        """
+        নতুন ক্যান্ডেল (new_bar=True) অথবা চলমান ক্যান্ডেলের রিভিশন (new_bar=False) প্রসেস করে।
+        রিভিশনে শেষ কমিটেড স্টেট থেকে আবার হিসাব হয়, তাই একই মিনিটে যত টিকই আসুক ফলাফল একই।
+        """
+        new_row = new_bar or self._committed is None
+        if new_row:
+            # কমিটেড স্টেট বাইটস হিসেবে রাখা (deepcopy এর চেয়ে pickle রাউন্ড-ট্রিপ দ্রুত)
+            self._committed = pickle.dumps(self._live, pickle.HIGHEST_PROTOCOL)
+        else:
+            self._live = pickle.loads(self._committed)
+            self._high_history.pop()
+
+        bar = self._clean(open_, high, low, close, volume)
+        self._high_history.append(bar[1])
+
+        values = self._live.step(*bar)
+        self._history.upsert(timestamp, bar + values, new_row)
+        self._patch_lookahead(close=bar[3])
+        return values
+
+    def _clean(self, *bar):
+        # ব্যাচ পাথের to_numeric + ffill + fillna(0) এর সমতুল্য
+        last = self._live.last
+        cleaned = []
+        for i, x in enumerate(bar):
+            try:
+                x = float(x)
+            except (TypeError, ValueError):
+                x = NAN
+            if x != x:
+                x = last[i] if last is not None else 0.0
+            cleaned.append(x)
+        return cleaned
+
+    def _patch_lookahead(self, close):
+        """ভবিষ্যতের ক্যান্ডেল লাগে এমন কলাম (ICS_26, fractal_top) পেছনের রো-তে বসানো।"""
+        size = len(self._history)
+        if size > ICHIMOKU_LAG:
+            self._history.set(ICHIMOKU_LAG, 'ICS_26', close)
+        if len(self._high_history) == self._high_history.maxlen and size > FRACTAL_LAG:
+            h = list(self._high_history)
+            mid = h[FRACTAL_LAG]
+            is_top = h[0] < mid and h[1] < mid and h[3] < mid and h[4] < mid
+            self._history.set(FRACTAL_LAG, 'fractal_top', float(is_top))
+
+    def latest(self):
+        """সর্বশেষ রো ডিকশনারি হিসেবে (NaN -> 0, ব্যাচ পাথের fillna(0) এর মতো)।"""
+        latest = {k: (0.0 if v != v else v) for k, v in self._history.last_row().items()}
+        if latest:
+            latest['fractal_top'] = bool(latest['fractal_top'])
+            latest['gann_angle'] = 45
+            latest['market_phase'] = MARKET_PHASES[int(latest['market_phase'])]
+        return latest
+
+    def to_frame(self):
+        """বাফারের সব রো সহ ডাটাফ্রেম, apply_all_indicators এর আউটপুটের মতো কলাম ও টাইপ।"""
+        if self._history.empty:
+            return pd.DataFrame()
+        df = self._history.to_frame()
+        df.fillna(0, inplace=True)
+        df['fractal_top'] = df['fractal_top'].astype(bool)
+        df['gann_angle'] = 45
+        df['market_phase'] = MARKET_PHASES[df['market_phase'].to_numpy(dtype='int64')]
+        df.attrs['indicators_applied'] = True
+        return df
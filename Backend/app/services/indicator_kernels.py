@@ -0,0 +1,333 @@
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba ঐচ্ছিক; না থাকলে NumPy/pandas ফলব্যাক
+    njit = None
+    NUMBA_AVAILABLE = False
+
+logger = logging.getLogger("IndicatorKernels")
+
+NAN = np.nan
+EPSILON = np.finfo(float).eps
+BACKENDS = ("pandas_ta", "numpy", "numba")
+
+
+# ============================================================
+# রিকার্সিভ লুপ (numba থাকলে JIT, নাহলে সাধারণ পাইথন)
+# ============================================================
+def _ewm_loop(x, alpha):
+    """pandas ewm(alpha, adjust=False, ignore_na=False).mean() এর হুবহু লুপ"""
+    n = x.shape[0]
+    out = np.empty(n)
+    factor = 1.0 - alpha
+    weighted = NAN
+    old_wt = 1.0
+    started = False
+    for i in range(n):
+        cur = x[i]
+        is_obs = cur == cur
+        if started:
+            old_wt *= factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+            started = True
+        out[i] = weighted
+    return out
+
+
+def _psar_loop(high, low, af0, max_af, falling):
+    """pandas_ta psar (close=None) এর স্টেট মেশিন"""
+    m = high.shape[0]
+    long_ = np.full(m, NAN)
+    short = np.full(m, NAN)
+    af_out = np.zeros(m)
+    reversal = np.zeros(m, dtype=np.int64)
+    af_out[:2] = af0
+    af = af0
+    ep = low[0] if falling else high[0]
+    sar = high[0] if falling else low[0]
+    for i in range(1, m):
+        sar = sar + af * (ep - sar)
+        if falling:
+            reverse = high[i] > sar
+            if low[i] < ep:
+                ep = low[i]
+                af = min(af + af0, max_af)
+            sar = max(high[i - 1], sar)
+        else:
+            reverse = low[i] < sar
+            if high[i] > ep:
+                ep = high[i]
+                af = min(af + af0, max_af)
+            sar = min(low[i - 1], sar)
+        if reverse:
+            sar = ep
+            af = af0
+            falling = not falling
+            ep = low[i] if falling else high[i]
+        if falling:
+            short[i] = sar
+        else:
+            long_[i] = sar
+        af_out[i] = af
+        reversal[i] = 1 if reverse else 0
+    return long_, short, af_out, reversal
+
+
+def _supertrend_loop(close, lb, ub, length):
+    """pandas_ta supertrend এর ব্যান্ড-ফ্লিপ লুপ (lb/ub ইন-প্লেস বদলায়)"""
+    m = close.shape[0]
+    direction = np.ones(m)
+    trend = np.zeros(m)
+    long_ = np.full(m, NAN)
+    short = np.full(m, NAN)
+    for i in range(1, m):
+        if close[i] > ub[i - 1]:
+            direction[i] = 1.0
+        elif close[i] < lb[i - 1]:
+            direction[i] = -1.0
+        else:
+            direction[i] = direction[i - 1]
+            if direction[i] > 0 and lb[i] < lb[i - 1]:
+                lb[i] = lb[i - 1]
+            if direction[i] < 0 and ub[i] > ub[i - 1]:
+                ub[i] = ub[i - 1]
+        if direction[i] > 0:
+            trend[i] = lb[i]
+            long_[i] = lb[i]
+        else:
+            trend[i] = ub[i]
+            short[i] = ub[i]
+    if m > 0:
+        trend[0] = NAN
+    direction[:length] = NAN
+    return trend, direction, long_, short
+
+
+# ============================================================
+# ভেক্টর হেল্পার
+# ============================================================
+def _shift(x, periods=1):
+    out = np.empty_like(x)
+    out[:periods] = NAN
+    out[periods:] = x[:-periods]
+    return out
+
+
+def _non_zero_range(x, y):
+    # pandas_ta non_zero_range: কোনো পার্থক্য শূন্য হলে পুরো সিরিজে epsilon যোগ
+    diff = x - y
+    if (diff == 0).any():
+        diff = diff + EPSILON
+    return diff
+
+
+def _sma(x, length):
+    """pandas_ta sma (convolution), প্রথম length-1 টি NaN"""
+    if x.shape[0] < length:
+        return None
+    result = np.convolve(np.ones(length) / length, x)[length - 1:1 - length]
+    return np.concatenate((np.full(length - 1, NAN), result))
+
+
+def _rolling(x, length, reducer):
+    out = np.full(x.shape[0], NAN)
+    if x.shape[0] >= length:
+        out[length - 1:] = reducer(sliding_window_view(x, length), axis=1)
+    return out
+
+
+def _first_valid(x):
+    valid = np.flatnonzero(x == x)
+    return int(valid[0]) if valid.size else None
+
+
+class IndicatorKernels:
+    """
+    ভারী ইন্ডিকেটরের নেটিভ ব্যাকএন্ড: contiguous float64 অ্যারে নেয় ও অ্যারে ফেরত দেয়, কোনো ডাটাফ্রেম কপি নেই।
+    রোলিং/কনভলিউশন অংশ NumPy ভেক্টরাইজড; রিকার্সিভ অংশ (EWM, PSAR, SuperTrend) numba থাকলে JIT,
+    নাহলে EWM pandas এর Cython ewm এ আর বাকি লুপ সাধারণ পাইথনে চলে।
+    ফলাফল pandas_ta (talib ছাড়া) এর ডিফল্ট প্যারামিটারের আউটপুটের সাথে টলারেন্সের মধ্যে মেলে
+    (TechnicalIndicators.verify_native_backend)। ডাটা যথেষ্ট না হলে pandas_ta এর মতো None।
+    """
+    def __init__(self, use_numba=True):
+        self.use_numba = use_numba and NUMBA_AVAILABLE
+        if use_numba and not NUMBA_AVAILABLE:
+            logger.warning("⚠️ numba not installed, native indicator kernels fall back to NumPy")
+        if self.use_numba:
+            self._ewm_loop = njit(cache=True)(_ewm_loop)
+            self._psar_loop = njit(cache=True)(_psar_loop)
+            self._supertrend_loop = njit(cache=True)(_supertrend_loop)
+        else:
+            self._ewm_loop = None
+            self._psar_loop = _psar_loop
+            self._supertrend_loop = _supertrend_loop
+
+    @property
+    def name(self):
+        return "numba" if self.use_numba else "numpy"
+
+    def warmup(self):
+        """JIT কম্পাইল আগেই (ওয়ার্কার প্রসেস স্টার্টে), যাতে প্রথম টিকে কম্পাইলের দেরি না হয়"""
+        x = np.linspace(1.0, 2.0, 64)
+        self.ema(x, 10)
+        self.psar(x + 0.1, x - 0.1)
+        self.supertrend(x + 0.1, x - 0.1, x)
+
+    def _ewm(self, x, alpha):
+        if self.use_numba:
+            return self._ewm_loop(x, alpha)
+        import pandas as pd
+        return pd.Series(x, copy=False).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+    # ============================================================
+    # কার্নেল
+    # ============================================================
+    def ema(self, close, length=10):
+        """EMA (presma: প্রথম length টির SMA দিয়ে সিড)"""
+        if close.shape[0] < length:
+            return None
+        seeded = close.copy()
+        seeded[length - 1] = close[:length].mean()
+        seeded[:length - 1] = NAN
+        return self._ewm(seeded, 2.0 / (length + 1))
+
+    def rsi(self, close, length=14):
+        if close.shape[0] < length + 1:
+            return None
+        diff = close - _shift(close)
+        positive = self._ewm(np.where(diff < 0, 0.0, diff), 1.0 / length)
+        negative = self._ewm(np.where(diff > 0, 0.0, diff), 1.0 / length)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100 * positive / (positive + np.abs(negative))
+
+    def true_range(self, high, low, close, prenan=False):
+        prev_close = _shift(close)
+        tr = np.fmax(np.fmax(np.abs(_non_zero_range(high, low)), np.abs(high - prev_close)), np.abs(prev_close - low))
+        if prenan:
+            tr[:1] = NAN
+        return tr
+
+    def atr(self, high, low, close, length=14, prenan=False):
+        """ATR (RMA, presma), pandas_ta এর ATRr_<length>"""
+        if close.shape[0] < length + 1:
+            return None
+        tr = self.true_range(high, low, close, prenan)
+        if np.isnan(tr).all():
+            return None
+        seed = tr[:length]
+        tr[length - 1] = np.nanmean(seed) if (seed == seed).any() else NAN
+        tr[:length - 1] = NAN
+        atr = self._ewm(tr, 1.0 / length)
+        return None if np.isnan(atr).all() else atr
+
+    def adx(self, high, low, close, length=14, adxr_length=2):
+        """(ADX, ADXR, DMP, DMN)"""
+        if close.shape[0] < max(length, adxr_length):
+            return None
+        atr = self.atr(high, low, close, length, prenan=True)
+        if atr is None:
+            return None
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = 100 / atr
+            up = high - _shift(high)
+            dn = _shift(low) - low
+            pos = np.where((up > dn) & (up > 0), up, 0.0)
+            neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+            pos[:1] = NAN
+            neg[:1] = NAN
+            pos[np.abs(pos) < EPSILON] = 0.0
+            neg[np.abs(neg) < EPSILON] = 0.0
+            dmp = k * self._ewm(pos, 1.0 / length)
+            dmn = k * self._ewm(neg, 1.0 / length)
+            dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+        adx = self._ewm(dx, 1.0 / length)
+        adxr = 0.5 * (adx + _shift(adx, adxr_length))
+        return adx, adxr, dmp, dmn
+
+    def supertrend(self, high, low, close, length=7, multiplier=3.0):
+        """(SUPERT, SUPERTd, SUPERTl, SUPERTs)"""
+        if close.shape[0] < length + 1:
+            return None
+        atr = self.atr(high, low, close, length)
+        if atr is None:
+            return None
+        hl2 = 0.5 * (high + low)
+        matr = multiplier * atr
+        return self._supertrend_loop(close, hl2 - matr, hl2 + matr, length)
+
+    def psar(self, high, low, af0=0.02, max_af=0.2):
+        """(PSARl, PSARs, PSARaf, PSARr)"""
+        if high.shape[0] < 1:
+            return None
+        falling = False
+        if high.shape[0] > 1:
+            # প্রথম দুই ক্যান্ডেলের -DM দেখে শুরুর দিক (pandas_ta _falling)
+            up, dn = high[1] - high[0], low[0] - low[1]
+            dmn = dn if (dn > up and dn > 0) else 0.0
+            falling = bool(abs(dmn) >= EPSILON and dmn > 0)
+        return self._psar_loop(high, low, af0, max_af, falling)
+
+    def stoch(self, high, low, close, k=14, d=3, smooth_k=3):
+        """(STOCHk, STOCHd, STOCHh)"""
+        m = close.shape[0]
+        if m < k + d + smooth_k:
+            return None
+        lowest = _rolling(low, k, np.min)
+        highest = _rolling(high, k, np.max)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            raw = 100 * (close - lowest) / _non_zero_range(highest, lowest)
+        stoch_k = np.full(m, NAN)
+        stoch_d = np.full(m, NAN)
+        start = _first_valid(raw)
+        if start is not None and m - start >= smooth_k:
+            stoch_k[start:] = _sma(raw[start:], smooth_k)
+            start_d = _first_valid(stoch_k)
+            if start_d is not None and m - start_d >= d:
+                stoch_d[start_d:] = _sma(stoch_k[start_d:], d)
+        return stoch_k, stoch_d, stoch_k - stoch_d
+
+    def bbands(self, close, length=5, std=2.0):
+        """(BBL, BBM, BBU, BBB, BBP)"""
+        if close.shape[0] < length:
+            return None
+        import pandas as pd
+        mid = _sma(close, length)
+        # রোলিং ভ্যারিয়েন্স pandas এর অনলাইন অ্যালগরিদমে (pandas_ta এর সাথে ফ্ল্যাট উইন্ডোতেও হুবহু মিল)
+        deviation = np.sqrt(pd.Series(close, copy=False).rolling(length).var().to_numpy())
+        lower = mid - std * deviation
+        upper = mid + std * deviation
+        width = _non_zero_range(upper, lower)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return lower, mid, upper, 100 * width / mid, _non_zero_range(close, lower) / width
+
+    def mfi(self, high, low, close, volume, length=14):
+        m = close.shape[0]
+        if m < length + 1:
+            return None
+        tp = (high + low + close) / 3.0
+        smf = tp * volume * np.where(tp > np.roll(tp, shift=1), 1, -1)
+        window = np.ones(length)
+        gain = np.convolve(np.maximum(smf, 0), window)[:m]
+        loss = np.convolve(np.maximum(-smf, 0), window)[:m]
+        mfi = (100.0 * gain) / (gain + loss + EPSILON)
+        mfi[:length] = NAN
+        return mfi
+
+    def obv(self, close, volume):
+        if close.shape[0] < 1:
+            return None
+        signed = np.sign(close - _shift(close)) * volume
+        signed[:1] = 0.0
+        obv = np.cumsum(signed)
+        obv[:1] = NAN
+        return obv
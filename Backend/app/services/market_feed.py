@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+import ccxt.async_support as ccxt
+import websockets
+
+from app.core.config import settings
+
+logger = logging.getLogger("MarketFeed")
+
+# Binance Futures combined stream (kline_1m); লোকাল রিপ্লে সার্ভার একই ফরম্যাট পাঠায়
+BINANCE_FUTURES_WS = "wss://fstream.binance.com/stream"
+INTERVAL_MS = 60_000
+# রিকানেক্ট ব্যাকফিলের প্রতি REST পেজে বার সংখ্যা (Binance Futures fetch_ohlcv এর সর্বোচ্চ 1500)
+BACKFILL_PAGE_LIMIT = 1000
+
+
+def stream_name(symbol, interval='1m'):
+    """'BTC/USDT' -> 'btcusdt@kline_1m'"""
+    return f"{symbol.replace('/', '').lower()}@kline_{interval}"
+
+
+def trade_stream_name(symbol):
+    """'BTC/USDT' -> 'btcusdt@aggTrade'"""
+    return f"{symbol.replace('/', '').lower()}@aggTrade"
+
+
+def trade_record(symbol, trade):
+    """
+    Binance aggTrade -> market_trades রেকর্ড (time, symbol, price, qty, side, trade_id)।
+    m=True মানে বায়ার মেকার, অর্থাৎ অ্যাগ্রেসর বিক্রেতা ('sell')।
+    """
+    return (
+        datetime.fromtimestamp(trade['T'] / 1000, tz=timezone.utc), symbol,
+        float(trade['p']), float(trade['q']), 'sell' if trade['m'] else 'buy', int(trade['a'])
+    )
+
+
+def kline_message(symbol, candle, closed=False, interval='1m'):
+    """OHLCV [ts, o, h, l, c, v] থেকে Binance combined-stream kline মেসেজ (রিপ্লে সার্ভারের জন্য)"""
+    ts, o, h, l, c, v = candle[:6]
+    ts = int(ts)
+    raw_symbol = symbol.replace('/', '').upper()
+    return {
+        "stream": stream_name(symbol, interval),
+        "data": {
+            "e": "kline", "E": ts, "s": raw_symbol,
+            "k": {
+                "t": ts, "T": ts + INTERVAL_MS - 1, "s": raw_symbol, "i": interval,
+                "o": str(o), "h": str(h), "l": str(l), "c": str(c), "v": str(v),
+                "x": closed
+            }
+        }
+    }
+
+
+class MarketFeed:
+    """
+    এক্সচেঞ্জের WebSocket kline ফিড থেকে পুশ-বেসড ইনজেশন।
+    প্রতিটি আপডেট সাথে সাথে handler (StreamEngine.broadcast) এ যায়।
+    trade_handler দিলে একই কানেকশনে aggTrade স্ট্রিমও আসে; প্রতিটি ট্রেড সিঙ্ক্রোনাস কলে (await নেই)
+    trade_record টাপল হিসেবে যায় (TradeWriter.add), যাতে সেকেন্ডে হাজারো ট্রেডেও রিড লুপ পিছিয়ে না পড়ে।
+    কানেকশন কেটে গেলে এক্সপোনেনশিয়াল ব্যাকঅফে রিকানেক্ট করে এবং মাঝের মিস হওয়া বার
+    REST (fetch_ohlcv) দিয়ে ব্যাকফিল করে।
+    """
+    def __init__(self, symbols, handler, url=None, backfill=None, max_backoff=60, trade_handler=None):
+        self.symbols = list(symbols)
+        self.handler = handler
+        self.trade_handler = trade_handler
+        self.url = url or settings.MARKET_FEED_URL or BINANCE_FUTURES_WS
+        self.max_backoff = max_backoff
+        # কাস্টম ব্যাকফিল: async (symbol, since_ms) -> [[ts, o, h, l, c, v], ...]
+        self.backfill_fn = backfill or self.fetch_missing_bars
+
+        # 'BTCUSDT' -> 'BTC/USDT'
+        self.symbol_map = {s.replace('/', '').upper(): s for s in self.symbols}
+        # সিম্বল -> সর্বশেষ দেখা বারের ওপেন টাইম (ms), রিকানেক্টের পর ব্যাকফিলের শুরু
+        self.last_bar_time = {}
+        self.connected = False
+        self.reconnects = 0
+
+    @property
+    def stream_url(self):
+        names = [stream_name(s) for s in self.symbols]
+        if self.trade_handler is not None:
+            names += [trade_stream_name(s) for s in self.symbols]
+        streams = "/".join(names)
+        return f"{self.url}?streams={streams}"
+
+    async def run(self):
+        logger.info(f"📡 Market Feed Started for {', '.join(self.symbols)} ({self.url})")
+        backoff = 1
+        try:
+            while True:
+                try:
+                    async with websockets.connect(self.stream_url, ping_interval=20, ping_timeout=20) as ws:
+                        self.connected = True
+                        logger.info("✅ Market Feed Connected.")
+                        # আগে যা দেখা হয়েছে তার পর থেকে মিস হওয়া বার আগে পাঠানো
+                        await self.backfill()
+                        backoff = 1
+                        async for raw in ws:
+                            await self.handle_message(raw)
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"⚠️ Market Feed Error: {e}")
+
+                self.connected = False
+                self.reconnects += 1
+                logger.warning(f"🔁 Market Feed Disconnected. Reconnecting in {backoff}s...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+        except asyncio.CancelledError:
+            logger.info("🛑 Market Feed Stopped.")
+
+    async def handle_message(self, raw):
+        try:
+            message = json.loads(raw)
+            data = message.get('data', message)
+            if data.get('e') == 'aggTrade':
+                symbol = self.symbol_map.get(data.get('s'))
+                if symbol is not None and self.trade_handler is not None:
+                    self.trade_handler(trade_record(symbol, data))
+                return
+
+            kline = data.get('k')
+            if not kline:
+                return
+
+            symbol = self.symbol_map.get(kline.get('s', data.get('s')))
+            if symbol is None:
+                return
+
+            bar_time = int(kline['t'])
+            last_time = self.last_bar_time.get(symbol)
+            if last_time is not None and bar_time < last_time:
+                # ব্যাকফিলের পর পুরনো/ডুপ্লিকেট আপডেট
+                return
+
+            self.last_bar_time[symbol] = bar_time
+            await self.handler({
+                'time': bar_time,
+                'open': float(kline['o']), 'high': float(kline['h']),
+                'low': float(kline['l']), 'close': float(kline['c']),
+                'volume': float(kline['v']),
+                's': symbol,
+                # x=false: চলমান বারের টিক (পরের টিক এটিকে প্রতিস্থাপন করতে পারে), true: বারের ফাইনাল kline
+                'closed': bool(kline.get('x'))
+            })
+
+        except Exception as e:
+            logger.error(f"Feed Parse Error: {e}")
+
+    async def backfill(self):
+        """রিকানেক্টের পর প্রতিটি সিম্বলের মিস হওয়া বার ক্রমানুসারে handler এ পাঠানো"""
+        for symbol in self.symbols:
+            since = self.last_bar_time.get(symbol)
+            if since is None:
+                continue
+            try:
+                candles = await self.backfill_fn(symbol, since)
+                for candle in candles or []:
+                    bar_time = int(candle[0])
+                    if bar_time < since:
+                        continue
+                    self.last_bar_time[symbol] = bar_time
+                    await self.handler({
+                        'time': bar_time, 'open': candle[1], 'high': candle[2],
+                        'low': candle[3], 'close': candle[4], 'volume': candle[5],
+                        's': symbol, 'closed': True
+                    })
+                if candles:
+                    logger.info(f"⏪ [{symbol}] Backfilled {len(candles)} bars.")
+            except Exception as e:
+                logger.error(f"[{symbol}] Backfill Error: {e}")
+
+    async def fetch_missing_bars(self, symbol, since):
+        """since থেকে চলমান মিনিট পর্যন্ত সব বার; ১০০০ বারের পেজে (লম্বা ডিসকানেক্টে একটি পেজে সব আসে না)"""
+        exchange = ccxt.binance({
+            'enableRateLimit': True,
+            'options': {'defaultType': 'future'}
+        })
+        try:
+            current_minute = int(datetime.now(tz=timezone.utc).timestamp() * 1000) // INTERVAL_MS * INTERVAL_MS
+            candles = []
+            while since <= current_minute:
+                batch = await exchange.fetch_ohlcv(symbol, '1m', since=since, limit=BACKFILL_PAGE_LIMIT)
+                batch = [row for row in batch or [] if row[0] >= since]
+                if not batch:
+                    break
+                candles.extend(batch)
+                since = int(batch[-1][0]) + INTERVAL_MS
+            return candles
+        finally:
+            await exchange.close()
+
+
+class ReplayServer:
+    """
+    টেস্টের জন্য লোকাল এক্সচেঞ্জ: রেকর্ড করা OHLCV ক্যান্ডেল Binance kline ফরম্যাটে পাঠায়।
+    candles: {symbol: [[ts, o, h, l, c, v], ...]}
+    disconnect_after: এতগুলো মেসেজ পাঠানোর পর একবার কানেকশন বন্ধ করে; পরের কানেকশনে
+    `gap` টি মেসেজ বাদ যায় (ডিসকানেক্ট থাকা অবস্থায় যা মিস হয়েছে), যা fetch_ohlcv দিয়ে ব্যাকফিল করা যায়।
+    """
+    def __init__(self, candles, host="127.0.0.1", port=9001, interval=0.0, disconnect_after=None, gap=0):
+        self.candles = candles
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.disconnect_after = disconnect_after
+        self.gap = gap
+        self.position = 0
+        self._messages = self.messages()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/stream"
+
+    def messages(self):
+        """সব সিম্বলের ক্যান্ডেল টাইম অনুযায়ী সাজানো kline মেসেজ হিসেবে"""
+        events = []
+        for symbol, rows in self.candles.items():
+            for row in rows:
+                events.append((int(row[0]), symbol, row))
+        events.sort(key=lambda e: e[0])
+        return [json.dumps(kline_message(symbol, row, closed=True)) for _, symbol, row in events]
+
+    async def fetch_ohlcv(self, symbol, since):
+        """REST ব্যাকফিলের বিকল্প (MarketFeed(backfill=server.fetch_ohlcv))"""
+        return [list(row) for row in self.candles.get(symbol, []) if int(row[0]) >= since]
+
+    async def _handler(self, connection):
+        while self.position < len(self._messages):
+            if self.disconnect_after is not None and self.position >= self.disconnect_after:
+                # একবারই ডিসকানেক্ট, পরের কানেকশনে মাঝের মেসেজগুলো মিস হবে
+                self.disconnect_after = None
+                self.position += self.gap
+                await connection.close()
+                return
+            await connection.send(self._messages[self.position])
+            self.position += 1
+            await asyncio.sleep(self.interval)
+        await connection.wait_closed()
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        logger.info(f"🎞️ Replay Server Running at {self.url}")
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
@@ -0,0 +1,43 @@
+import json
+
+import pandas as pd
+
+from app.services.timeframe_manager import TimeframeManager
+from app.services.technical_indicators import technical_indicators
+
+tf_manager = TimeframeManager()
+
+TIMEFRAME_MAP = {"1H": "1h", "4H": "4h", "15m": "15min", "1D": "1D"}
+
+
+def render_market_status(raw_df, symbol, timeframe, aggregated=False, flow=None):
+    """
+    রিস্যাম্পল -> ইন্ডিকেটর -> সিরিয়ালাইজড JSON (bytes)।
+    পুরোটা সিঙ্ক্রোনাস ও pandas_ta-ভারী, তাই compute_executor এর প্রসেস পুলে চলে;
+    ফেরত যায় শুধু ছোট bytes, পুরো ডাটাফ্রেম নয়।
+    aggregated=True: raw_df আগে থেকেই টার্গেট টাইমফ্রেমের বার (TimescaleDB continuous aggregate), রিস্যাম্পল লাগে না।
+    flow: একই বাকেটের আসল অর্ডার-ফ্লো (Database.get_trade_flow), থাকলে আনুমানিক vol_buy/vol_sell এর জায়গায় বসে।
+    """
+    raw_df = tf_manager.merge_trade_flow(raw_df, flow)
+    if aggregated:
+        resampled_df = tf_manager.finalize(raw_df)
+    else:
+        resampled_df = tf_manager.prepare_and_resample(raw_df, TIMEFRAME_MAP.get(timeframe, "1h"))
+    final_df = technical_indicators.apply_all_indicators(resampled_df)
+
+    current_phase = final_df.iloc[-1].get('market_phase', 'Unknown') if not final_df.empty else "Unknown"
+
+    # পুরো ফ্রেম একবারে সিরিয়ালাইজ (NaN -> null), প্রতি সেলে পাইথন লুপ নেই
+    records = final_df.reset_index()
+    for col in records.columns:
+        if isinstance(records[col].dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_any_dtype(records[col]):
+            records[col] = records[col].map(pd.Timestamp.isoformat)
+    data_json = records.to_json(orient='records', double_precision=15)
+
+    header = json.dumps({
+        "status": "success",
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "current_phase": current_phase
+    })
+    return (header[:-1] + ', "data": ' + data_json + '}').encode('utf-8')
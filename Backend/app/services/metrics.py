@@ -0,0 +1,206 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from contextlib import nullcontext
+
+from app.core.config import settings
+
+logger = logging.getLogger("Metrics")
+
+# লগ-লিনিয়ার বাকেট: প্রতি ২ এর ঘাতে ৮টি সাব-বাকেট (~১২.৫% রেজোলিউশন), মাইক্রোসেকেন্ডে
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+BUCKET_COUNT = 280  # ~১ ঘণ্টা পর্যন্ত (2^34 us)
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+_NULL_TIMER = nullcontext()
+
+
+class LatencyHistogram:
+    """
+    HDR-স্টাইল ল্যাটেন্সি হিস্টোগ্রাম: ফিক্সড লগ-লিনিয়ার বাকেট, record() O(1) ও মেমরি স্থির।
+    পার্সেন্টাইল বাকেটের উপরের সীমা, তাই ভুল সর্বোচ্চ ~১২.৫% (উপরের দিকে)।
+    থ্রেড পুল থেকেও রেকর্ড হয়, তাই ছোট লক।
+    """
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index(micros):
+        shift = max(0, micros.bit_length() - SUB_BUCKET_BITS - 1)
+        return min(SUB_BUCKETS * shift + (micros >> shift), BUCKET_COUNT - 1)
+
+    @staticmethod
+    def _upper(index):
+        shift = max(0, index // SUB_BUCKETS - 1)
+        mantissa = index - SUB_BUCKETS * shift
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds):
+        index = self._index(int(seconds * 1_000_000))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q):
+        """q (0-1) পার্সেন্টাইল, সেকেন্ডে"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if bucket and seen >= target:
+                return min(self._upper(index) / 1_000_000, self.max)
+        return self.max
+
+
+class MetricsRegistry:
+    """
+    প্রসেস-ব্যাপী মেট্রিক্স: হট পাথের ল্যাটেন্সি হিস্টোগ্রাম, কাউন্টার ও স্ক্রেপের সময় পড়া কালেক্টর (কিউ ডেপথ, লুপ ল্যাগ)।
+    render() Prometheus text exposition ফরম্যাট দেয় (/metrics)।
+
+    METRICS_ENABLED=false হলে timed() ফাংশনকে অপরিবর্তিত ফেরত দেয় এবং timer() একটি শেয়ার্ড no-op,
+    তাই হট পাথে কোনো অতিরিক্ত খরচ থাকে না।
+    """
+    def __init__(self, enabled=None, prefix="metron"):
+        self.enabled = settings.METRICS_ENABLED if enabled is None else enabled
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+        self.collectors = []
+
+    # ============================================================
+    # রেকর্ডিং
+    # ============================================================
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, name, seconds, **labels):
+        if self.enabled:
+            self.histogram(name, **labels).record(seconds)
+
+    def inc(self, name, value=1, **labels):
+        if self.enabled:
+            key = (name, tuple(sorted(labels.items())))
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def timer(self, stage):
+        """with metrics.timer("ws_fanout"): ... -> stage_latency_seconds{stage="ws_fanout"}"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram("stage_latency_seconds", stage=stage))
+
+    def timed(self, stage):
+        """sync/async ফাংশনের ডেকোরেটর; ডিসেবল থাকলে ফাংশন হুবহু ফেরত"""
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+            histogram = self.histogram("stage_latency_seconds", stage=stage)
+
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        histogram.record(time.perf_counter() - started)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    histogram.record(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def register_collector(self, collector):
+        """
+        collector() -> [(name, type, help, labels, value), ...]; শুধু স্ক্রেপের সময় চলে।
+        type: "gauge" অথবা "counter"
+        """
+        self.collectors.append(collector)
+
+    # ============================================================
+    # Prometheus এক্সপোজিশন
+    # ============================================================
+    @staticmethod
+    def _labels(labels, extra=None):
+        pairs = list(labels) + (extra or [])
+        if not pairs:
+            return ""
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        families = {}
+
+        def family(name, kind, text):
+            full = f"{self.prefix}_{name}"
+            if full not in families:
+                families[full] = [f"# HELP {full} {self.help.get(name, text)}", f"# TYPE {full} {kind}"]
+            return full, families[full]
+
+        for (name, labels), histogram in list(self.histograms.items()):
+            full, lines = family(name, "summary", name.replace('_', ' '))
+            for q in QUANTILES:
+                lines.append(f"{full}{self._labels(labels, [('quantile', q)])} {histogram.percentile(q):.6f}")
+            lines.append(f"{full}_sum{self._labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{full}_count{self._labels(labels)} {histogram.count}")
+
+        for (name, labels), value in list(self.counters.items()):
+            full, lines = family(f"{name}_total", "counter", name.replace('_', ' '))
+            lines.append(f"{full}{self._labels(labels)} {value}")
+
+        for collector in self.collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logger.error(f"❌ Metrics Collector Error: {e}")
+                continue
+            for name, kind, text, labels, value in samples:
+                full, lines = family(name, kind, text)
+                lines.append(f"{full}{self._labels(sorted(labels.items()))} {float(value)}")
+
+        return "\n".join(line for lines in families.values() for line in lines) + "\n"
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+metrics = MetricsRegistry()
+metrics.describe("stage_latency_seconds", "Latency of instrumented hot-path stages")
+metrics.describe("event_loop_lag_seconds", "Event loop scheduling lag (sleep overshoot)")
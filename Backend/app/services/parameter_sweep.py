@@ -0,0 +1,184 @@
+import asyncio
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import settings
+
+logger = logging.getLogger("ParameterSweep")
+
+# সুইপ করা যায় এমন প্যারামিটার ও তাদের ডিফল্ট (BacktestEngine.simulate এর আর্গুমেন্ট)
+SWEEP_PARAMS = {
+    "take_profit": 2.0,
+    "stop_loss": -1.0,
+    "fee_percent": 0.1,
+    "slippage_percent": 0.0,
+    "sell_score": -2,
+    "min_score": None,
+    "position_size": 0.95
+}
+
+# র‍্যাংকিং: (মেট্রিক, বড় হলে ভালো কিনা)
+RANK_METRICS = {
+    "sharpe_ratio": True,
+    "profit_factor": True,
+    "net_profit": True,
+    "win_rate": True,
+    "max_drawdown": False
+}
+
+# সিমুলেশনে লাগে শুধু এই কলামগুলো, ওয়ার্কারে পাঠানোর আগে বাকিগুলো বাদ
+SIM_COLUMNS = ['timestamp', 'datetime', 'close', 'EMA_20', 'RSI_14', 'MACD_12_26_9', 'MACDs_12_26_9', 'VWAP', 'Market_Phase']
+
+# ============================================================
+# ওয়ার্কার প্রসেস (প্রতি প্রসেসে ডাটা ও সিগন্যাল অ্যারে একবারই সেট হয়)
+# ============================================================
+_worker_state = {}
+
+
+def _init_worker(df_sim, strategy_mode, initial_balance):
+    from app.services.backtest_engine import backtest_engine
+    _worker_state['engine'] = backtest_engine
+    _worker_state['df'] = df_sim
+    _worker_state['signals'] = backtest_engine._signal_arrays(df_sim)
+    _worker_state['strategy_mode'] = strategy_mode
+    _worker_state['initial_balance'] = initial_balance
+
+
+def _run_config(params):
+    engine = _worker_state['engine']
+    initial_balance = _worker_state['initial_balance']
+    trades, balance, equity_curve = engine.simulate(
+        _worker_state['df'], _worker_state['strategy_mode'], initial_balance,
+        signals=_worker_state['signals'], **params
+    )
+    return {
+        "params": params,
+        "metrics": engine.calculate_metrics(trades, initial_balance, balance, equity_curve)
+    }
+
+
+class ParameterSweep:
+    """
+    একই ডাটার ওপর অনেকগুলো প্যারামিটার কনফিগারেশনের ব্যাকটেস্ট (গ্রিড অথবা র‍্যান্ডম সার্চ)।
+    ডাটা ফেচ ও ইন্ডিকেটর একবারই হয়; সিমুলেশন ProcessPoolExecutor এ সব কোরে ছড়িয়ে চলে।
+    run() একটি async জেনারেটর: প্রতিটি কনফিগারেশন শেষ হলে progress ইভেন্ট, শেষে র‍্যাংক করা result।
+    """
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or settings.SWEEP_WORKERS or os.cpu_count() or 1
+
+    @staticmethod
+    def _validate(names):
+        unknown = [name for name in names if name not in SWEEP_PARAMS]
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters: {', '.join(unknown)}")
+
+    @staticmethod
+    def _check_size(count):
+        if count > settings.SWEEP_MAX_CONFIGS:
+            raise ValueError(f"Too many configurations: {count} (max {settings.SWEEP_MAX_CONFIGS})")
+
+    def grid_configs(self, grid):
+        """{"take_profit": [1.5, 2.0], "stop_loss": [-1.0, -0.5]} -> সব কম্বিনেশন"""
+        self._validate(grid)
+        names = list(grid)
+        values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+        # কম্বিনেশন তৈরির আগেই সংখ্যা যাচাই
+        self._check_size(math.prod(len(v) for v in values))
+        return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+    def random_configs(self, space, samples=50, seed=None):
+        """
+        {"take_profit": [0.5, 5.0], "min_score": {"choices": [2, 3, 4]}}
+        [low, high] -> ইউনিফর্ম (দুটোই int হলে randint), {"choices": [...]} -> যেকোনো একটি
+        """
+        self._validate(space)
+        self._check_size(samples)
+        rng = random.Random(seed)
+        configs = []
+        for _ in range(samples):
+            params = {}
+            for name, spec in space.items():
+                if isinstance(spec, dict):
+                    params[name] = rng.choice(spec['choices'])
+                elif all(isinstance(v, int) and not isinstance(v, bool) for v in spec):
+                    params[name] = rng.randint(spec[0], spec[1])
+                else:
+                    params[name] = round(rng.uniform(spec[0], spec[1]), 4)
+            configs.append(params)
+        return configs
+
+    @staticmethod
+    def rank_key(rank_by="sharpe_ratio"):
+        """র‍্যাংকিং কী (ছোট = ভালো): প্রথমে rank_by, টাই হলে Sharpe -> Profit Factor -> কম Drawdown"""
+        if rank_by not in RANK_METRICS:
+            raise ValueError(f"Unknown rank metric: {rank_by}")
+        order = [rank_by] + [m for m in ("sharpe_ratio", "profit_factor", "max_drawdown") if m != rank_by]
+
+        def key(result):
+            metrics = result['metrics']
+            return tuple(-metrics[m] if RANK_METRICS[m] else metrics[m] for m in order)
+
+        return key
+
+    @classmethod
+    def rank(cls, results, rank_by="sharpe_ratio"):
+        return sorted(results, key=cls.rank_key(rank_by))
+
+    async def run(self, df_analyzed, configs, strategy_mode="MACD_RSI_VWAP", initial_balance=1000, rank_by="sharpe_ratio", top=10):
+        key = self.rank_key(rank_by)
+        self._check_size(len(configs))
+        total = len(configs)
+        started = time.perf_counter()
+        df_sim = df_analyzed[[c for c in SIM_COLUMNS if c in df_analyzed.columns]].copy()
+
+        yield {"type": "started", "total": total, "workers": self.max_workers, "bars": len(df_sim)}
+        logger.info(f"🧪 Parameter Sweep: {total} configs on {self.max_workers} workers")
+
+        loop = asyncio.get_running_loop()
+        results = []
+        # চলমান সেরা ফলাফল: প্রতি progress এ পুরো লিস্ট আবার সর্ট না করে শুধু নতুনটির সাথে তুলনা
+        best = best_key = None
+        # spawn: সার্ভারের থ্রেড/ইভেন্ট লুপ স্টেট ফর্ক না করে পরিষ্কার ওয়ার্কার প্রসেস
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(df_sim, strategy_mode, initial_balance)
+        )
+        try:
+            futures = [loop.run_in_executor(executor, _run_config, params) for params in configs]
+            for done, future in enumerate(asyncio.as_completed(futures), start=1):
+                result = await future
+                results.append(result)
+                result_key = key(result)
+                if best is None or result_key < best_key:
+                    best, best_key = result, result_key
+                yield {
+                    "type": "progress",
+                    "done": done,
+                    "total": total,
+                    "result": result,
+                    "best": best
+                }
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        ranked = self.rank(results, rank_by)
+        elapsed = time.perf_counter() - started
+        logger.info(f"✅ Parameter Sweep Done: {total} configs in {elapsed:.2f}s")
+        yield {
+            "type": "result",
+            "total": total,
+            "rank_by": rank_by,
+            "elapsed_sec": round(elapsed, 3),
+            "ranked": ranked[:top]
+        }
+
+
+parameter_sweep = ParameterSweep()
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+
+class StageQueue:
+    """
+    পাইপলাইনের দুই স্টেজের মাঝে বাউন্ডেড asyncio কিউ, ব্যাকপ্রেশার মেট্রিক সহ।
+
+    policy:
+      'block'       -> কিউ ভরা থাকলে প্রডিউসার অপেক্ষা করে (ডাটা হারানো যাবে না, যেমন পারসিস্ট)
+      'drop_oldest' -> কিউ ভরা থাকলে সবচেয়ে পুরনো আইটেম বাদ দিয়ে নতুনটি রাখে (লাইভ প্রাইস/ট্রিগার)
+    """
+    def __init__(self, name, maxsize=1000, policy='block'):
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self._queue = asyncio.Queue(maxsize=maxsize)
+
+        # মেট্রিক
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def put_nowait(self, item):
+        """নন-ব্লকিং put; 'drop_oldest' এ পুরনো আইটেম বাদ যায়, 'block' এ ভরা থাকলে False রিটার্ন"""
+        if self._queue.full():
+            if self.policy != 'drop_oldest':
+                self.dropped += 1
+                return False
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.dropped += 1
+        self._enqueue(item)
+        return True
+
+    async def put(self, item):
+        if self.policy == 'drop_oldest':
+            self.put_nowait(item)
+            return
+        if self._queue.full():
+            self.blocked += 1
+        await self._queue.put((time.perf_counter(), item))
+        self._track()
+
+    def _enqueue(self, item):
+        self._queue.put_nowait((time.perf_counter(), item))
+        self._track()
+
+    def _track(self):
+        self.enqueued += 1
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    async def get(self):
+        queued_at, item = await self._queue.get()
+        self._record(queued_at)
+        return item
+
+    def get_nowait(self):
+        queued_at, item = self._queue.get_nowait()
+        self._record(queued_at)
+        return item
+
+    def _record(self, queued_at):
+        wait = time.perf_counter() - queued_at
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+        self.processed += 1
+        self._queue.task_done()
+
+    def stats(self):
+        return {
+            "depth": self._queue.qsize(),
+            "maxsize": self.maxsize,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+            "avg_wait_ms": round(self.total_wait / self.processed * 1000, 3) if self.processed else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3)
+        }
@@ -0,0 +1,438 @@
+import asyncio
+import heapq
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.parameter_sweep import ParameterSweep, RANK_METRICS
+
+logger = logging.getLogger("PortfolioBacktest")
+
+# ওয়াক-ফরওয়ার্ডে ট্রেইন উইন্ডোতে অপটিমাইজ করা যায় এমন প্যারামিটার ও তাদের ডিফল্ট
+# (fee/slippage/position_size পোর্টফোলিও-লেভেলের, উইন্ডো ভেদে বদলায় না)
+WALK_FORWARD_PARAMS = {
+    "take_profit": 2.0,
+    "stop_loss": -1.0,
+    "sell_score": -2,
+    "min_score": None
+}
+
+# ইন্ডিকেটর ওয়ার্মআপ: প্রতি সিম্বলের প্রথম এতগুলো বারে ট্রেড হয় না (simulate এর start এর মতো)
+WARMUP_BARS = 50
+
+# ============================================================
+# ওয়ার্কার প্রসেস (শার্ড)
+# ============================================================
+def _symbol_signals(symbol, df):
+    """সিম্বল শার্ড: ইন্ডিকেটর + সিগন্যাল অ্যারে (ভারী pandas_ta অংশ ওয়ার্কারেই চলে)"""
+    from app.services.backtest_engine import backtest_engine
+    from app.services.technical_indicators import technical_indicators
+
+    df_analyzed = technical_indicators.apply_indicators(df, backtest_engine.SIGNAL_FEATURES)
+    signals = backtest_engine._signal_arrays(df_analyzed)
+    return symbol, {
+        "timestamp": signals['timestamp'].astype('int64'),
+        "datetime": df_analyzed['datetime'].astype(str).to_numpy(),
+        "close": signals['close'],
+        "score": signals['score'],
+        "entry_signal": signals['entry_signal']
+    }
+
+
+def _frame(series, rows):
+    """simulate() এর জন্য ছোট ডাটাফ্রেম + সিগন্যাল অ্যারের স্লাইস"""
+    frame = pd.DataFrame({
+        "timestamp": series['timestamp'][rows],
+        "datetime": series['datetime'][rows],
+        "close": series['close'][rows]
+    })
+    signals = {name: series[name][rows] for name in ("close", "timestamp", "score", "entry_signal")}
+    return frame, signals
+
+
+def _optimize_window(symbol, window, series, configs, strategy_mode, initial_balance, fee_percent, slippage_percent, rank_by):
+    """
+    উইন্ডো শার্ড: ট্রেইন রেঞ্জে সব কনফিগারেশন চালিয়ে সেরাটি বেছে নেওয়া, তারপর টেস্ট রেঞ্জে আউট-অফ-স্যাম্পল ফলাফল।
+    কনফিগারেশন না থাকলে ডিফল্ট প্যারামিটার (শুধু রোলিং আউট-অফ-স্যাম্পল সেগমেন্ট)।
+    """
+    from app.services.backtest_engine import backtest_engine
+
+    def evaluate(rows, params):
+        frame, signals = _frame(series, rows)
+        trades, balance, equity_curve = backtest_engine.simulate(
+            frame, strategy_mode, initial_balance, fee_percent, slippage_percent, start=0, signals=signals, **params
+        )
+        return backtest_engine.calculate_metrics(trades, initial_balance, balance, equity_curve)
+
+    train = slice(window['train'][0], window['train'][1])
+    test = slice(window['test'][0], window['test'][1])
+
+    best = dict(WALK_FORWARD_PARAMS)
+    in_sample = None
+    if configs and train.stop > train.start:
+        results = [{"params": params, "metrics": evaluate(train, params)} for params in configs]
+        top = ParameterSweep.rank(results, rank_by)[0]
+        best.update(top['params'])
+        in_sample = top['metrics']
+
+    return {
+        "symbol": symbol,
+        "window": window['index'],
+        "params": best,
+        "in_sample": in_sample,
+        "out_of_sample": evaluate(test, best)
+    }
+
+
+def _merge_portfolio(symbols, series, timeline, windows, segments, strategy_mode, initial_balance,
+                     fee_percent, slippage_percent, position_size, max_positions):
+    """মার্জ শার্ড: শেয়ার্ড ব্যালেন্স সিমুলেশন + সারাংশ (বড় বাস্কেটে কয়েক সেকেন্ড, তাই ইভেন্ট লুপের বাইরে)"""
+    engine = PortfolioBacktest(max_workers=1)
+    trades, balance, equity_curve = engine.simulate_portfolio(
+        series, timeline, windows, segments, strategy_mode, initial_balance,
+        fee_percent, slippage_percent, position_size, max_positions
+    )
+    return engine._summarize(symbols, trades, balance, equity_curve, initial_balance, windows, segments)
+
+
+class PortfolioBacktest:
+    """
+    মাল্টি-সিম্বল পোর্টফোলিও ব্যাকটেস্ট (শেয়ার্ড ব্যালেন্স) + ঐচ্ছিক ওয়াক-ফরওয়ার্ড (রোলিং train/test উইন্ডো)।
+
+    সিম্বল শার্ড (ইন্ডিকেটর/সিগন্যাল) এবং সিম্বল×উইন্ডো শার্ড (ট্রেইন অপটিমাইজেশন) ProcessPoolExecutor এ চলে;
+    তারপর একটি ইভেন্ট-ড্রিভেন মার্জ সব সিম্বলের এন্ট্রি/এক্সিট সময়ক্রমে মিলিয়ে এক ক্যাশ ব্যালেন্স থেকে পজিশন নেয়
+    এবং সম্মিলিত টাইমলাইনে একটি পোর্টফোলিও ইকুইটি কার্ভ বানায়। মেট্রিক্স BacktestEngine.calculate_metrics থেকে।
+
+    পজিশন সাইজ: cash * position_size / ফাঁকা স্লট (একটি সিম্বল ও max_positions=1 এ simulate এর সমান)।
+    একই বারে একাধিক এন্ট্রি হলে বেশি স্কোরের সিম্বল আগে পায়; ওয়াক-ফরওয়ার্ডে শুধু টেস্ট উইন্ডোতে এন্ট্রি হয়।
+    run() একটি async জেনারেটর: started -> progress (প্রতি শার্ড) -> result।
+    """
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or settings.SWEEP_WORKERS or os.cpu_count() or 1
+
+    @staticmethod
+    def walk_forward_settings(walk_forward):
+        """
+        ক্লায়েন্টের walk_forward ডিক্ট -> (train_bars, test_bars, step), সবগুলো পূর্ণসংখ্যা >= 1।
+        step না দিলে test_bars; 0/ঋণাত্মক হলে উইন্ডো কখনো সরত না (অসীম লুপ), তাই ValueError।
+        """
+        train_bars = walk_forward.get('train_bars', 1000)
+        test_bars = walk_forward.get('test_bars', 250)
+        step = walk_forward.get('step')
+        values = {"train_bars": train_bars, "test_bars": test_bars, "step": test_bars if step is None else step}
+        for name, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                raise ValueError(f"walk_forward.{name} must be an integer >= 1")
+        return values["train_bars"], values["test_bars"], values["step"]
+
+    @staticmethod
+    def walk_forward_windows(timeline, train_bars, test_bars, step=None):
+        """
+        সম্মিলিত টাইমলাইনের (ms) ওপর রোলিং উইন্ডো: [train | test] প্রতি `step` বারে (ডিফল্ট test_bars) সরে।
+        রিটার্ন: [{"index", "train": (start_ms, end_ms), "test": (start_ms, end_ms)}], রেঞ্জগুলো [start, end)
+        """
+        step = step or test_bars
+        if min(train_bars, test_bars, step) < 1:
+            raise ValueError("train_bars, test_bars and step must be >= 1")
+        n = len(timeline)
+        windows = []
+        begin = WARMUP_BARS
+        while begin + train_bars < n:
+            test_end = min(begin + train_bars + test_bars, n)
+            end_ms = int(timeline[test_end]) if test_end < n else int(timeline[-1]) + 1
+            windows.append({
+                "index": len(windows),
+                "train": (int(timeline[begin]), int(timeline[begin + train_bars])),
+                "test": (int(timeline[begin + train_bars]), end_ms)
+            })
+            if test_end == n:
+                break
+            begin += step
+        return windows
+
+    @staticmethod
+    def _bar_window(series, window):
+        """সময়ভিত্তিক উইন্ডো -> এই সিম্বলের বার ইনডেক্স (warmup বাদ)"""
+        ts = series['timestamp']
+
+        def bars(span):
+            return (max(int(np.searchsorted(ts, span[0])), WARMUP_BARS), int(np.searchsorted(ts, span[1])))
+
+        return {"index": window['index'], "train": bars(window['train']), "test": bars(window['test'])}
+
+    async def run(self, data, strategy_mode="MACD_RSI_VWAP", initial_balance=1000, fee_percent=0.1, slippage_percent=0.0,
+                  position_size=0.95, max_positions=None, walk_forward=None, configs=None, rank_by="sharpe_ratio"):
+        """
+        data: {symbol: OHLCV ডাটাফ্রেম (fetch_historical_data ফরম্যাট)}
+        walk_forward: {"train_bars": 1000, "test_bars": 250, "step": None} অথবা None (পুরো রেঞ্জ একবারে)
+        configs: ট্রেইন উইন্ডোতে যাচাই করা প্যারামিটার (WALK_FORWARD_PARAMS), ParameterSweep.grid_configs থেকে
+        """
+        if rank_by not in RANK_METRICS:
+            raise ValueError(f"Unknown rank metric: {rank_by}")
+        unknown = [name for params in configs or [] for name in params if name not in WALK_FORWARD_PARAMS]
+        if unknown:
+            raise ValueError(f"Unknown walk-forward parameters: {', '.join(sorted(set(unknown)))}")
+        if walk_forward:
+            train_bars, test_bars, step = self.walk_forward_settings(walk_forward)
+
+        symbols = list(data)
+        max_positions = max_positions or len(symbols)
+        started = time.perf_counter()
+        yield {"type": "started", "symbols": symbols, "workers": self.max_workers, "walk_forward": bool(walk_forward)}
+        logger.info(f"📊 Portfolio Backtest: {len(symbols)} symbols on {self.max_workers} workers")
+
+        loop = asyncio.get_running_loop()
+        # spawn: সার্ভারের থ্রেড/ইভেন্ট লুপ স্টেট ফর্ক না করে পরিষ্কার ওয়ার্কার প্রসেস
+        executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            # ১. সিম্বল শার্ড: ইন্ডিকেটর + সিগন্যাল
+            series = {}
+            futures = [loop.run_in_executor(executor, _symbol_signals, symbol, df) for symbol, df in data.items()]
+            for done, future in enumerate(asyncio.as_completed(futures), start=1):
+                symbol, arrays = await future
+                series[symbol] = arrays
+                yield {"type": "progress", "stage": "signals", "symbol": symbol, "done": done, "total": len(futures)}
+
+            timeline = np.unique(np.concatenate([s['timestamp'] for s in series.values()]))
+
+            # ২. সিম্বল×উইন্ডো শার্ড: ট্রেইনে অপটিমাইজ, টেস্টে আউট-অফ-স্যাম্পল
+            windows = []
+            segments = []
+            if walk_forward:
+                windows = self.walk_forward_windows(timeline, train_bars, test_bars, step)
+                # উইন্ডো না হলে পুরো রেঞ্জের ইন-স্যাম্পল রানে চুপচাপ ফেরা হবে না
+                if not windows:
+                    raise ValueError(
+                        f"Timeline too short for walk-forward: {len(timeline)} bars, "
+                        f"need more than {WARMUP_BARS + train_bars} (warmup + train_bars)"
+                    )
+                futures = [
+                    loop.run_in_executor(
+                        executor, _optimize_window, symbol, self._bar_window(series[symbol], window), series[symbol],
+                        configs, strategy_mode, initial_balance, fee_percent, slippage_percent, rank_by
+                    )
+                    for symbol in symbols for window in windows
+                ]
+                for done, future in enumerate(asyncio.as_completed(futures), start=1):
+                    segment = await future
+                    segments.append(segment)
+                    yield {"type": "progress", "stage": "walk_forward", "done": done, "total": len(futures), "segment": segment}
+
+            # ৩. মার্জ: শেয়ার্ড ব্যালেন্সে পোর্টফোলিও সিমুলেশন ও সারাংশ, একই পুলের একটি ওয়ার্কারে
+            segments.sort(key=lambda s: (s['symbol'], s['window']))
+            result = await loop.run_in_executor(
+                executor, _merge_portfolio, symbols, series, timeline, windows, segments, strategy_mode,
+                initial_balance, fee_percent, slippage_percent, position_size, max_positions
+            )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        result["elapsed_sec"] = round(time.perf_counter() - started, 3)
+        logger.info(f"✅ Portfolio Backtest Done: {len(result['trades'])} trades in {result['elapsed_sec']}s")
+        yield {"type": "result", **result}
+
+    # ============================================================
+    # পোর্টফোলিও মার্জ
+    # ============================================================
+    @staticmethod
+    def _bar_params(series, windows, segments):
+        """
+        প্রতি সিম্বলের বারভিত্তিক প্যারামিটার অ্যারে: এন্ট্রি যোগ্যতা, সেল সীমা, এন্ট্রি-বারের TP/SL।
+        ওয়াক-ফরওয়ার্ড না হলে ডিফল্ট প্যারামিটার ও warmup এর পর সব বার।
+        """
+        chosen = {(s['symbol'], s['window']): s['params'] for s in segments}
+        bars = {}
+        for symbol, s in series.items():
+            n = len(s['close'])
+            eligible = np.zeros(n, dtype=bool)
+            take_profit = np.full(n, WALK_FORWARD_PARAMS['take_profit'])
+            stop_loss = np.full(n, WALK_FORWARD_PARAMS['stop_loss'])
+            sell_score = np.full(n, WALK_FORWARD_PARAMS['sell_score'])
+            entry = s['entry_signal'].copy()
+
+            if not windows:
+                eligible[WARMUP_BARS:] = True
+            for window in windows:
+                params = chosen.get((symbol, window['index']), WALK_FORWARD_PARAMS)
+                lo = max(int(np.searchsorted(s['timestamp'], window['test'][0])), WARMUP_BARS)
+                hi = int(np.searchsorted(s['timestamp'], window['test'][1]))
+                if hi <= lo:
+                    continue
+                eligible[lo:hi] = True
+                take_profit[lo:hi] = params['take_profit']
+                stop_loss[lo:hi] = params['stop_loss']
+                sell_score[lo:hi] = params['sell_score']
+                if params['min_score'] is not None:
+                    score = s['score'][lo:hi]
+                    entry[lo:hi] = (score >= params['min_score']) & (score > 0)
+
+            bars[symbol] = {
+                "entry_bars": np.flatnonzero(entry & eligible),
+                "sell_signal": s['score'] <= sell_score,
+                "take_profit": take_profit,
+                "stop_loss": stop_loss
+            }
+        return bars
+
+    def simulate_portfolio(self, series, timeline, windows, segments, strategy_mode, initial_balance=1000,
+                           fee_percent=0.1, slippage_percent=0.0, position_size=0.95, max_positions=None):
+        """
+        ইভেন্ট-ড্রিভেন শেয়ার্ড-ব্যালেন্স সিমুলেশন: হিপে শুধু এন্ট্রি ক্যান্ডিডেট ও এক্সিট ইভেন্ট থাকে।
+        প্রতি সময়ে আগে এক্সিট (ক্যাশ ফেরত), তারপর এন্ট্রি; এক্সিট বার simulate এর মতো _find_exit দিয়ে খোঁজা হয়।
+        ট্রেড রেকর্ড simulate এর ফরম্যাটে + "symbol"। রিটার্ন: (trades, final_cash, equity_curve)
+        """
+        from app.services.backtest_engine import backtest_engine
+
+        max_positions = max_positions or len(series)
+        bars = self._bar_params(series, windows, segments)
+        # সম্মিলিত টাইমলাইনে প্রতিটি সিম্বল বারের অবস্থান
+        positions_in_timeline = {symbol: np.searchsorted(timeline, s['timestamp']) for symbol, s in series.items()}
+
+        events = []  # (টাইমলাইন ইনডেক্স, 0=এক্সিট/1=এন্ট্রি, -স্কোর, সিম্বল, বার)
+
+        def push_entry(symbol, from_bar):
+            entry_bars = bars[symbol]['entry_bars']
+            k = np.searchsorted(entry_bars, from_bar)
+            if k < len(entry_bars):
+                bar = int(entry_bars[k])
+                heapq.heappush(events, (int(positions_in_timeline[symbol][bar]), 1, -int(series[symbol]['score'][bar]), symbol, bar))
+
+        for symbol in series:
+            push_entry(symbol, 0)
+
+        cash = initial_balance
+        open_positions = {}
+        trades = []
+        cash_delta = np.zeros(len(timeline))
+        holdings = []  # (সিম্বল, amount, এন্ট্রি ইনডেক্স, এক্সিট ইনডেক্স অথবা None)
+
+        while events:
+            ui, kind, _, symbol, bar = heapq.heappop(events)
+            s = series[symbol]
+            if kind == 0:
+                # EXIT
+                position = open_positions.pop(symbol)
+                exit_price = s['close'][bar] * (1 - slippage_percent/100)
+                gross_return = position['amount'] * exit_price
+                exit_fee = gross_return * (fee_percent/100)
+                net_return = gross_return - exit_fee
+                cash += net_return
+                cash_delta[ui] += net_return
+                trades.append({
+                    "symbol": symbol,
+                    "entry_time": position['entry_time'],
+                    "exit_time": str(s['datetime'][bar]),
+                    "entry_price": position['entry_price'],
+                    "exit_price": exit_price,
+                    "profit_usdt": net_return - (position['amount'] * position['entry_price']) - position['entry_fee'],
+                    "profit_pct": position['exit_pnl'],
+                    "fees_paid": position['entry_fee'] + exit_fee,
+                    "strategy": strategy_mode
+                })
+                holdings.append((symbol, position['amount'], position['entry_ui'], ui))
+                push_entry(symbol, bar + 1)
+                continue
+
+            # ENTRY: স্লট ও ক্যাশ থাকলে; না থাকলে এই সিম্বলের পরের ক্যান্ডিডেট
+            free_slots = max_positions - len(open_positions)
+            if symbol in open_positions or free_slots <= 0 or cash <= 0:
+                push_entry(symbol, bar + 1)
+                continue
+
+            entry_price = s['close'][bar] * (1 + slippage_percent/100)
+            usable_balance = cash * position_size / free_slots
+            fee = usable_balance * (fee_percent/100)
+            amount = (usable_balance - fee) / entry_price
+            cash -= usable_balance
+            cash_delta[ui] -= usable_balance
+
+            exit_bar, exit_pnl = backtest_engine._find_exit(
+                s['close'], bars[symbol]['sell_signal'], bar + 1, amount, entry_price,
+                bars[symbol]['take_profit'][bar], bars[symbol]['stop_loss'][bar]
+            )
+            if exit_bar is None:
+                holdings.append((symbol, amount, ui, None))
+                open_positions[symbol] = None
+                continue
+
+            open_positions[symbol] = {
+                "amount": amount,
+                "entry_price": entry_price,
+                "entry_fee": fee,
+                "entry_time": str(s['datetime'][bar]),
+                "entry_ui": ui,
+                "exit_pnl": exit_pnl
+            }
+            heapq.heappush(events, (int(positions_in_timeline[symbol][exit_bar]), 0, 0, symbol, exit_bar))
+
+        # --- EQUITY CURVE --- ক্যাশ + সব খোলা পজিশনের মার্ক-টু-মার্কেট (যে সিম্বলের বার নেই তার শেষ ক্লোজ)
+        equity = initial_balance + np.cumsum(cash_delta)
+        marks = {}
+        for symbol, amount, entry_ui, exit_ui in holdings:
+            if symbol not in marks:
+                s = series[symbol]
+                last_bar = np.searchsorted(s['timestamp'], timeline, side='right') - 1
+                marks[symbol] = s['close'][np.clip(last_bar, 0, None)]
+            equity[entry_ui:exit_ui] += amount * marks[symbol][entry_ui:exit_ui]
+
+        first = min(WARMUP_BARS, len(timeline) - 1)
+        equity_curve = [{"time": int(timeline[0]), "balance": initial_balance}]
+        equity_curve.extend(
+            {"time": int(t), "balance": round(e, 2)}
+            for t, e in zip(timeline[first:].tolist(), equity[first:].tolist())
+        )
+        trades.sort(key=lambda t: t['exit_time'])
+        return trades, cash, equity_curve
+
+    def _summarize(self, symbols, trades, balance, equity_curve, initial_balance, windows, segments):
+        from app.services.backtest_engine import backtest_engine
+
+        metrics = backtest_engine.calculate_metrics(trades, initial_balance, balance, equity_curve)
+        # এক পাসে সিম্বল-প্রতি (ট্রেড সংখ্যা, মোট প্রফিট, জেতা ট্রেড)
+        totals = {symbol: [0, 0.0, 0] for symbol in symbols}
+        for t in trades:
+            total = totals[t['symbol']]
+            total[0] += 1
+            total[1] += float(t['profit_usdt'])
+            total[2] += t['profit_usdt'] > 0
+        per_symbol = {
+            symbol: {
+                "total_trades": count,
+                "net_profit": round(profit, 2),
+                "win_rate": round(100 * float(wins) / count, 2) if count else 0
+            }
+            for symbol, (count, profit, wins) in totals.items()
+        }
+
+        # JSON সিরিয়ালাইজেশনের জন্য numpy স্কেলার -> পাইথন টাইপ (run_backtest এর মতো)
+        sanitized_trades = [{
+            "symbol": t['symbol'],
+            "entry_time": str(t['entry_time']),
+            "exit_time": str(t['exit_time']),
+            "entry_price": float(t['entry_price']),
+            "exit_price": float(t['exit_price']),
+            "profit_usdt": float(t['profit_usdt']),
+            "profit_pct": float(t['profit_pct']),
+            "fees_paid": float(t['fees_paid']),
+            "strategy": str(t['strategy'])
+        } for t in trades]
+
+        return {
+            "status": "success",
+            "symbols": symbols,
+            "metrics": metrics,
+            "per_symbol": per_symbol,
+            "windows": windows,
+            "segments": segments,
+            "trades": sanitized_trades,
+            "equity_curve": [{"time": int(x['time']), "balance": float(x['balance'])} for x in equity_curve]
+        }
+
+
+portfolio_backtest = PortfolioBacktest()
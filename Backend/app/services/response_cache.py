@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
+from app.core.config import settings
+
+logger = logging.getLogger("ResponseCache")
+
+
+class ResponseCache:
+    """
+    সিরিয়ালাইজ করা API রেসপন্সের (bytes) LRU ক্যাশ, মোট মেমরির সীমা সহ।
+
+    কী: (symbol, ..., last_closed_bar) — নতুন বার ক্লোজ হলে কী নিজেই বদলে যায়,
+    আর invalidate(symbol) সেই সিম্বলের পুরনো এন্ট্রিগুলো মেমরি থেকে সরিয়ে দেয়।
+    একই কী এর জন্য একসাথে আসা রিকোয়েস্টগুলো একটিমাত্র ক্যালকুলেশন শেয়ার করে (single-flight)।
+    """
+    def __init__(self, name, max_bytes):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._inflight = {}
+        # সিম্বল -> সর্বশেষ ইনভ্যালিডেশনের বার টাইম (এর আগের বারের ফলাফল আর সেভ হবে না)
+        self._floor = {}
+        # সিম্বল -> ইনভ্যালিডেশন কাউন্টার; এর আগে শুরু হওয়া ক্যালকুলেশনের ফলাফল সেভ হয় না
+        # (ক্যালকুলেশন চলাকালীন বার সেভ হলে পুরনো ডাটার রেসপন্স একই কী তে পুরো বার জুড়ে থেকে যেত)
+        self._generation = {}
+        self.size_bytes = 0
+
+        # মেট্রিক
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._entries.move_to_end(key)
+        return payload
+
+    def put(self, key, payload, generation=None):
+        if generation is not None and generation != self._generation.get(key[0], 0):
+            return
+        floor = self._floor.get(key[0])
+        if floor is not None and key[-1] is not None and key[-1] < floor:
+            return
+        if len(payload) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size_bytes -= len(old)
+        self._entries[key] = payload
+        self.size_bytes += len(payload)
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self, symbol, bar_time=None):
+        """একটি সিম্বলের সব এন্ট্রি মুছে ফেলা (নতুন বার ক্লোজ হলে)"""
+        if bar_time is not None:
+            self._floor[symbol] = bar_time
+        self._generation[symbol] = self._generation.get(symbol, 0) + 1
+        for key in [k for k in self._entries if k[0] == symbol]:
+            self.size_bytes -= len(self._entries.pop(key))
+
+    def clear(self):
+        self._entries.clear()
+        self._floor.clear()
+        self.size_bytes = 0
+
+    async def get_or_compute(self, key, compute):
+        """
+        ক্যাশে থাকলে সাথে সাথে রিটার্ন; নাহলে compute() (async, bytes অথবা None) একবারই চলে এবং
+        একই কী এর বাকি রিকোয়েস্টগুলো সেই ফলাফলের জন্য অপেক্ষা করে। None ক্যাশ হয় না।
+        """
+        payload = self.get(key)
+        if payload is not None:
+            self.hits += 1
+            return payload
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.shared += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        generation = self._generation.get(key[0], 0)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            payload = await compute()
+            if payload is not None:
+                self.put(key, payload, generation)
+            future.set_result(payload)
+            return payload
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # কেউ অপেক্ষা না করলে "exception never retrieved" ওয়ার্নিং এড়ানো
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight)
+        }
+
+
+# /api/v1/market-status এর ক্যাশ (গ্লোবাল ইনস্ট্যান্স)
+market_status_cache = ResponseCache("market-status", settings.MARKET_STATUS_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class RingBuffer:
+    """
+    ফিক্সড-ক্যাপাসিটি কলামনার রিং বাফার (float64 কলাম + int64 টাইমস্ট্যাম্প, ns)।
+
+    স্টোরেজ ক্যাপাসিটির দ্বিগুণ লম্বা, তাই শেষ `capacity` টি রো সবসময় পাশাপাশি (contiguous) থাকে
+    এবং arrays()/frame() কোনো কপি ছাড়াই ভিউ দিতে পারে। স্টোরেজ শেষ হলে একবার শেষ রো-গুলো
+    শুরুতে সরানো হয় (প্রতি `capacity` টি অ্যাপেন্ডে একবার), তাই প্রতি টিকের খরচ
+    বাফারের দৈর্ঘ্যের ওপর নির্ভর করে না।
+
+    ভিউগুলো রিড-অনলি এবং পরের append/update পর্যন্ত ভ্যালিড;
+    ধরে রাখতে বা বদলাতে হলে to_frame() ব্যবহার করুন।
+    """
+    def __init__(self, columns=OHLCV_COLUMNS, capacity=1500):
+        self.columns = list(columns)
+        self.capacity = capacity
+        self._col_index = {name: i for i, name in enumerate(self.columns)}
+        # (কলাম, রো) লেআউট: প্রতিটি কলাম আলাদাভাবে কন্টিগুয়াস, pandas ব্লকের লেআউটের সাথে মেলে
+        self._data = np.full((len(self.columns), capacity * 2), np.nan)
+        self._times = np.zeros(capacity * 2, dtype='int64')
+        self._end = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    @property
+    def last_time(self):
+        """শেষ রো-এর টাইমস্ট্যাম্প (UTC), বাফার খালি হলে None।"""
+        if not self._size:
+            return None
+        return pd.Timestamp(int(self._times[self._end - 1]), tz='UTC')
+
+    def clear(self):
+        self._end = 0
+        self._size = 0
+
+    def append(self, timestamp, values):
+        """নতুন রো যোগ করে (পূর্ণ থাকলে সবচেয়ে পুরনো রো বাদ যায়)।"""
+        if self._end == self._times.size:
+            keep = self.capacity - 1
+            self._data[:, :keep] = self._data[:, self._end - keep:self._end]
+            self._times[:keep] = self._times[self._end - keep:self._end]
+            self._end = keep
+        self._end += 1
+        self._size = min(self._size + 1, self.capacity)
+        self._write(self._end - 1, timestamp, values)
+
+    def update_last(self, timestamp, values):
+        """চলমান (শেষ) রো ইন-প্লেস আপডেট।"""
+        if not self._size:
+            return self.append(timestamp, values)
+        self._write(self._end - 1, timestamp, values)
+
+    def upsert(self, timestamp, values, new_row):
+        if new_row or not self._size:
+            self.append(timestamp, values)
+        else:
+            self.update_last(timestamp, values)
+
+    def set(self, offset, column, value):
+        """শেষ থেকে `offset` তম রো-এর একটি সেল বসানো (0 = শেষ রো)।"""
+        self._data[self._col_index[column], self._end - 1 - offset] = value
+
+    def _write(self, row, timestamp, values):
+        self._times[row] = pd.Timestamp(timestamp).value
+        self._data[:len(values), row] = values
+        if len(values) < len(self.columns):
+            self._data[len(values):, row] = np.nan
+
+    def load(self, df):
+        """ডাটাফ্রেম (DatetimeIndex) থেকে বাফার পুরোপুরি রিফিল; শুধু শেষ `capacity` টি রো থাকে।"""
+        self.clear()
+        if df is None or df.empty:
+            return self
+        df = df.iloc[-self.capacity:]
+        n = len(df)
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        self._times[:n] = index.as_unit('ns').asi8
+        for i, name in enumerate(self.columns):
+            if name in df.columns:
+                self._data[i, :n] = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype='float64')
+            else:
+                self._data[i, :n] = np.nan
+        self._end = n
+        self._size = n
+        return self
+
+    @staticmethod
+    def _readonly(view):
+        view.flags.writeable = False
+        return view
+
+    def times(self):
+        """int64 (ns) টাইমস্ট্যাম্প ভিউ।"""
+        return self._readonly(self._times[self._end - self._size:self._end])
+
+    def column(self, name):
+        """একটি কলামের zero-copy ndarray ভিউ।"""
+        return self._readonly(self._data[self._col_index[name], self._end - self._size:self._end])
+
+    def arrays(self):
+        """সব কলামের zero-copy ndarray ভিউ ডিকশনারি হিসেবে।"""
+        arrays = {name: self.column(name) for name in self.columns}
+        arrays['timestamp'] = self.times()
+        return arrays
+
+    def last_row(self):
+        if not self._size:
+            return {}
+        return dict(zip(self.columns, self._data[:, self._end - 1].tolist()))
+
+    def _index(self):
+        return pd.DatetimeIndex(self.times().view('M8[ns]'), tz='UTC', name='timestamp')
+
+    def frame(self):
+        """
+        বাফারের ওপর zero-copy ডাটাফ্রেম ভিউ।
+        নতুন কলাম যোগ করা যায়, কিন্তু বিদ্যমান ভ্যালু ইন-প্লেস বদলাতে গেলে এরর হবে (বাফার সুরক্ষিত)।
+        """
+        if not self._size:
+            return pd.DataFrame(columns=self.columns)
+        start = self._end - self._size
+        values = self._readonly(self._data[:, start:self._end].T)
+        return pd.DataFrame(values, index=self._index(), columns=self.columns, copy=False)
+
+    def to_frame(self):
+        """স্বাধীন কপি, পরের আপডেটে বদলাবে না।"""
+        return self.frame().copy()
@@ -1,5 +1,6 @@
 import logging
 import pandas as pd
+from app.services.feature_frame import FeatureFrame
 
 logger = logging.getLogger("SignalEngine")
 
@@ -11,19 +12,21 @@ class SignalEngine:
         """
         লেটেস্ট ডাটার ওপর ভিত্তি করে বাই/সেল সিগন্যাল জেনারেট করে।
         FIX: 'Ambiguous Series' এরর ফিক্স করা হয়েছে .iloc[-1] ব্যবহার করে।
+        df: ডাটাফ্রেম অথবা শেয়ার্ড FeatureFrame; শেষ দুই রো এর ভ্যালু কলাম অ্যারে থেকে পড়া হয় (রো কপি নয়)।
         """
-        if df is None or df.empty:
+        frame = None if df is None else FeatureFrame.wrap(df)
+        if frame is None or frame.empty:
             return {"score": 0, "verdict": "NEUTRAL", "signals": []}
 
         try:
             # সবসময় সর্বশেষ ক্যান্ডেল (Latest Row) চেক করতে হবে
-            current = df.iloc[-1]
+            current = frame.value
             
             score = 0
             signals = []
 
             # ১. RSI Logic
-            rsi = current.get('rsi', 50)
+            rsi = current('rsi', 50)
             if rsi < 30:
                 score += 2
                 signals.append("RSI Oversold (Bullish)")
@@ -32,9 +35,9 @@ class SignalEngine:
                 signals.append("RSI Overbought (Bearish)")
 
             # ২. EMA Trend Logic
-            close = current.get('close', 0)
-            ema_50 = current.get('ema_50', 0)
-            ema_200 = current.get('ema_200', 0)
+            close = current('close', 0)
+            ema_50 = current('ema_50', 0)
+            ema_200 = current('ema_200', 0)
 
             if close > ema_50 and ema_50 > ema_200:
                 score += 3
@@ -45,12 +48,11 @@ class SignalEngine:
 
             # ৩. MACD Crossover Logic
             # এখানে আমাদের আগের ক্যান্ডেলও দেখতে হবে ক্রসওভার বোঝার জন্য
-            if len(df) > 2:
-                prev = df.iloc[-2]
-                macd_curr = current.get('macd', 0)
-                signal_curr = current.get('macd_signal', 0)
-                macd_prev = prev.get('macd', 0)
-                signal_prev = prev.get('macd_signal', 0)
+            if len(frame) > 2:
+                macd_curr = current('macd', 0)
+                signal_curr = current('macd_signal', 0)
+                macd_prev = current('macd', 0, offset=1)
+                signal_prev = current('macd_signal', 0, offset=1)
 
                 # Bullish Crossover (MACD লাইন সিগন্যাল লাইনের নিচ থেকে উপরে উঠল)
                 if macd_prev < signal_prev and macd_curr > signal_curr:
@@ -3,6 +3,9 @@ import pandas as pd
 # নতুন হাইব্রিড ইঞ্জিন ইমপোর্ট
 from app.services.hybrid_strategy_engine import HybridStrategyEngine
 from app.services.technical_indicators import TechnicalIndicators
+from app.services.feature_frame import FeatureFrame
+from app.services.metrics import metrics
+from app.core.config import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("StrategyManager")
@@ -27,6 +30,22 @@ class StrategyManager:
             "Snipe Hunter": self.snipe_hunter_strategy,
             "Trend Surfer": self.trend_surfer_strategy
         }
+        # প্রতিটি মোড যে ফিচার (কলাম বা ইন্ডিকেটর নোড) পড়ে; get_signal শুধু এগুলো ও এদের নির্ভরতা হিসাব করে।
+        # RSI মোডগুলো 'RSI' কলাম পড়ে যা ইন্ডিকেটর ইঞ্জিন তৈরি করে না, তাই তাদের জন্য কিছু হিসাব হয় না
+        self.required_features = {
+            "Scalping": (),
+            "Momentum": (),
+            "Hybrid AI (Ensemble)": HybridStrategyEngine.REQUIRED_FEATURES,
+            "Conservative": ("market_phase",),
+            "Balanced": (),
+            "Aggressive": (),
+            "AI-Adaptive": (),
+            "Ultra-Safe": (),
+            "Scalper Pro": (),
+            "Swing Master": (),
+            "Snipe Hunter": (),
+            "Trend Surfer": ()
+        }
         self.current_mode = "Scalping" # ডিফল্ট
 
     def set_mode(self, mode_name):
@@ -36,28 +55,53 @@ class StrategyManager:
             return True
         return False
 
+    def get_strategy_decision(self, signal_result, market_phase="Consolidation"):
+        """
+        সিগন্যাল স্কোর + মার্কেট ফেজ মিলিয়ে ফাইনাল সিদ্ধান্ত (ব্যাকটেস্ট সিমুলেশন এটি ব্যবহার করে)।
+        ইনপুট: {"score": 3, "verdict": "BUY"}, আউটপুট: {"should_trade": True, "final_verdict": "BUY"}
+        """
+        score = signal_result.get('score', 0)
+        verdict = signal_result.get('verdict', 'NEUTRAL')
+
+        final_verdict = verdict
+        if verdict == "BUY" and score >= 4: final_verdict = "STRONG BUY"
+        elif verdict == "SELL" and score <= -4: final_verdict = "STRONG SELL"
+
+        # ফেজ অনুযায়ী ন্যূনতম কনফ্লুয়েন্স (কনফিগ): ডিফল্টে ট্রেন্ডে কম, ঝুঁকিপূর্ণ ফেজে বেশি স্কোর লাগবে
+        min_score = settings.BACKTEST_PHASE_MIN_SCORE.get(market_phase, settings.BACKTEST_DEFAULT_MIN_SCORE)
+        should_trade = final_verdict != "NEUTRAL" and abs(score) >= min_score
+
+        return {"should_trade": should_trade, "final_verdict": final_verdict}
+
+    @metrics.timed("get_signal")
     async def get_signal(self, df):
         """
         এই ফাংশনটি ডিসিশন মেকার। সে সিলেক্ট করা মোড অনুযায়ী ইঞ্জিনে কল পাঠাবে।
+        df: ডাটাফ্রেম অথবা এই টিকের FeatureFrame; সব স্ট্র্যাটেজি একই ফ্রেম রেফারেন্সে পড়ে, কেউ কপি করে না।
         """
-        if df.empty: return None
-        
+        frame = FeatureFrame.wrap(df)
+        if frame.empty: return None
+
         strategy_func = self.strategies.get(self.current_mode)
-        
+
         if strategy_func:
+            # বর্তমান মোডের দরকারি ইন্ডিকেটর (আগে থেকে ফ্রেমে থাকলে পুনরায় হিসাব হয় না)
+            frame = await frame.require(self.required_features.get(self.current_mode, ()))
+
             # যদি হাইব্রিড মোড হয়, তবে এটি async হতে পারে
             if self.current_mode == "Hybrid AI (Ensemble)":
-                return await strategy_func(df)
+                return await strategy_func(frame)
             else:
-                return strategy_func(df)
+                return strategy_func(frame)
         return None
 
     # --- পুরাতন স্ট্র্যাটেজিগুলো (অক্ষত আছে) ---
+    # df এখানে এই টিকের শেয়ার্ড FeatureFrame: শেষ রো এর ভ্যালু value() দিয়ে, পুরো রো Series তৈরি না করে
     def scalping_strategy(self, df):
         # ... (আপনার আগের লজিক এখানে থাকবে, আমি ছোট করে লিখলাম বোঝার সুবিধার্থে) ...
-        last_row = df.iloc[-1]
-        if last_row.get('RSI', 50) < 30: return "BUY"
-        if last_row.get('RSI', 50) > 70: return "SELL"
+        rsi = df.value('RSI', 50)
+        if rsi < 30: return "BUY"
+        if rsi > 70: return "SELL"
         return "NEUTRAL"
 
     def momentum_strategy(self, df):
@@ -66,16 +110,15 @@ class StrategyManager:
         
     def conservative_strategy(self, df):
         # Strict rules (example)
-        latest = df.iloc[-1]
         phases = ["Markup", "Accumulation"]
-        if latest.get('market_phase') in phases and latest.get('RSI') < 25:
+        if df.value('market_phase') in phases and df.value('RSI') < 25:
              return "BUY"
         return "NEUTRAL"
 
     def balanced_strategy(self, df):
-        latest = df.iloc[-1]
-        if latest.get('RSI') < 30: return "BUY"
-        if latest.get('RSI') > 70: return "SELL"
+        rsi = df.value('RSI')
+        if rsi < 30: return "BUY"
+        if rsi > 70: return "SELL"
         return "NEUTRAL"
 
     def aggressive_strategy(self, df):
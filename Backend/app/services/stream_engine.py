@@ -8,101 +8,331 @@ from datetime import datetime, timedelta
 # ডিপেন্ডেন্সি ইমপোর্ট
 from app.services.timeframe_manager import TimeframeManager
 from app.services.technical_indicators import TechnicalIndicators
+from app.services.incremental_indicators import IncrementalIndicators
+from app.services.ring_buffer import RingBuffer, OHLCV_COLUMNS
+from app.services.pipeline import StageQueue
+from app.services.client_session import ClientSession
+from app.services.feed_codec import FeedUpdate
+from app.services.feature_frame import FeatureFrame
+from app.services.candle_writer import CandleWriter
+from app.services.trade_writer import TradeWriter
+from app.services.response_cache import market_status_cache
+from app.services.metrics import metrics
 from app.services.signal_engine import SignalEngine
 from app.services.strategy_manager import strategy_manager
 from app.services.trade_executor import trade_executor
 from app.database import db
+from app.core.config import settings
 
 logger = logging.getLogger("StreamEngine")
 
+BUFFER_CAPACITY = 1500
+
+# স্টেজ কিউ সাইজ
+INGEST_QUEUE_SIZE = 1000
+PERSIST_QUEUE_SIZE = 10000
+PUBLISH_QUEUE_SIZE = 1000
+
+
+class SymbolStream:
+    """
+    একটি সিম্বলের সম্পূর্ণ লাইভ স্টেট: রিং বাফার, ইনক্রিমেন্টাল ইন্ডিকেটর, অ্যানালাইসিস টাইমার
+    ও পারসিস্টেন্স। প্রতিটি সিম্বলের বাফার ও অ্যানালাইসিস স্টেজ নিজের asyncio টাস্কে চলে,
+    তাই একটি সিম্বলের ধীর অ্যানালাইসিস অন্য সিম্বলের টিক আটকায় না।
+    """
+    def __init__(self, symbol, capacity=BUFFER_CAPACITY):
+        self.symbol = symbol
+        self.buffer = RingBuffer(OHLCV_COLUMNS, capacity=capacity)
+        self.indicator_stream = IncrementalIndicators(capacity=capacity)
+
+        # টাইমার ও স্টেট
+        self.last_analysis_time = datetime.min
+        self.last_analysis = {"trade_signal": "NEUTRAL", "ai_data": None}
+        self.last_price = None
+        self.last_persisted_time = None
+
+        # পাবলিশ স্টেট (ডেল্টা এনকোডিং এর জন্য seq ও শেষ পাবলিশড ফিল্ড)
+        self.publish_seq = 0
+        self.last_published_fields = None
+
+        # স্টেজ কিউ: ingest -> buffer টাস্ক, buffer -> analyze টাস্ক (শুধু সর্বশেষ ট্রিগার রাখা হয়)
+        # ingest এ কিছুই বাদ যায় না (ক্লোজড/ব্যাকফিল বার হারালে DB তে গ্যাপ); শুধু একই মিনিটের পুরনো চলমান টিক প্রতিস্থাপিত হয়
+        self.ingest = StageQueue(f"ingest:{symbol}", INGEST_QUEUE_SIZE, policy='block')
+        self.analyze = StageQueue(f"analyze:{symbol}", 1, policy='drop_oldest')
+        # ingest এ সর্বশেষ পাঠানো চলমান টিক [time, data] (কিউ খালি না হলে এটিই কিউর শেষ আইটেম)
+        self.pending_tick = None
+        self.tasks = []
+
+    @property
+    def data_buffer(self):
+        """বাফারের zero-copy (রিড-অনলি) ডাটাফ্রেম ভিউ"""
+        return self.buffer.frame()
+
+    @property
+    def last_closed_bar(self):
+        """এই প্রসেসে সর্বশেষ ক্লোজ হয়ে DB তে যাওয়া বারের টাইম (স্টার্টের পর প্রথম বার ক্লোজের আগে None)"""
+        return self.last_persisted_time
+
+    def rebuild_indicator_stream(self):
+        """বাফার পুরোপুরি বদলালে ইনক্রিমেন্টাল ইন্ডিকেটর স্টেট নতুন করে তৈরি করা"""
+        if settings.INCREMENTAL_INDICATORS:
+            self.indicator_stream.warmup(self.buffer.frame())
+
+    def analysis_snapshot(self):
+        """
+        এই টিকের নিজস্ব FeatureFrame: ওয়ার্ম-আপ শেষ হলে ইনক্রিমেন্টাল ফ্রেম (ইন্ডিকেটর সহ), নাহলে র বাফারের কপি।
+        একবারই তৈরি হয়ে রেফারেন্সে স্ট্র্যাটেজি পর্যন্ত যায়; বাফারের ভিউ দেওয়া যায় না কারণ অ্যানালাইসিস
+        await এর মাঝে পরের টিক বাফার বদলে দিতে পারে।
+        """
+        if settings.INCREMENTAL_INDICATORS and self.indicator_stream.is_ready:
+            return FeatureFrame(self.indicator_stream.to_frame(), owned=True)
+        return FeatureFrame(self.buffer.to_frame(), owned=True)
+
+
 class StreamEngine:
-    def __init__(self):
-        self.connected_clients = set()
+    """
+    স্টেজড পাইপলাইন: ingest -> buffer -> persist -> analyze -> publish
+    প্রতিটি স্টেজ বাউন্ডেড কিউ দিয়ে যুক্ত। প্রাইস আপডেট buffer স্টেজ থেকেই সরাসরি publish এ যায়,
+    অ্যানালাইসিস নিজের ছন্দে (analysis_interval_sec বা নতুন বার) চলে, তাই ধীর স্ট্র্যাটেজি প্রাইস আটকায় না।
+    কোনো ক্লায়েন্ট না থাকলেও ক্যান্ডেল সেভ ও ট্রেডিং লজিক চলতে থাকে।
+    """
+    def __init__(self, symbols=None):
+        # websocket -> ClientSession (নিজস্ব সেন্ড কিউ, রাইটার টাস্ক ও সাবস্ক্রিপশন)
+        self.sessions = {}
+        self.evicted_clients = 0
         
         # কোর সার্ভিস
         self.tf_manager = TimeframeManager()
         self.tech_indicators = TechnicalIndicators()
         self.signal_engine = SignalEngine()
         
-        # বাফার
-        self.data_buffer = pd.DataFrame()
-        self.symbol = "BTC/USDT" # ডিফল্ট সিম্বল
+        # প্রতি সিম্বলের আলাদা বাফার ও স্টেট
+        self.symbols = list(symbols or settings.TRADING_SYMBOLS)
+        self.symbol = self.symbols[0] # ডিফল্ট সিম্বল
+        self.streams = {}
+
+        # শেয়ার্ড স্টেজ কিউ (পারসিস্টে ডাটা হারানো যাবে না, পাবলিশে শুধু সর্বশেষ আপডেটই দরকারি)
+        self.persist_queue = StageQueue("persist", PERSIST_QUEUE_SIZE, policy='block')
+        self.publish_queue = StageQueue("publish", PUBLISH_QUEUE_SIZE, policy='drop_oldest')
+        # persist স্টেজ ক্যান্ডেল এখানে জমা করে, সাইজ/টাইম থ্রেশহোল্ডে সব সিম্বল মিলিয়ে এক COPY ব্যাচে সেভ
+        self.candle_writer = CandleWriter(on_flush=self._on_candles_persisted)
+        # ফিডের aggTrade টিক (MarketFeed(trade_handler=trade_writer.add)) সরাসরি এখানে, ব্যাচে market_trades এ
+        self.trade_writer = TradeWriter()
+        # কোল্ড স্টার্ট: সব সিম্বলের ওয়ার্ম-আপ ক্যান্ডেল এক কোয়েরিতে (প্রথম initialize_buffer শুরু করে)
+        self._warm_start = None
+        self.tasks = []
         
         # টাইমার
-        self.last_analysis_time = datetime.min 
-        self.analysis_interval_sec = 30
+        self.analysis_interval_sec = settings.ANALYSIS_INTERVAL_SEC
         
-        # স্টার্টআপ লজিক
-        asyncio.create_task(self.initialize_buffer())
+        # স্টার্টআপ লজিক (ইভেন্ট লুপ চালু থাকলে স্টেজ টাস্ক এখনই শুরু, নাহলে start() এ)
+        for symbol in self.symbols:
+            self.add_symbol(symbol)
+
+    @staticmethod
+    def _loop_running():
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    def start(self):
+        """শেয়ার্ড স্টেজ ও যেসব সিম্বলের স্টেজ এখনো চালু হয়নি সেগুলো চালু করা"""
+        if not self.tasks:
+            self.tasks = [
+                asyncio.create_task(self._persist_stage()),
+                asyncio.create_task(self.candle_writer.run()),
+                asyncio.create_task(self.trade_writer.run()),
+                asyncio.create_task(self._publish_stage())
+            ]
+        for stream in self.streams.values():
+            if not stream.tasks:
+                stream.tasks = [
+                    asyncio.create_task(self._buffer_stage(stream)),
+                    asyncio.create_task(self._analyze_stage(stream))
+                ]
+
+    async def stop(self):
+        """ইনজেশন ও অ্যানালাইসিস বন্ধ করে বাকি থাকা ক্যান্ডেল (কিউ + write-behind বাফার) সেভ করে তারপর শেয়ার্ড স্টেজ বন্ধ"""
+        symbol_tasks = [task for stream in self.streams.values() for task in stream.tasks]
+        for task in symbol_tasks:
+            task.cancel()
+        await asyncio.gather(*symbol_tasks, return_exceptions=True)
+        for stream in self.streams.values():
+            stream.tasks = []
+
+        while len(self.persist_queue):
+            await self._persist_candle(self.persist_queue.get_nowait())
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        await self.candle_writer.close()
+        await self.trade_writer.close()
+
+    def add_symbol(self, symbol):
+        """নতুন সিম্বলের স্ট্রিম তৈরি (আগে থেকে থাকলে সেটিই রিটার্ন)"""
+        stream = self.streams.get(symbol)
+        if stream is None:
+            stream = SymbolStream(symbol)
+            self.streams[symbol] = stream
+            if symbol not in self.symbols:
+                self.symbols.append(symbol)
+            logger.info(f"➕ Symbol Stream Added: {symbol}")
+        if not stream.tasks and self._loop_running():
+            self.start()
+        return stream
 
-    async def initialize_buffer(self):
+    def get_stream(self, symbol=None):
+        return self.streams.get(symbol or self.symbol)
+
+    def last_closed_bar(self, symbol):
+        stream = self.streams.get(symbol)
+        if stream is None:
+            return None
+        return stream.last_closed_bar
+
+    @property
+    def data_buffer(self):
+        """ডিফল্ট সিম্বলের বাফার ভিউ (পুরনো কোডের সাথে সামঞ্জস্যের জন্য)"""
+        return self.streams[self.symbol].data_buffer
+
+    def get_pipeline_stats(self):
+        """প্রতিটি স্টেজ কিউর ডেপথ, ড্রপ, ব্লক ও অপেক্ষার সময় (ব্যাকপ্রেশার মেট্রিক)"""
+        stats = {
+            "persist": self.persist_queue.stats(),
+            "candle_writer": self.candle_writer.stats(),
+            "trade_writer": self.trade_writer.stats(),
+            "publish": self.publish_queue.stats(),
+            "market_status_cache": market_status_cache.stats(),
+            "clients": {
+                "connected": len(self.sessions),
+                "evicted": self.evicted_clients,
+                "pending": sum(len(session.pending) for session in self.sessions.values()),
+                "dropped": sum(session.dropped for session in self.sessions.values())
+            },
+            "symbols": {}
+        }
+        for symbol, stream in self.streams.items():
+            stats["symbols"][symbol] = {
+                "ingest": stream.ingest.stats(),
+                "analyze": stream.analyze.stats(),
+                "buffer_size": len(stream.buffer),
+                "last_analysis_time": stream.last_analysis_time.isoformat() if stream.last_analysis_time != datetime.min else None
+            }
+        return stats
+
+    def collect_metrics(self):
+        """/metrics এর জন্য কিউ ডেপথ ও ক্লায়েন্ট গেজ (স্ক্রেপের সময় পড়া হয়)"""
+        samples = [
+            ("clients_connected", "gauge", "Connected WebSocket clients", {}, len(self.sessions)),
+            ("clients_evicted_total", "counter", "Slow clients evicted", {}, self.evicted_clients),
+            ("client_pending_updates", "gauge", "Coalesced updates waiting in client send queues", {},
+             sum(len(session.pending) for session in self.sessions.values())),
+            ("candles_pending", "gauge", "Closed candles buffered for the next batch write", {}, len(self.candle_writer)),
+            ("candles_persisted_total", "counter", "Candles written by the batch writer", {}, self.candle_writer.flushed),
+            ("trades_pending", "gauge", "Trades buffered for the next market_trades COPY", {}, len(self.trade_writer)),
+            ("trades_received_total", "counter", "Trades received from the market feed", {}, self.trade_writer.received),
+            ("trades_persisted_total", "counter", "Trades written to market_trades", {}, self.trade_writer.flushed)
+        ]
+        queues = [self.persist_queue, self.publish_queue]
+        for stream in self.streams.values():
+            queues += [stream.ingest, stream.analyze]
+            samples.append(("buffer_rows", "gauge", "Rows in the symbol ring buffer", {"symbol": stream.symbol}, len(stream.buffer)))
+        for queue in queues:
+            stats = queue.stats()
+            labels = {"queue": queue.name}
+            samples += [
+                ("queue_depth", "gauge", "Current stage queue depth", labels, stats["depth"]),
+                ("queue_max_depth", "gauge", "Highest stage queue depth seen", labels, stats["max_depth"]),
+                ("queue_dropped_total", "counter", "Items dropped by a stage queue", labels, stats["dropped"]),
+                ("queue_blocked_total", "counter", "Producers blocked on a full stage queue", labels, stats["blocked"])
+            ]
+        return samples
+
+    async def initialize_buffer(self, stream):
         """TimescaleDB থেকে কোল্ড স্টার্ট ডাটা লোড"""
-        logger.info("🔄 Initializing Buffer from TimescaleDB...")
+        logger.info(f"🔄 [{stream.symbol}] Initializing Buffer from TimescaleDB...")
         try:
-            db_df = await db.get_recent_candles(self.symbol, limit=1500)
+            db_df = await self._warm_start_frame(stream.symbol)
             
             needs_fetch = False
             
             if db_df.empty:
-                logger.warning("⚠️ DB Empty! Fetching from Binance...")
+                logger.warning(f"⚠️ [{stream.symbol}] DB Empty! Fetching from Binance...")
                 needs_fetch = True
             else:
-                self.data_buffer = db_df
+                stream.buffer.load(db_df)
                 last_time = db_df.index[-1]
-                # Timezone info বাদ দিয়ে তুলনা (Error avoid করার জন্য)
+                # Timezone info বাদ দিয়ে তুলনা (Error avoid করার জন্য)
                 if last_time.tzinfo:
                     last_time = last_time.tz_localize(None)
                 
                 time_now = datetime.now()
                 
                 if (time_now - last_time).total_seconds() > 600:
-                    logger.warning(f"⚠️ Data Outdated. Syncing...")
+                    logger.warning(f"⚠️ [{stream.symbol}] Data Outdated. Syncing...")
                     needs_fetch = True
             
             if needs_fetch:
-                await self.sync_with_exchange()
+                await self.sync_with_exchange(stream)
+
+            stream.rebuild_indicator_stream()
                 
         except Exception as e:
-            logger.error(f"Initialization Error: {e}")
+            logger.error(f"[{stream.symbol}] Initialization Error: {e}")
+
+    async def _warm_start_frame(self, symbol):
+        """
+        সব সিম্বলের শেষ BUFFER_CAPACITY ক্যান্ডেল এক রাউন্ড-ট্রিপে আনা হয়, প্রতিটি স্ট্রিম নিজের অংশ নেয়।
+        একবার নেওয়া অংশ আর রাখা হয় না, তাই রিকানেক্ট বা পরে যোগ হওয়া সিম্বল আলাদা করে সর্বশেষ ডাটা আনে।
+        """
+        if self._warm_start is None:
+            self._warm_start = asyncio.ensure_future(db.get_recent_candles_multi(self.symbols, limit=BUFFER_CAPACITY))
+        frames = await asyncio.shield(self._warm_start)
+        if symbol in frames:
+            return frames.pop(symbol)
+        return await db.get_recent_candles(symbol, limit=BUFFER_CAPACITY)
 
-    async def sync_with_exchange(self):
+    async def sync_with_exchange(self, stream):
         """Binance থেকে মিসিং ডাটা আনা"""
         exchange = ccxt.binance({'enableRateLimit': True})
         try:
-            ohlcv = await exchange.fetch_ohlcv(self.symbol, '1m', limit=1500)
+            ohlcv = await exchange.fetch_ohlcv(stream.symbol, '1m', limit=BUFFER_CAPACITY)
             if ohlcv:
                 formatted_data = []
                 for candle in ohlcv:
                     formatted_data.append({
                         'time': datetime.fromtimestamp(candle[0]/1000).isoformat(),
-                        's': self.symbol,
+                        's': stream.symbol,
                         'open': candle[1], 'high': candle[2], 'low': candle[3], 
                         'close': candle[4], 'volume': candle[5]
                     })
                 
                 if formatted_data:
                     await db.save_bulk_candles(formatted_data)
-                    self.data_buffer = await db.get_recent_candles(self.symbol, limit=1500)
+                    stream.buffer.load(await db.get_recent_candles(stream.symbol, limit=BUFFER_CAPACITY))
                 
         except Exception as e:
-            logger.error(f"Sync Error: {e}")
+            logger.error(f"[{stream.symbol}] Sync Error: {e}")
         finally:
             await exchange.close()
 
-    async def run_automation_logic(self, candle_data):
+    async def run_automation_logic(self, stream, candle_data):
         """
         মার্কেট ডাটা আসার পর এই ফাংশনটি চলে।
         এটি এখন AI সিগন্যাল হ্যান্ডেল করতে পারে।
         """
-        # ডাটাফ্রেমে কনভার্ট (সিম্পলিফাইড)
-        # যেহেতু broadcast এ ডাটা এড হচ্ছে, আমরা data_buffer ব্যবহার করতে পারি
-        if self.data_buffer.empty: return {"trade_signal": "NEUTRAL", "ai_data": None}
+        # যেহেতু broadcast এ ডাটা এড হচ্ছে, আমরা রিং বাফার ব্যবহার করতে পারি
+        if stream.buffer.empty: return {"trade_signal": "NEUTRAL", "ai_data": None}
         
-        df = self.data_buffer.copy()
+        frame = stream.analysis_snapshot()
 
         # ১. স্ট্র্যাটেজি ম্যানেজার থেকে সিগন্যাল আনা
-        # এখন এটি শুধু "BUY" স্ট্রিং না হয়ে একটি Dictionary ও হতে পারে
-        signal_data = await strategy_manager.get_signal(df)
+        # এখন এটি শুধু "BUY" স্ট্রিং না হয়ে একটি Dictionary ও হতে পারে
+        signal_data = await strategy_manager.get_signal(frame)
         
         trade_signal = "NEUTRAL"
         ai_meta_data = None
@@ -121,15 +351,17 @@ class StreamEngine:
             trade_signal = str(signal_data)
             ai_meta_data = {'is_ai': False}
 
-        # ৩. ট্রেড এক্সিকিউশন (Executor কে শুধু BUY/SELL স্ট্রিং দেওয়া হবে)
+        # ৩. ট্রেড এক্সিকিউশন (Executor কে শুধু BUY/SELL স্ট্রিং দেওয়া হবে)
         if trade_signal in ["BUY", "SELL"]:
             await trade_executor.execute_trade({
-                "symbol": candle_data.get('s', self.symbol),
+                "symbol": stream.symbol,
                 "side": trade_signal,
                 "price": candle_data.get('close'),
                 "strategy": strategy_manager.current_mode
             })
 
+        stream.last_analysis_time = datetime.now()
+
         # ৪. ফ্রন্টএন্ডের জন্য ডাটা রিটার্ন (WebSocket এর মাধ্যমে যাবে)
         return {
             "trade_signal": trade_signal,
@@ -137,9 +369,11 @@ class StreamEngine:
         }
 
     async def broadcast(self, raw_candle_data):
-        if not self.connected_clients:
-            return
-
+        """
+        ingest স্টেজ: লিসেনার থেকে আসা টিক পার্স করে সংশ্লিষ্ট সিম্বলের কিউতে পাঠানো।
+        একই মিনিটের চলমান টিক কিউতে অপেক্ষমাণ থাকলে নতুনটি সেটিকে প্রতিস্থাপন করে (মেট্রিকে dropped);
+        ক্লোজড/ব্যাকফিল বার ('closed', ফ্ল্যাগ না থাকলে ক্লোজড ধরা হয়) কখনো বাদ যায় না, কিউ ভরা থাকলে অপেক্ষা করে।
+        """
         try:
             # ============================================================
             # FIX: Symbol Definition
@@ -165,58 +399,246 @@ class StreamEngine:
             else:
                 current_time = pd.Timestamp.now(tz='UTC')
 
-            new_candle = pd.DataFrame([processed_data], index=[current_time])
-            new_candle.index.name = 'timestamp'
+            # শুধু কনফিগার করা সিম্বল (স্ট্রিম __init__ এ তৈরি); অজানা সিম্বলের টিক থেকে নতুন স্ট্রিম/টাস্ক হয় না
+            stream = self.streams.get(symbol)
+            if stream is None:
+                return
+            closed = raw_candle_data.get('closed', True)
+            pending = stream.pending_tick
+            if not closed and pending is not None and len(stream.ingest) and pending[0] == current_time:
+                # FIFO: কিউ খালি না হলে সর্বশেষ পাঠানো আইটেম এখনো কিউতে, তাই পুরনো টিক জায়গাতেই বদলানো
+                pending[1] = processed_data
+                stream.ingest.dropped += 1
+                return
+            item = [current_time, processed_data]
+            await stream.ingest.put(item)
+            stream.pending_tick = None if closed else item
 
+        except Exception as e:
+            logger.error(f"StreamEngine Error: {e}", exc_info=True)
+
+    # ============================================================
+    # পাইপলাইন স্টেজ
+    # ============================================================
+    async def _buffer_stage(self, stream):
+        """buffer স্টেজ: কোল্ড স্টার্টের পর টিক বাফারে বসানো, বার শেষ হলে persist/analyze এ পাঠানো, প্রাইস publish"""
+        await self.initialize_buffer(stream)
+        try:
+            while True:
+                current_time, processed_data = await stream.ingest.get()
+                await self.process_tick(stream, current_time, processed_data)
+        except asyncio.CancelledError:
+            logger.info(f"🛑 [{stream.symbol}] Buffer Stage Stopped.")
+            raise
+
+    @metrics.timed("process_tick")
+    async def process_tick(self, stream, current_time, processed_data):
+        try:
             # ============================================================
             # ধাপ-২: বাফার ও TimescaleDB সেভিং
             # ============================================================
-            if self.data_buffer.empty:
-                self.data_buffer = pd.concat([self.data_buffer, new_candle])
-            else:
-                last_idx_time = self.data_buffer.index[-1]
+            is_new_bar = True
+            if not stream.buffer.empty:
+                last_idx_time = stream.buffer.last_time
+
+                # বাফারের শেষ বারের আগের টিক (যেমন কোল্ড স্টার্টের সময় জমে থাকা) বাদ
+                if current_time < last_idx_time.floor('min'):
+                    return
+
+                is_new_bar = current_time.minute != last_idx_time.minute
                 
                 # নতুন মিনিট ডিটেকশন
-                if current_time.minute != last_idx_time.minute:
-                    last_completed_candle = self.data_buffer.iloc[-1].to_dict()
+                if is_new_bar:
+                    last_completed_candle = stream.buffer.last_row()
                     last_completed_candle['time'] = last_idx_time.isoformat()
-                    last_completed_candle['s'] = symbol 
+                    last_completed_candle['s'] = stream.symbol
                     
-                    # Async Save to TimescaleDB
-                    asyncio.create_task(db.save_candle(last_completed_candle))
-                    logger.info(f"💾 Persisted Candle: {last_idx_time.strftime('%H:%M')}")
+                    # persist স্টেজে পাঠানো (কিউ ভরা থাকলে এখানে অপেক্ষা = ব্যাকপ্রেশার);
+                    # last_persisted_time সরে CandleWriter ফ্লাশের পর (_on_candles_persisted), যাতে ক্যাশ কী DB এর আগে না যায়
+                    await self.persist_queue.put(last_completed_candle)
 
-                    self.data_buffer = pd.concat([self.data_buffer, new_candle])
-                else:
-                    self.data_buffer = self.data_buffer.iloc[:-1]
-                    self.data_buffer = pd.concat([self.data_buffer, new_candle])
+            # নতুন মিনিট হলে অ্যাপেন্ড, নাহলে চলমান ক্যান্ডেল ইন-প্লেস আপডেট (ক্যাপাসিটি পার হলে পুরনো রো আপনা-আপনি বাদ)
+            stream.buffer.upsert(current_time, [processed_data[col] for col in OHLCV_COLUMNS], new_row=is_new_bar)
 
-            if len(self.data_buffer) > 1500: 
-                self.data_buffer = self.data_buffer.iloc[-1500:]
+            # ইনক্রিমেন্টাল ইন্ডিকেটর আপডেট (শুধু শেষ ক্যান্ডেল, O(1))
+            if settings.INCREMENTAL_INDICATORS:
+                stream.indicator_stream.update(
+                    current_time, processed_data['open'], processed_data['high'], processed_data['low'],
+                    processed_data['close'], processed_data['volume'], new_bar=is_new_bar
+                )
 
-            # ============================================================
-            # ধাপ-৩: প্রসেসিং এবং অটোমেশন
-            # ============================================================
-            # Analysis Logic call
-            analysis_result = await self.run_automation_logic(processed_data)
-            
-            # Message Send
-            message = json.dumps({
-                "type": "market_update",
-                "price_data": processed_data,
-                "analysis": analysis_result # এর ভেতরেই AI Confidence আছে
-            })
+            stream.last_price = processed_data
+
+            # নতুন বার শুরু হলে অ্যানালাইসিস ট্রিগার (আগের ট্রিগার বাকি থাকলে সেটি প্রতিস্থাপিত হয়)
+            if is_new_bar:
+                stream.analyze.put_nowait(current_time)
 
-            if self.connected_clients:
-                await asyncio.gather(*[client.send_text(message) for client in self.connected_clients])
+            # প্রাইস সাথে সাথে পাবলিশ (সর্বশেষ জানা অ্যানালাইসিস সহ)
+            self.publish(stream)
 
         except Exception as e:
-            logger.error(f"StreamEngine Error: {e}", exc_info=True)
+            logger.error(f"[{stream.symbol}] StreamEngine Error: {e}", exc_info=True)
+
+    async def _persist_stage(self):
+        """persist স্টেজ: সম্পূর্ণ ক্যান্ডেল ক্রমানুসারে write-behind বাফারে (ফ্লাশ CandleWriter এ)"""
+        try:
+            while True:
+                candle = await self.persist_queue.get()
+                await self._persist_candle(candle)
+        except asyncio.CancelledError:
+            logger.info("🛑 Persist Stage Stopped.")
+            raise
 
-    async def connect(self, websocket):
+    async def _persist_candle(self, candle):
+        try:
+            await self.candle_writer.add(candle)
+        except Exception as e:
+            logger.error(f"[{candle.get('s')}] Persist Error: {e}")
+
+    def _on_candles_persisted(self, candles):
+        """ব্যাচ সেভ হওয়ার পর: নতুন বার ক্লোজ হয়েছে, ওই সিম্বলগুলোর পুরনো market-status ক্যাশ আর কাজে লাগবে না"""
+        latest = {}
+        for candle in candles:
+            latest[candle['s']] = max(latest.get(candle['s'], candle['time']), candle['time'])
+        for symbol, bar_time in latest.items():
+            bar_time = pd.Timestamp(bar_time)
+            stream = self.streams.get(symbol)
+            if stream is not None and (stream.last_persisted_time is None or bar_time > stream.last_persisted_time):
+                stream.last_persisted_time = bar_time
+            market_status_cache.invalidate(symbol, bar_time)
+        logger.info(f"💾 Persisted {len(candles)} Candles ({', '.join(f'{s} {t[11:16]}' for s, t in latest.items())})")
+
+    async def _analyze_stage(self, stream):
+        """analyze স্টেজ: নতুন বার শুরু হলে অথবা প্রতি analysis_interval_sec এ স্ট্র্যাটেজি চালানো"""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(stream.analyze.get(), timeout=self.analysis_interval_sec)
+                except asyncio.TimeoutError:
+                    pass
+
+                if stream.last_price is None:
+                    continue
+
+                try:
+                    stream.last_analysis = await self.run_automation_logic(stream, stream.last_price)
+                    self.publish(stream)
+                except Exception as e:
+                    logger.error(f"[{stream.symbol}] Analysis Error: {e}", exc_info=True)
+        except asyncio.CancelledError:
+            logger.info(f"🛑 [{stream.symbol}] Analyze Stage Stopped.")
+            raise
+
+    def publish(self, stream):
+        """সাবস্ক্রাইবার থাকলে সর্বশেষ প্রাইস ও অ্যানালাইসিস publish স্টেজে পাঠানো"""
+        if not self.connected_clients or stream.last_price is None:
+            return
+        self.publish_queue.put_nowait({
+            "type": "market_update",
+            "price_data": stream.last_price,
+            "analysis": stream.last_analysis # এর ভেতরেই AI Confidence আছে
+        })
+
+    async def _publish_stage(self):
+        """
+        publish স্টেজ: আপডেটে seq বসিয়ে প্রতিটি সাবস্ক্রাইবারের নিজস্ব কিউতে রাখা।
+        এনকোডিং (একবার করে, ক্যাশড) ও সেন্ড হয় ক্লায়েন্টের রাইটার টাস্কে, তাই এই স্টেজ কোনো ক্লায়েন্টের জন্য অপেক্ষা করে না।
+        """
+        try:
+            while True:
+                update = await self.publish_queue.get()
+                symbol = update["price_data"]["s"]
+                sessions = self.clients_for(symbol)
+                if not sessions:
+                    continue
+                stream = self.streams[symbol]
+                stream.publish_seq += 1
+                feed_update = FeedUpdate(symbol, stream.publish_seq, update, previous=stream.last_published_fields)
+                stream.last_published_fields = feed_update.fields
+                with metrics.timer("ws_fanout"):
+                    for session in sessions:
+                        session.enqueue(symbol, feed_update)
+        except asyncio.CancelledError:
+            logger.info("🛑 Publish Stage Stopped.")
+            raise
+
+    # ============================================================
+    # ক্লায়েন্ট ও সাবস্ক্রিপশন
+    # ============================================================
+    @property
+    def connected_clients(self):
+        return self.sessions.keys()
+
+    async def connect(self, websocket, symbols=None, encoding="json", delta=False):
         await websocket.accept()
-        self.connected_clients.add(websocket)
+        session = ClientSession(websocket, on_evict=self._on_evict, encoding=encoding, delta=delta)
+        self.sessions[websocket] = session
+        session.start()
+        if symbols:
+            self.subscribe(websocket, symbols)
 
     def disconnect(self, websocket):
-        if websocket in self.connected_clients:
-            self.connected_clients.remove(websocket)
+        session = self.sessions.pop(websocket, None)
+        if session is not None:
+            session.close()
+
+    def _on_evict(self, session):
+        self.evicted_clients += 1
+        self.sessions.pop(session.websocket, None)
+
+    def subscribe(self, websocket, symbols):
+        """
+        ক্লায়েন্টকে নির্দিষ্ট সিম্বলগুলোর আপডেট পাঠানো (প্রথম subscribe এ 'সব সিম্বল' মোড বন্ধ হয়)।
+        শুধু চালু থাকা স্ট্রিমের (TRADING_SYMBOLS) সিম্বল নেওয়া হয়; ক্লায়েন্ট ইনপুট থেকে কখনো নতুন স্ট্রিম তৈরি হয় না।
+        """
+        session = self.sessions.get(websocket)
+        if session is None:
+            return
+        accepted = {symbol for symbol in symbols if isinstance(symbol, str) and symbol in self.streams}
+        ignored = sum(1 for symbol in symbols if not (isinstance(symbol, str) and symbol in accepted))
+        if ignored:
+            logger.warning(f"⚠️ Ignored {ignored} unknown symbols in subscribe")
+        session.symbols = (session.symbols or set()) | accepted
+
+    def unsubscribe(self, websocket, symbols):
+        session = self.sessions.get(websocket)
+        if session is None:
+            return
+        current = set(self.streams) if session.symbols is None else session.symbols
+        session.symbols = current - {symbol for symbol in symbols if isinstance(symbol, str)}
+
+    def clients_for(self, symbol):
+        return [session for session in self.sessions.values() if session.wants(symbol)]
+
+    def handle_client_message(self, websocket, text):
+        """
+        ক্লায়েন্ট মেসেজ:
+          {"action": "subscribe" | "unsubscribe", "symbols": ["ETH/USDT", ...]}
+          {"action": "configure", "encoding": "json" | "binary", "delta": true | false}
+        অন্য যেকোনো মেসেজ (পিং ইত্যাদি) ইগনোর করা হয়।
+        """
+        try:
+            message = json.loads(text)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(message, dict):
+            return
+
+        symbols = message.get('symbols') or []
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        elif not isinstance(symbols, list):
+            return
+
+        action = message.get('action')
+        if action == 'subscribe':
+            self.subscribe(websocket, symbols)
+        elif action == 'unsubscribe':
+            self.unsubscribe(websocket, symbols)
+        elif action == 'configure':
+            session = self.sessions.get(websocket)
+            if session is not None:
+                try:
+                    session.configure(message.get('encoding'), message.get('delta'))
+                except ValueError as e:
+                    logger.warning(f"⚠️ {e}")
@@ -2,11 +2,81 @@ import pandas as pd
 import pandas_ta as ta
 import logging
 import numpy as np
+from app.core.config import settings
+from app.services.indicator_kernels import IndicatorKernels, BACKENDS
+from app.services.metrics import metrics
 
 logger = logging.getLogger("TechnicalIndicators")
 
+class Feature:
+    """
+    ডিপেন্ডেন্সি গ্রাফের একটি নোড: এক বা একাধিক আউটপুট কলাম, যে নোডগুলো আগে লাগবে এবং হিসাবের মেথড।
+    group = None মানে config এর গ্রুপ-সুইচ দিয়ে বন্ধ হয় না।
+    """
+    __slots__ = ("name", "group", "columns", "method", "requires")
+
+    def __init__(self, name, group, columns, method, requires=()):
+        self.name = name
+        self.group = group
+        self.columns = tuple(columns)
+        self.method = method
+        self.requires = tuple(requires)
+
+
+# হিসাবের ক্রম = এই লিস্টের ক্রম (আগের ফুল পাথের কলাম-ক্রম হুবহু থাকে, IncrementalIndicators এর সাথে মিলে)
+FEATURES = [
+    Feature("vwap", None, ["vwap"], "_calc_vwap"),
+    Feature("smart_delta", None, ["smart_delta"], "_calc_smart_delta"),
+    # Trend
+    Feature("sma_20", "trend", ["SMA_20"], "_calc_sma_20"),
+    Feature("ema_20", "trend", ["EMA_20"], "_calc_ema_20"),
+    Feature("ema_50", "trend", ["EMA_50"], "_calc_ema_50"),
+    Feature("ema_200", "trend", ["EMA_200"], "_calc_ema_200"),
+    Feature("macd", "trend", ["MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9"], "_calc_macd"),
+    Feature("psar", "trend", ["PSARl_0.02_0.2", "PSARs_0.02_0.2", "PSARaf_0.02_0.2", "PSARr_0.02_0.2"], "_calc_psar"),
+    Feature("adx", "trend", ["ADX_14", "ADXR_14_2", "DMP_14", "DMN_14"], "_calc_adx"),
+    Feature("ichimoku", "trend", ["ISA_9", "ISB_26", "ITS_9", "IKS_26", "ICS_26"], "_calc_ichimoku"),
+    Feature("supertrend", "trend", ["SUPERT_7_3.0", "SUPERTd_7_3.0", "SUPERTl_7_3.0", "SUPERTs_7_3.0"], "_calc_supertrend"),
+    Feature("linreg", "trend", ["LINREG_14"], "_calc_linreg"),
+    # Momentum
+    Feature("rsi", "momentum", ["RSI_14"], "_calc_rsi"),
+    Feature("stoch", "momentum", ["STOCHk_14_3_3", "STOCHd_14_3_3", "STOCHh_14_3_3"], "_calc_stoch"),
+    Feature("cci", "momentum", ["CCI_14_0.015"], "_calc_cci"),
+    Feature("willr", "momentum", ["WILLR_14"], "_calc_willr"),
+    Feature("ao", "momentum", ["AO_5_34"], "_calc_ao"),
+    Feature("roc", "momentum", ["ROC_10"], "_calc_roc"),
+    Feature("mom", "momentum", ["MOM_10"], "_calc_mom"),
+    Feature("uo", "momentum", ["UO_7_14_28"], "_calc_uo"),
+    # Volume
+    Feature("obv", "volume", ["OBV"], "_calc_obv"),
+    Feature("mfi", "volume", ["MFI_14"], "_calc_mfi"),
+    Feature("cmf", "volume", ["CMF_20"], "_calc_cmf"),
+    Feature("ad", "volume", ["AD"], "_calc_ad"),
+    Feature("eom", "volume", ["EOM_14_100000000"], "_calc_eom"),
+    Feature("volume_profile", "volume", ["vp_poc", "vp_vah", "vp_val"], "_calc_volume_profile"),
+    # Volatility
+    Feature("bbands", "volatility", ["BBL_5_2.0_2.0", "BBM_5_2.0_2.0", "BBU_5_2.0_2.0", "BBB_5_2.0_2.0", "BBP_5_2.0_2.0"], "_calc_bbands"),
+    Feature("atr", "volatility", ["ATRr_14"], "_calc_atr"),
+    Feature("kc", "volatility", ["KCLe_20_2", "KCBe_20_2", "KCUe_20_2"], "_calc_kc"),
+    Feature("chop", "volatility", ["CHOP_14_1_100.0"], "_calc_chop"),
+    # Special
+    Feature("ewo", "special", ["ewo"], "_calc_ewo"),
+    Feature("fractals", "special", ["fractal_top"], "_calc_fractals"),
+    Feature("pivot", "special", ["pivot_p"], "_calc_pivot"),
+    Feature("gann", "special", ["gann_angle"], "_calc_gann"),
+    # মার্কেট ফেজ (ATR, VWAP ও Smart Delta না থাকলেও ডিফল্ট দিয়ে চলে)
+    Feature("market_phase", None, ["market_phase"], "_detect_market_phase", requires=["atr", "vwap", "smart_delta"]),
+]
+FEATURE_INDEX = {feature.name: index for index, feature in enumerate(FEATURES)}
+# কলামের নাম দিয়েও ফিচার চাওয়া যায় (যেমন "RSI_14" -> rsi)
+COLUMN_FEATURES = {column: feature.name for feature in FEATURES for column in feature.columns}
+ALL_FEATURES = tuple(feature.name for feature in FEATURES)
+# INDICATOR_BACKEND=numpy/numba হলে এই ফিচারগুলো IndicatorKernels দিয়ে হিসাব হয়
+NATIVE_FEATURES = ("ema_20", "ema_50", "ema_200", "psar", "adx", "supertrend", "rsi", "stoch", "obv", "mfi", "bbands", "atr")
+
+
 class TechnicalIndicators:
-    def __init__(self):
+    def __init__(self, backend=None):
         self.config = {
             "trend": True,
             "momentum": True,
@@ -14,50 +84,96 @@ class TechnicalIndicators:
             "volatility": True,
             "special": True
         }
+        self._plans = {}
 
-    def apply_all_indicators(self, df):
+        # নেটিভ কার্নেল (EMA, RSI, ATR, ADX, SuperTrend, PSAR, Stoch, BBands, MFI, OBV); pandas_ta হলে None
+        backend = (backend or settings.INDICATOR_BACKEND).lower()
+        if backend not in BACKENDS:
+            logger.warning(f"⚠️ Unknown INDICATOR_BACKEND '{backend}', using pandas_ta")
+            backend = "pandas_ta"
+        self.kernels = None if backend == "pandas_ta" else IndicatorKernels(use_numba=backend == "numba")
+
+    # ============================================================
+    # ডিপেন্ডেন্সি গ্রাফ
+    # ============================================================
+    def resolve(self, features=None):
         """
-        সমস্ত টেকনিক্যাল ইন্ডিকেটর অ্যাপ্লাই করে।
-        FIX: Updated DataFrame.fillna() syntax to avoid FutureWarnings.
+        চাওয়া ফিচার (নোড বা কলামের নাম) + তাদের নির্ভরতা, হিসাবের ক্রমে (টপোলজিক্যাল = FEATURES এর ক্রম)।
+        None মানে সব ফিচার; config এ বন্ধ গ্রুপের নোড বাদ যায়।
+        """
+        key = (None if features is None else tuple(features), tuple(self.config.items()))
+        plan = self._plans.get(key)
+        if plan is not None:
+            return plan
+
+        if features is None:
+            names = set(ALL_FEATURES)
+        else:
+            names = set()
+            pending = []
+            for requested in features:
+                name = requested if requested in FEATURE_INDEX else COLUMN_FEATURES.get(requested)
+                if name is None:
+                    logger.warning(f"⚠️ Unknown indicator feature requested: {requested}")
+                    continue
+                pending.append(name)
+            while pending:
+                name = pending.pop()
+                if name not in names:
+                    names.add(name)
+                    pending.extend(FEATURES[FEATURE_INDEX[name]].requires)
+
+        plan = tuple(
+            feature.name for feature in FEATURES
+            if feature.name in names and (feature.group is None or self.config.get(feature.group, True))
+        )
+        self._plans[key] = plan
+        return plan
+
+    def covers(self, df, features=None):
+        """ফ্রেমে চাওয়া ফিচারগুলো আগেই হিসাব করা আছে কি না (ইনক্রিমেন্টাল ফ্রেমে সব আছে)"""
+        if df.attrs.get('indicators_applied'):
+            return True
+        done = df.attrs.get('indicator_features')
+        return done is not None and done.issuperset(self.resolve(features))
+
+    @metrics.timed("apply_all_indicators")
+    def apply_indicators(self, df, features=None, copy=True):
+        """
+        শুধু চাওয়া ফিচার ও তাদের নির্ভরতা হিসাব করে (features=None হলে সব)।
+        একাধিক ইন্ডিকেটরে লাগে এমন মধ্যবর্তী সিরিজ (যেমন একই SMA) একবারই হিসাব হয়ে শেয়ার হয়।
+        copy=False: ফ্রেমটি কলারের নিজস্ব কপি (যেমন ওয়ার্কারে আনপিকল করা), তাই সরাসরি কলাম বসানো হয়।
         """
         if df is None or df.empty:
             return df
 
-        data = df.copy()
+        # IncrementalIndicators থেকে আসা ফ্রেমে ইন্ডিকেটর আগেই হিসাব করা আছে
+        if self.covers(df, features):
+            return df
+
+        plan = self.resolve(features)
+        data = df.copy() if copy else df
 
         try:
-            # ১. ডাটা ক্লিনিং
+            # ১. ডাটা ক্লিনিং (আগে থেকেই নিউমেরিক কলাম আবার কনভার্ট করা হয় না)
             cols = ['open', 'high', 'low', 'close', 'volume']
             for col in cols:
-                data[col] = pd.to_numeric(data[col], errors='coerce')
-            
-            # FIX: method='ffill' deprecated, তাই ffill() ব্যবহার করা হলো
-            data.ffill(inplace=True) 
-            data.fillna(0, inplace=True) # Downcasting warning এড়াতে চাইলে infer_objects() ব্যবহার করা যায়, তবে এটি সেফ।
-
-            # VWAP: turnover / volume (Manually calc if not present)
-            if 'turnover' in data.columns and 'volume' in data.columns:
-                vol_cumsum = data['volume'].cumsum()
-                data['vwap'] = (data['turnover'].cumsum()) / vol_cumsum.replace(0, 1)
-            
-            # Smart Delta
-            if 'vol_buy' in data.columns and 'vol_sell' in data.columns:
-                data['vol_buy'] = data['vol_buy'].fillna(0)
-                data['vol_sell'] = data['vol_sell'].fillna(0)
-                data['smart_delta'] = data['vol_buy'] - data['vol_sell']
-
-            # ২. ইন্ডিকেটর ক্যালকুলেশন (Pandas TA)
-            if self.config['trend']: data = self._calculate_trend(data)
-            if self.config['momentum']: data = self._calculate_momentum(data)
-            if self.config['volume']: data = self._calculate_volume(data)
-            if self.config['volatility']: data = self._calculate_volatility(data)
-            if self.config['special']: data = self._calculate_special(data)
-
-            # ৩. মার্কেট ফেজ
-            data = self._detect_market_phase(data)
+                if not pd.api.types.is_numeric_dtype(data[col]):
+                    data[col] = pd.to_numeric(data[col], errors='coerce')
+
+            # FIX: method='ffill' deprecated, তাই ffill() ব্যবহার করা হলো; NaN না থাকলে দুটো পুরো-ফ্রেম পাস বাদ
+            if data.isna().to_numpy().any():
+                data.ffill(inplace=True)
+                data.fillna(0, inplace=True) # Downcasting warning এড়াতে চাইলে infer_objects() ব্যবহার করা যায়, তবে এটি সেফ।
+
+            # ২. ইন্ডিকেটর ক্যালকুলেশন (Pandas TA), শুধু প্ল্যানের নোড
+            shared = {}
+            for name in plan:
+                data = getattr(self, FEATURES[FEATURE_INDEX[name]].method)(data, shared)
 
             # ফাইনাল ক্লিনআপ
             data.fillna(0, inplace=True)
+            data.attrs['indicator_features'] = frozenset(plan)
 
             return data
 
@@ -65,51 +181,237 @@ class TechnicalIndicators:
             logger.error(f"Error calculating indicators: {e}")
             return df
 
-    def _calculate_trend(self, df):
+    def apply_all_indicators(self, df):
+        """
+        সমস্ত টেকনিক্যাল ইন্ডিকেটর অ্যাপ্লাই করে।
+        FIX: Updated DataFrame.fillna() syntax to avoid FutureWarnings.
+        """
+        return self.apply_indicators(df)
+
+    def _array(self, df, shared, column):
+        """কলামের contiguous float64 অ্যারে (এক হিসাবে প্রতি কলাম একবারই)"""
+        key = ('array', column)
+        if key not in shared:
+            shared[key] = np.ascontiguousarray(df[column].to_numpy(dtype=np.float64))
+        return shared[key]
+
+    def _native(self, df, shared, feature, kernel, inputs, **params):
+        """নেটিভ কার্নেল চালিয়ে ফিচারের কলামগুলো বসানো (pandas_ta এর মতো ডাটা কম হলে কিছুই যোগ হয় না)"""
         try:
-            if len(df) > 20:
-                df.ta.sma(length=20, append=True)
-                df.ta.ema(length=20, append=True)
-            if len(df) > 50: df.ta.ema(length=50, append=True)
-            if len(df) > 200: df.ta.ema(length=200, append=True)
-            
-            df.ta.macd(append=True)
-            df.ta.psar(append=True)
-            df.ta.adx(append=True)
-            
-            try:
-                if len(df) >= 9:
-                    ichi = ta.ichimoku(df['high'], df['low'], df['close'])[0]
-                    df = pd.concat([df, ichi], axis=1)
-            except: pass
-            
-            df.ta.supertrend(append=True)
-            df.ta.linreg(append=True)
+            result = kernel(*[self._array(df, shared, column) for column in inputs], **params)
+            if result is None:
+                return df
+            if not isinstance(result, tuple):
+                result = (result,)
+            for column, values in zip(FEATURES[FEATURE_INDEX[feature]].columns, result):
+                df[column] = values
+        except Exception as e:
+            logger.error(f"❌ Native Kernel Error ({feature}): {e}")
+        return df
+
+    def verify_native_backend(self, df, rtol=1e-9, atol=1e-9):
+        """
+        নেটিভ কার্নেলের আউটপুট pandas_ta এর সাথে তুলনা।
+        রিটার্ন: {"match": bool, "backend": ..., "columns": n, "mismatches": [...]}
+        """
+        native = self if self.kernels is not None else TechnicalIndicators(backend="numba")
+        reference = TechnicalIndicators(backend="pandas_ta")
+        features = list(NATIVE_FEATURES)
+        expected = reference.apply_indicators(df, features)
+        actual = native.apply_indicators(df, features)
+
+        mismatches = []
+        columns = [c for name in features for c in FEATURES[FEATURE_INDEX[name]].columns if c in expected.columns]
+        for column in columns:
+            if column not in actual.columns:
+                mismatches.append(f"{column}: missing")
+                continue
+            left = expected[column].to_numpy(dtype=np.float64)
+            right = actual[column].to_numpy(dtype=np.float64)
+            close = np.isclose(left, right, rtol=rtol, atol=atol, equal_nan=True)
+            if not close.all():
+                idx = int(np.flatnonzero(~close)[0])
+                mismatches.append(f"{column} row {idx}: {left[idx]} != {right[idx]}")
+        extra = [c for c in actual.columns if c not in expected.columns]
+        mismatches.extend(f"{column}: unexpected" for column in extra)
+        return {"match": not mismatches, "backend": native.kernels.name, "columns": len(columns), "mismatches": mismatches[:20]}
+
+    def _sma(self, df, shared, column, length):
+        """শেয়ার্ড SMA: একই (কলাম, লেন্থ) এর SMA এক হিসাবে একবারই"""
+        key = ('sma', column, length)
+        if key not in shared:
+            shared[key] = ta.sma(df[column], length=length)
+        return shared[key]
+
+    # ============================================================
+    # নোড: প্রি-প্রসেসিং
+    # ============================================================
+    def _calc_vwap(self, df, shared):
+        # VWAP: turnover / volume (Manually calc if not present)
+        if 'turnover' in df.columns and 'volume' in df.columns:
+            vol_cumsum = df['volume'].cumsum()
+            df['vwap'] = (df['turnover'].cumsum()) / vol_cumsum.replace(0, 1)
+        return df
+
+    def _calc_smart_delta(self, df, shared):
+        # Smart Delta
+        if 'vol_buy' in df.columns and 'vol_sell' in df.columns:
+            df['vol_buy'] = df['vol_buy'].fillna(0)
+            df['vol_sell'] = df['vol_sell'].fillna(0)
+            df['smart_delta'] = df['vol_buy'] - df['vol_sell']
+        return df
+
+    # ============================================================
+    # নোড: Trend
+    # ============================================================
+    def _calc_sma_20(self, df, shared):
+        if len(df) > 20:
+            df['SMA_20'] = self._sma(df, shared, 'close', 20)
+        return df
+
+    def _calc_ema_20(self, df, shared):
+        if len(df) > 20:
+            if self.kernels is not None:
+                return self._native(df, shared, "ema_20", self.kernels.ema, ['close'], length=20)
+            df.ta.ema(length=20, append=True)
+        return df
+
+    def _calc_ema_50(self, df, shared):
+        if len(df) > 50:
+            if self.kernels is not None:
+                return self._native(df, shared, "ema_50", self.kernels.ema, ['close'], length=50)
+            df.ta.ema(length=50, append=True)
+        return df
+
+    def _calc_ema_200(self, df, shared):
+        if len(df) > 200:
+            if self.kernels is not None:
+                return self._native(df, shared, "ema_200", self.kernels.ema, ['close'], length=200)
+            df.ta.ema(length=200, append=True)
+        return df
+
+    def _calc_macd(self, df, shared):
+        try: df.ta.macd(append=True)
         except: pass
         return df
 
-    def _calculate_momentum(self, df):
+    def _calc_psar(self, df, shared):
+        if self.kernels is not None:
+            return self._native(df, shared, "psar", self.kernels.psar, ['high', 'low'])
+        try: df.ta.psar(append=True)
+        except: pass
+        return df
+
+    def _calc_adx(self, df, shared):
+        if self.kernels is not None:
+            return self._native(df, shared, "adx", self.kernels.adx, ['high', 'low', 'close'])
+        try: df.ta.adx(append=True)
+        except: pass
+        return df
+
+    def _calc_ichimoku(self, df, shared):
         try:
-            df.ta.rsi(length=14, append=True)
-            df.ta.stoch(append=True)
-            df.ta.cci(append=True)
-            df.ta.willr(append=True)
-            df.ta.ao(append=True)
-            df.ta.roc(append=True)
-            df.ta.mom(append=True)
-            df.ta.uo(append=True)
+            if len(df) >= 9:
+                ichi = ta.ichimoku(df['high'], df['low'], df['close'])[0]
+                df = pd.concat([df, ichi], axis=1)
         except: pass
         return df
 
-    def _calculate_volume(self, df):
+    def _calc_supertrend(self, df, shared):
+        if self.kernels is not None:
+            return self._native(df, shared, "supertrend", self.kernels.supertrend, ['high', 'low', 'close'])
+        try: df.ta.supertrend(append=True)
+        except: pass
+        return df
+
+    def _calc_linreg(self, df, shared):
+        try: df.ta.linreg(append=True)
+        except: pass
+        return df
+
+    # ============================================================
+    # নোড: Momentum
+    # ============================================================
+    def _calc_rsi(self, df, shared):
+        if self.kernels is not None:
+            return self._native(df, shared, "rsi", self.kernels.rsi, ['close'], length=14)
+        try: df.ta.rsi(length=14, append=True)
+        except: pass
+        return df
+
+    def _calc_stoch(self, df, shared):
+        if self.kernels is not None:
+            return self._native(df, shared, "stoch", self.kernels.stoch, ['high', 'low', 'close'])
+        try: df.ta.stoch(append=True)
+        except: pass
+        return df
+
+    def _calc_cci(self, df, shared):
+        try: df.ta.cci(append=True)
+        except: pass
+        return df
+
+    def _calc_willr(self, df, shared):
+        try: df.ta.willr(append=True)
+        except: pass
+        return df
+
+    def _calc_ao(self, df, shared):
+        try: df.ta.ao(append=True)
+        except: pass
+        return df
+
+    def _calc_roc(self, df, shared):
+        try: df.ta.roc(append=True)
+        except: pass
+        return df
+
+    def _calc_mom(self, df, shared):
+        try: df.ta.mom(append=True)
+        except: pass
+        return df
+
+    def _calc_uo(self, df, shared):
+        try: df.ta.uo(append=True)
+        except: pass
+        return df
+
+    # ============================================================
+    # নোড: Volume
+    # ============================================================
+    def _calc_obv(self, df, shared):
         try:
             if len(df) > 1:
+                if self.kernels is not None:
+                    return self._native(df, shared, "obv", self.kernels.obv, ['close', 'volume'])
                 df.ta.obv(append=True)
-            df.ta.mfi(append=True)
-            df.ta.cmf(append=True)
-            df.ta.ad(append=True)
-            df.ta.eom(append=True)
-            
+        except: pass
+        return df
+
+    def _calc_mfi(self, df, shared):
+        if self.kernels is not None:
+            return self._native(df, shared, "mfi", self.kernels.mfi, ['high', 'low', 'close', 'volume'])
+        try: df.ta.mfi(append=True)
+        except: pass
+        return df
+
+    def _calc_cmf(self, df, shared):
+        try: df.ta.cmf(append=True)
+        except: pass
+        return df
+
+    def _calc_ad(self, df, shared):
+        try: df.ta.ad(append=True)
+        except: pass
+        return df
+
+    def _calc_eom(self, df, shared):
+        try: df.ta.eom(append=True)
+        except: pass
+        return df
+
+    def _calc_volume_profile(self, df, shared):
+        try:
             # Volume Profile Proxy
             if len(df) >= 24:
                 rolling_mean = df['close'].rolling(24).mean()
@@ -124,43 +426,70 @@ class TechnicalIndicators:
         except: pass
         return df
 
-    def _calculate_volatility(self, df):
-        try:
-            df.ta.bbands(append=True)
-            df.ta.atr(append=True)
-            df.ta.kc(append=True)
-            df.ta.chop(append=True)
+    # ============================================================
+    # নোড: Volatility
+    # ============================================================
+    def _calc_bbands(self, df, shared):
+        if self.kernels is not None:
+            return self._native(df, shared, "bbands", self.kernels.bbands, ['close'])
+        try: df.ta.bbands(append=True)
+        except: pass
+        return df
+
+    def _calc_atr(self, df, shared):
+        if self.kernels is not None:
+            return self._native(df, shared, "atr", self.kernels.atr, ['high', 'low', 'close'])
+        try: df.ta.atr(append=True)
         except: pass
         return df
 
-    def _calculate_special(self, df):
+    def _calc_kc(self, df, shared):
+        try: df.ta.kc(append=True)
+        except: pass
+        return df
+
+    def _calc_chop(self, df, shared):
+        try: df.ta.chop(append=True)
+        except: pass
+        return df
+
+    # ============================================================
+    # নোড: Special
+    # ============================================================
+    def _calc_ewo(self, df, shared):
         try:
             # EWO with check
             if len(df) >= 35:
-                sma5 = ta.sma(df['close'], 5)
-                sma35 = ta.sma(df['close'], 35)
+                sma5 = self._sma(df, shared, 'close', 5)
+                sma35 = self._sma(df, shared, 'close', 35)
                 if sma5 is not None and sma35 is not None:
                     df['ewo'] = sma5 - sma35
                 else: 
                      df['ewo'] = 0
             else:
                  df['ewo'] = 0
-            
-            # Fractals
-            h = df['high']
-            if len(df) > 5:
-                df['fractal_top'] = (h.shift(2) < h) & (h.shift(1) < h) & (h.shift(-1) < h) & (h.shift(-2) < h)
-            else:
-                 df['fractal_top'] = False
-            
-            pivot = (df['high'] + df['low'] + df['close']) / 3
-            df['pivot_p'] = pivot
-            df['gann_angle'] = 45 
         except:
             df['ewo'] = 0
         return df
 
-    def _detect_market_phase(self, df):
+    def _calc_fractals(self, df, shared):
+        # Fractals
+        h = df['high']
+        if len(df) > 5:
+            df['fractal_top'] = (h.shift(2) < h) & (h.shift(1) < h) & (h.shift(-1) < h) & (h.shift(-2) < h)
+        else:
+             df['fractal_top'] = False
+        return df
+
+    def _calc_pivot(self, df, shared):
+        df['pivot_p'] = (df['high'] + df['low'] + df['close']) / 3
+        return df
+
+    def _calc_gann(self, df, shared):
+        df['gann_angle'] = 45 
+        return df
+
+    def _detect_market_phase(self, df, shared=None):
         """ মার্কেট ফেজ ডিটেকশন লজিক """
         # Simplified logic using np.select or iteration if needed.
         # But for compatibility with user request which showed simple iteration logic:
@@ -175,7 +504,7 @@ class TechnicalIndicators:
             # 1. Volatility Status
             is_high_vol = False
             if 'ATRr_14' in df.columns:
-                avg_atr = ta.sma(df['ATRr_14'], length=20)
+                avg_atr = self._sma(df, shared if shared is not None else {}, 'ATRr_14', 20)
                 if avg_atr is not None:
                     is_high_vol = (df['ATRr_14'] > avg_atr).fillna(False)
 
@@ -12,7 +12,7 @@ class TimeframeManager:
     def prepare_and_resample(self, df_1m, target_timeframe):
         """
         ইনপুট: ১ মিনিটের র-ডাটা (df_1m)
-        আউটপুট: টার্গেট টাইমফ্রেমের (যেমন '15T', '1H', '4H') ক্লিন ক্যান্ডেলস্টিক ডাটা।
+        আউটপুট: টার্গেট টাইমফ্রেমের (যেমন '15min', '1h', '4h') ক্লিন ক্যান্ডেলস্টিক ডাটা।
         """
         if df_1m.empty:
             logger.warning("No data provided for resampling.")
@@ -29,8 +29,14 @@ class TimeframeManager:
 
         # Smart Delta প্রিপারেশন: ১ মিনিট ক্যান্ডেলের ক্লোজ দেখে বায়ার/সেলার ভলিউম আলাদা করা
         # রিস্যাম্পল করার পর এই কলামগুলো যোগ (Sum) করলে বড় টাইমফ্রেমের ডেল্টা নিখুঁত হবে।
-        df_1m['vol_buy'] = np.where(df_1m['close'] >= df_1m['open'], df_1m['volume'], 0)
-        df_1m['vol_sell'] = np.where(df_1m['close'] < df_1m['open'], df_1m['volume'], 0)
+        vol_buy = pd.Series(np.where(df_1m['close'] >= df_1m['open'], df_1m['volume'], 0), index=df_1m.index)
+        vol_sell = pd.Series(np.where(df_1m['close'] < df_1m['open'], df_1m['volume'], 0), index=df_1m.index)
+        # market_trades এর আসল অর্ডার-ফ্লো থাকলে (merge_trade_flow) সেটিই; শুধু যেসব বারে ট্রেড ডাটা নেই সেখানে আনুমানিক
+        if 'vol_buy' in df_1m.columns and 'vol_sell' in df_1m.columns:
+            vol_buy = df_1m['vol_buy'].fillna(vol_buy)
+            vol_sell = df_1m['vol_sell'].fillna(vol_sell)
+        df_1m['vol_buy'] = vol_buy
+        df_1m['vol_sell'] = vol_sell
 
         # ৩. রিস্যাম্পলিং লজিক (১ মিনিট -> টার্গেট টাইমফ্রেম)
         # রুলস: Open=First, High=Max, Low=Min, Close=Last, Volume=Sum
@@ -56,20 +62,42 @@ class TimeframeManager:
             # টাইমফ্রেম সিঙ্ক রাখার জন্য যে ক্যান্ডেলগুলোর ডাটা নেই (NaN), সেগুলো বাদ দিচ্ছি
             df_resampled.dropna(subset=['open', 'close'], inplace=True)
 
-            # ৪. কলামের নাম স্ট্যান্ডার্ড করা (পরের লেয়ারের সুবিধার জন্য)
-            df_resampled['turnover'] = df_resampled['money_flow']
-            
-            # যদি ট্রেড কাউন্ট না থাকে, তাহলে Activity Score এর বেস ভ্যালু তৈরি করে দেওয়া
-            if 'trades' not in df_resampled.columns:
-                # Activity Proxy: (High-Low)/Open * Volume
-                range_pct = (df_resampled['high'] - df_resampled['low']) / df_resampled['open']
-                df_resampled['activity_raw'] = range_pct * df_resampled['volume']
-                df_resampled['activity_raw'] = df_resampled['activity_raw'].fillna(0)
-
-            return df_resampled
+            return self.finalize(df_resampled)
 
         except Exception as e:
             logger.error(f"Resampling Error for {target_timeframe}: {e}")
             return None
 
+    def merge_trade_flow(self, df, flow):
+        """
+        market_trades এর আসল অর্ডার-ফ্লো (Database.get_trade_flow, একই বাকেট) বারে বসানো।
+        ট্রেড ডাটা নেই এমন বার (ইনজেশন শুরুর আগে) ক্যান্ডেল রঙের আনুমানিক ভ্যালুতে থাকে। 'trades' কলাম শুধু সব বার
+        কভার হলে বসে, নাহলে finalize এর Activity Proxy থাকে (আংশিক ট্রেড কাউন্ট পুরনো বারকে নিষ্ক্রিয় দেখাত)।
+        """
+        if flow is None or flow.empty or df is None or df.empty:
+            return df
+        flow = flow.reindex(df.index)
+        for col in ('vol_buy', 'vol_sell'):
+            df[col] = flow[col].fillna(df[col]) if col in df.columns else flow[col]
+        if flow['trades'].notna().all():
+            df['trades'] = flow['trades']
+        return df
+
+    def finalize(self, df_resampled):
+        """
+        রিস্যাম্পল করা বার (অথবা TimescaleDB continuous aggregate থেকে আসা একই কলামের বার) এ
+        পরের লেয়ারের স্ট্যান্ডার্ড কলাম বসানো।
+        """
+        # ৪. কলামের নাম স্ট্যান্ডার্ড করা (পরের লেয়ারের সুবিধার জন্য)
+        df_resampled['turnover'] = df_resampled['money_flow']
+        
+        # যদি ট্রেড কাউন্ট না থাকে, তাহলে Activity Score এর বেস ভ্যালু তৈরি করে দেওয়া
+        if 'trades' not in df_resampled.columns:
+            # Activity Proxy: (High-Low)/Open * Volume
+            range_pct = (df_resampled['high'] - df_resampled['low']) / df_resampled['open']
+            df_resampled['activity_raw'] = range_pct * df_resampled['volume']
+            df_resampled['activity_raw'] = df_resampled['activity_raw'].fillna(0)
+
+        return df_resampled
+
 timeframe_manager = TimeframeManager()
@@ -4,6 +4,7 @@ import asyncio
 from datetime import datetime
 from app.core.config import settings
 from app.database import db  # Database Import
+from app.services.metrics import metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("TradeExecutor")
@@ -128,6 +129,7 @@ class TradeExecutor:
         amount_usdt = balance * (self.risk_percentage / 100)
         return amount_usdt / price
 
+    @metrics.timed("execute_trade")
     async def execute_trade(self, signal, exchange_name='binance'):
         if not signal or signal.get('side') not in ['BUY', 'SELL']: return None
 
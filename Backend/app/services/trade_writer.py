@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from app.core.config import settings
+from app.database import db
+from app.services.metrics import metrics
+
+logger = logging.getLogger("TradeWriter")
+metrics.describe("trade_flush_seconds", "Latency of one batched market_trades COPY")
+
+
+class TradeWriter:
+    """
+    market_trades এর হাই-ইনজেস্ট write-behind: ফিড প্রতিটি ট্রেড TRADE_COLUMNS ক্রমের টাপল হিসেবে add() করে
+    (সিঙ্ক্রোনাস append, await বা রাউন্ড-ট্রিপ নেই), তারপর `flush_size` এ পৌঁছালে অথবা প্রতি `flush_interval`
+    সেকেন্ডে সব সিম্বলের ট্রেড এক binary COPY তে যায় (db.copy_trades)।
+
+    - ট্রেড append-only, তাই CandleWriter এর মতো কী ধরে মার্জ নেই; সরাসরি লিস্ট।
+    - সাইজ ফ্লাশ ব্যাকগ্রাউন্ড টাস্কে চলে (একসাথে একটিই), চলাকালীন আসা ট্রেড পরের ব্যাচে যায়; ফিড কখনো থামে না।
+    - ফ্লাশ ব্যর্থ হলে ব্যাচ আবার সামনে ফেরে; `max_pending` এর বেশি হলে সবচেয়ে পুরনো ট্রেড বাদ (মেমরি সীমিত)।
+    """
+    def __init__(self, flush_size=None, flush_interval=None, max_pending=None):
+        self.flush_size = flush_size or settings.TRADE_FLUSH_SIZE
+        self.flush_interval = flush_interval or settings.TRADE_FLUSH_INTERVAL_SEC
+        self.max_pending = max_pending or self.flush_size * 100
+        self.pending = []
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._last_flush = time.monotonic()
+
+        # স্ট্যাটস
+        self.received = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, record):
+        """একটি ট্রেড পেন্ডিং এ; সাইজ থ্রেশহোল্ডে পৌঁছালে (আগের ফ্লাশ চলমান না থাকলে) ব্যাকগ্রাউন্ড ফ্লাশ"""
+        self.pending.append(record)
+        self.received += 1
+        if len(self.pending) >= self.flush_size and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        """পেন্ডিং ট্রেড ব্যাচে সেভ; ফ্লাশের মাঝে আবার flush_size জমে গেলে সাথে সাথে পরের ব্যাচ। সফল হলে True"""
+        async with self._lock:
+            self._last_flush = time.monotonic()
+            while self.pending:
+                batch, self.pending = self.pending, []
+                started = time.perf_counter()
+                try:
+                    await db.copy_trades(batch)
+                except Exception as e:
+                    self.failed += 1
+                    metrics.inc("trade_flush_failures")
+                    logger.error(f"❌ Trade Flush Error ({len(batch)} trades, retry pending): {e}")
+                    self._requeue(batch)
+                    return False
+
+                metrics.observe("trade_flush_seconds", time.perf_counter() - started)
+                self.flushed += len(batch)
+                self.batches += 1
+                if len(self.pending) < self.flush_size:
+                    break
+            return True
+
+    def _requeue(self, batch):
+        # ব্যর্থ ব্যাচ আগে, এর মাঝে আসা ট্রেড পরে (সময়ের ক্রম বজায় থাকে)
+        batch.extend(self.pending)
+        self.pending = batch
+        overflow = len(self.pending) - self.max_pending
+        if overflow > 0:
+            del self.pending[:overflow]
+            self.dropped += overflow
+            metrics.inc("trades_dropped", overflow)
+            logger.error(f"⚠️ Trade Writer Overflow: dropped {overflow} oldest unsaved trades")
+
+    async def run(self):
+        """টাইম থ্রেশহোল্ড: শেষ ফ্লাশের পর `flush_interval` পার হলে পেন্ডিং ট্রেড সেভ"""
+        try:
+            while True:
+                await asyncio.sleep(max(0.0, self._last_flush + self.flush_interval - time.monotonic()))
+                if time.monotonic() - self._last_flush >= self.flush_interval:
+                    await asyncio.shield(self.flush())
+        except asyncio.CancelledError:
+            logger.info("🛑 Trade Writer Stopped.")
+            raise
+
+    async def close(self):
+        """শাটডাউন: চলমান ফ্লাশ শেষ হওয়ার পর বাকি ট্রেড সেভ (ব্যর্থ হলে একবার আবার চেষ্টা)"""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        if not await self.flush():
+            await self.flush()
+        if self.pending:
+            logger.error(f"❌ {len(self.pending)} trades could not be saved at shutdown")
+
+    def stats(self):
+        return {
+            "pending": len(self.pending),
+            "received": self.received,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "flush_size": self.flush_size,
+            "flush_interval_sec": self.flush_interval
+        }
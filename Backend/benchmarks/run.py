@@ -0,0 +1,489 @@
+"""
+ট্রেডিং হট পাথের বেঞ্চমার্ক (সিডেড সিনথেটিক ডাটা)।
+
+    python -m benchmarks.run                        # সব কেস, ফলাফল benchmarks/results/<সময়>.json
+    python -m benchmarks.run --quick                # 100k-রো কেসগুলো বাদ
+    python -m benchmarks.run --only indicators      # নামে মিলে এমন কেস
+    python -m benchmarks.run --save baseline.json --compare benchmarks/results/old.json --threshold 0.15
+    python -m benchmarks.run --verify-kernels       # numpy/numba ইন্ডিকেটর কার্নেল বনাম pandas_ta
+
+--compare দিলে প্রতিটি কেসের median সময় বা peak মেমরি বেসলাইনের চেয়ে threshold এর বেশি খারাপ হলে
+REGRESSION হিসেবে দেখায় এবং exit code 1 দেয় (CI তে ব্যবহারযোগ্য)।
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import DEFAULT_SEED, synthetic_ohlcv, backtest_frame, ohlcv_rows, kline_ticks
+
+CASES = []
+
+
+def case(name, units, repeat=5, heavy=False):
+    """
+    বেঞ্চমার্ক কেস রেজিস্টার: ফাংশন setup করে একটি (sync অথবা async) callable ও প্রতি রানে প্রসেস হওয়া ইউনিট সংখ্যা দেয়।
+    heavy=True কেস --quick এ বাদ যায়।
+    """
+    def decorator(setup):
+        CASES.append({"name": name, "units": units, "repeat": repeat, "heavy": heavy, "setup": setup})
+        return setup
+    return decorator
+
+
+# ============================================================
+# কেস
+# ============================================================
+def _indicators(rows, features=None, backend=None):
+    from app.services.technical_indicators import TechnicalIndicators, technical_indicators
+    engine = technical_indicators if backend is None else TechnicalIndicators(backend=backend)
+    df = synthetic_ohlcv(rows)
+    return lambda: engine.apply_indicators(df, features), rows
+
+
+@case("indicators_300", "rows")
+def bench_indicators_300():
+    return _indicators(300)
+
+
+@case("indicators_1500", "rows")
+def bench_indicators_1500():
+    return _indicators(1500)
+
+
+@case("indicators_100k", "rows", repeat=3, heavy=True)
+def bench_indicators_100k():
+    return _indicators(100_000)
+
+
+@case("indicators_1500_backtest_features", "rows")
+def bench_indicators_selective():
+    from app.services.backtest_engine import BacktestEngine
+    return _indicators(1500, BacktestEngine.SIGNAL_FEATURES)
+
+
+@case("indicators_1500_numpy_kernels", "rows")
+def bench_indicators_numpy():
+    return _indicators(1500, backend="numpy")
+
+
+@case("indicators_1500_numba_kernels", "rows")
+def bench_indicators_numba():
+    return _indicators(1500, backend="numba")
+
+
+@case("indicators_100k_numba_kernels", "rows", repeat=3, heavy=True)
+def bench_indicators_100k_numba():
+    return _indicators(100_000, backend="numba")
+
+
+@case("resample_1m_to_1h_10k", "rows")
+def bench_resample():
+    from app.services.timeframe_manager import TimeframeManager
+    manager = TimeframeManager()
+    df = synthetic_ohlcv(10_000)
+    # prepare_and_resample ইনপুটে কলাম যোগ করে, তাই প্রতি রানে নতুন কপি
+    return lambda: manager.prepare_and_resample(df.copy(), "1h"), len(df)
+
+
+@case("resample_1m_to_1h_100k", "rows", repeat=3, heavy=True)
+def bench_resample_100k():
+    from app.services.timeframe_manager import TimeframeManager
+    manager = TimeframeManager()
+    df = synthetic_ohlcv(100_000)
+    return lambda: manager.prepare_and_resample(df.copy(), "1h"), len(df)
+
+
+def _hourly_bars(aggregated):
+    from app.services.timeframe_manager import TimeframeManager
+    manager = TimeframeManager()
+    # ৩০০টি 1H বার: ফলব্যাক পাথ ১৮,০০০ টি ১ মিনিট রো রিস্যাম্পল করে, continuous aggregate পাথ তৈরি বার পায়
+    df = synthetic_ohlcv(300 * 60)
+    bars = manager.prepare_and_resample(df.copy(), "1h")[["open", "high", "low", "close", "volume", "money_flow", "vol_buy", "vol_sell"]]
+    if aggregated:
+        return lambda: manager.finalize(bars.copy()), len(bars)
+    return lambda: manager.prepare_and_resample(df.copy(), "1h"), len(bars)
+
+
+@case("hourly_bars_300_resample", "bars")
+def bench_hourly_bars_resample():
+    return _hourly_bars(False)
+
+
+@case("hourly_bars_300_aggregate", "bars")
+def bench_hourly_bars_aggregate():
+    return _hourly_bars(True)
+
+
+class FakeWebSocket:
+    """শুধু বাইট/মেসেজ গোনে; নেটওয়ার্ক খরচ বাদে ফ্যান-আউটের নিজস্ব খরচ মাপতে"""
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.messages += 1
+        self.bytes += len(text)
+
+    async def send_bytes(self, data):
+        self.messages += 1
+        self.bytes += len(data)
+
+    async def close(self, code=1000):
+        pass
+
+
+def _broadcast(clients, encoding="json", delta=False, bars=200, ticks_per_bar=10):
+    from app.services.stream_engine import StreamEngine
+
+    symbol = "BENCH/USDT"
+    history = synthetic_ohlcv(1500 + bars)
+    ticks = kline_ticks(history.iloc[1500:], symbol, ticks_per_bar)
+
+    def run():
+        # লুপের বাইরে তৈরি, তাই স্টেজ টাস্ক অটো-স্টার্ট হয় না; স্টেজগুলো হারনেস নিজে চালায় (DB/এক্সচেঞ্জ সিঙ্ক ছাড়া)
+        engine = StreamEngine(symbols=[symbol])
+        engine._loop_running = lambda: False
+        return drive(engine)
+
+    async def drive(engine):
+        stream = engine.get_stream(symbol)
+        stream.buffer.load(history.iloc[:1500])
+        stream.rebuild_indicator_stream()
+        sockets = [FakeWebSocket() for _ in range(clients)]
+        for websocket in sockets:
+            await engine.connect(websocket, [symbol], encoding=encoding, delta=delta)
+
+        async def drain_persist():
+            while True:
+                await engine.persist_queue.get()
+
+        tasks = [asyncio.create_task(engine._publish_stage()), asyncio.create_task(drain_persist())]
+        try:
+            for tick in ticks:
+                await engine.broadcast(tick)
+                current_time, processed = stream.ingest.get_nowait()
+                await engine.process_tick(stream, current_time, processed)
+                # প্রতি টিকে লুপকে একবার ছেড়ে দেওয়া, যাতে publish ও রাইটার টাস্ক চলে (লাইভ ফিডের মতো)
+                await asyncio.sleep(0)
+            while engine.publish_queue.stats()["depth"] or any(s.pending for s in engine.sessions.values()):
+                await asyncio.sleep(0)
+        finally:
+            for task in tasks:
+                task.cancel()
+            for websocket in sockets:
+                engine.disconnect(websocket)
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return run, len(ticks)
+
+
+@case("broadcast_10_clients", "ticks")
+def bench_broadcast_10():
+    return _broadcast(10)
+
+
+@case("broadcast_100_clients", "ticks", repeat=3)
+def bench_broadcast_100():
+    return _broadcast(100)
+
+
+@case("broadcast_100_clients_binary_delta", "ticks", repeat=3)
+def bench_broadcast_100_binary():
+    return _broadcast(100, encoding="binary", delta=True)
+
+
+@case("hybrid_signal_1500", "calls")
+def bench_hybrid_signal():
+    from app.services.compute_executor import compute_executor
+    from app.services.strategy_manager import strategy_manager
+    # প্রসেস পুলের IPC বাদে শুধু গণনার খরচ মাপতে থ্রেড পুলে চালানো
+    compute_executor.processes = 0
+    engine = strategy_manager.hybrid_engine
+    df = synthetic_ohlcv(1500)
+    return lambda: engine.get_hybrid_signal(df), 1
+
+
+def _signal_tick(mode, incremental):
+    from app.services.compute_executor import compute_executor
+    from app.services.feature_frame import FeatureFrame
+    from app.services.incremental_indicators import IncrementalIndicators
+    from app.services.strategy_manager import strategy_manager
+    compute_executor.processes = 0
+    history = synthetic_ohlcv(1500)
+    stream = IncrementalIndicators(capacity=1500).warmup(history) if incremental else None
+
+    def run():
+        # লাইভ analyze স্টেজের মতো (SymbolStream.analysis_snapshot): প্রতি টিকে একটি স্ন্যাপশট -> get_signal
+        strategy_manager.current_mode = mode
+        frame = stream.to_frame() if incremental else history.copy()
+        return strategy_manager.get_signal(FeatureFrame(frame, owned=True))
+    return run, 1
+
+
+@case("signal_tick_hybrid_incremental", "ticks")
+def bench_signal_hybrid_incremental():
+    return _signal_tick("Hybrid AI (Ensemble)", True)
+
+
+@case("signal_tick_hybrid_raw", "ticks")
+def bench_signal_hybrid_raw():
+    return _signal_tick("Hybrid AI (Ensemble)", False)
+
+
+@case("signal_tick_conservative_raw", "ticks")
+def bench_signal_conservative_raw():
+    return _signal_tick("Conservative", False)
+
+
+@case("run_backtest_cached_5000", "bars", repeat=3)
+def bench_run_backtest():
+    from app.services.backtest_engine import backtest_engine
+    from app.services.candle_store import candle_store
+
+    # টেম্প ডিরেক্টরিতে ক্যান্ডেল স্টোর সিড করা (রেঞ্জ "ডাউনলোড হয়েছে" চিহ্নিত), তাই কোনো নেটওয়ার্ক কল নেই
+    bars, timeframe = 5000, "1h"
+    tf_ms = candle_store.timeframe_ms(timeframe)
+    end = int(time.time() * 1000) // tf_ms * tf_ms
+    start = end - bars * tf_ms
+    df = synthetic_ohlcv(bars, freq="1h", start=pd.Timestamp(start, unit="ms", tz="UTC"))
+    candle_store.root = tempfile.mkdtemp(prefix="metron-bench-")
+    candle_store.write("binance", "BENCH/USDT", timeframe, ohlcv_rows(df))
+    series_dir = candle_store._series_dir("binance", "BENCH/USDT", timeframe)
+    candle_store._save_ranges(series_dir, [(start, end)])
+
+    return lambda: backtest_engine.run_backtest("binance", "BENCH/USDT", timeframe, bars, "MACD_RSI_VWAP"), bars
+
+
+@case("fill_candle_gaps_100k", "candles")
+def bench_fill_candle_gaps():
+    from app.services.data_sanitizer import DataSanitizer
+    sanitizer = DataSanitizer()
+    rows = ohlcv_rows(synthetic_ohlcv(100_000), gap_every=100)
+    return lambda: sanitizer.fill_candle_gaps(rows), len(rows)
+
+
+@case("candle_decode_20x1500", "rows")
+def bench_candle_decode():
+    from app.database import CANDLE_FIELDS, decode_candle_columns
+
+    # get_candles_multi এর পেলোডের মতো: প্রতি সিম্বলে টাইম (Unix µs, >i8) ও প্রতি কলাম একটি big-endian bytea
+    payloads = []
+    for seed in range(20):
+        df = synthetic_ohlcv(1500, seed=seed)
+        time_bytes = (df.index.as_unit("ns").asi8 // 1000).astype(">i8").tobytes()
+        payloads.append((time_bytes, {c: df[c].to_numpy().astype(">f8").tobytes() for c in CANDLE_FIELDS}))
+    return lambda: [decode_candle_columns(t, cols) for t, cols in payloads], 20 * 1500
+
+
+@case("trade_ingest_100k", "trades")
+def bench_trade_ingest():
+    from app.services.market_feed import MarketFeed
+    from app.database import db
+    from app.services.trade_writer import TradeWriter
+
+    # aggTrade মেসেজ পার্স -> trade_record -> TradeWriter বাফার (COPY তাৎক্ষণিক সিংক দিয়ে বদলানো; ফিডের নিজস্ব খরচ)
+    count = 100_000
+    messages = [json.dumps({
+        "stream": "btcusdt@aggTrade",
+        "data": {"e": "aggTrade", "E": 1767225600000 + i, "s": "BTCUSDT", "a": i, "p": f"{65000 + i % 50 * 0.1:.1f}",
+                 "q": "0.003", "f": i, "l": i, "T": 1767225600000 + i, "m": i % 3 == 0}
+    }) for i in range(count)]
+
+    async def copy_trades(records):
+        return len(records)
+
+    async def run():
+        writer = TradeWriter()
+        feed = MarketFeed(["BTC/USDT"], None, trade_handler=writer.add)
+        saved, db.copy_trades = db.copy_trades, copy_trades
+        try:
+            for i, message in enumerate(messages):
+                await feed.handle_message(message)
+                if i % 1000 == 0:
+                    await asyncio.sleep(0)
+            await writer.close()
+        finally:
+            db.copy_trades = saved
+
+    return run, count
+
+
+# ============================================================
+# রানার
+# ============================================================
+def _call(fn, loop):
+    result = fn()
+    if asyncio.iscoroutine(result):
+        result = loop.run_until_complete(result)
+    return result
+
+
+def measure(spec, loop):
+    fn, units = spec["setup"]()
+    _call(fn, loop)  # ওয়ার্ম-আপ (ইমপোর্ট, ক্যাশ, JIT-এর মতো প্রথম-কলের খরচ বাদ)
+
+    timings = []
+    for _ in range(spec["repeat"]):
+        gc.collect()
+        started = time.perf_counter()
+        _call(fn, loop)
+        timings.append(time.perf_counter() - started)
+
+    # মেমরি আলাদা রানে: tracemalloc সময় মাপাকে ধীর করে দেয়
+    gc.collect()
+    tracemalloc.start()
+    _call(fn, loop)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "units": spec["units"],
+        "units_per_run": units,
+        "runs": len(timings),
+        "median_sec": median,
+        "min_sec": min(timings),
+        "max_sec": max(timings),
+        "stdev_sec": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "throughput_per_sec": units / median if median > 0 else None,
+        "peak_memory_bytes": peak
+    }
+
+
+def compare(results, baseline, threshold):
+    """বেসলাইনের তুলনায় median সময় বা peak মেমরি threshold এর বেশি বাড়লে regression"""
+    report = {}
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            report[name] = {"status": "new"}
+            continue
+        time_ratio = current["median_sec"] / previous["median_sec"] if previous["median_sec"] else 1.0
+        memory_ratio = current["peak_memory_bytes"] / previous["peak_memory_bytes"] if previous["peak_memory_bytes"] else 1.0
+        regressed = time_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        improved = time_ratio < 1 - threshold
+        report[name] = {
+            "status": "regression" if regressed else ("improved" if improved else "ok"),
+            "time_ratio": round(time_ratio, 3),
+            "memory_ratio": round(memory_ratio, 3)
+        }
+    return report
+
+
+def verify_kernels():
+    """numpy/numba কার্নেল বনাম pandas_ta, কয়েকটি দৈর্ঘ্য ও একটি ফ্ল্যাট (শূন্য রেঞ্জ) অংশসহ"""
+    import warnings
+    from app.services.technical_indicators import TechnicalIndicators
+    warnings.filterwarnings("ignore")
+
+    failed = False
+    for backend in ("numpy", "numba"):
+        engine = TechnicalIndicators(backend=backend)
+        for rows in (2, 15, 30, 300, 1500, 20_000):
+            df = synthetic_ohlcv(rows, seed=DEFAULT_SEED + rows)
+            if rows >= 300:
+                df.iloc[rows // 3:rows // 3 + 40] = df['close'].iloc[rows // 3]
+            result = engine.verify_native_backend(df)
+            failed |= not result["match"]
+            status = "ok" if result["match"] else "MISMATCH " + "; ".join(result["mismatches"][:3])
+            print(f"{result['backend']:<6} rows={rows:<7} columns={result['columns']:<3} {status}")
+    return 1 if failed else 0
+
+
+def environment():
+    import pandas_ta
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pandas_ta": getattr(pandas_ta, "version", None),
+        "seed": DEFAULT_SEED
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Metron hot-path benchmarks")
+    parser.add_argument("--only", nargs="*", help="run cases whose name contains any of these")
+    parser.add_argument("--quick", action="store_true", help="skip 100k-row cases")
+    parser.add_argument("--save", help="output JSON path (default benchmarks/results/<utc-time>.json)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown / memory growth ratio (default 0.2)")
+    parser.add_argument("--verify-kernels", action="store_true", help="check native indicator kernels against pandas_ta and exit")
+    args = parser.parse_args(argv)
+
+    if args.verify_kernels:
+        return verify_kernels()
+
+    # বেঞ্চমার্কে হট পাথের লগ/প্রিন্ট বাদ (মাপা সময়ে কনসোল I/O না ঢোকে)
+    import logging
+    logging.disable(logging.WARNING)
+
+    selected = [
+        spec for spec in CASES
+        if (not args.quick or not spec["heavy"]) and (not args.only or any(key in spec["name"] for key in args.only))
+    ]
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = {}
+    stdout = sys.stdout
+    for spec in selected:
+        sys.stdout = open(os.devnull, "w")
+        try:
+            results[spec["name"]] = measure(spec, loop)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        r = results[spec["name"]]
+        print(f"{spec['name']:<38} {r['median_sec'] * 1000:>10.2f} ms  {r['throughput_per_sec']:>14,.0f} {r['units']}/s  "
+              f"{r['peak_memory_bytes'] / 1024 / 1024:>8.1f} MB")
+    loop.close()
+
+    output = {
+        "created_at": datetime.now(tz=timezone.utc).isoformat(),
+        "environment": environment(),
+        "results": results
+    }
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        output["comparison"] = compare(results, baseline, args.threshold)
+        print(f"\nCompared with {args.compare} (threshold {args.threshold:.0%}):")
+        for name, item in output["comparison"].items():
+            if item["status"] == "new":
+                print(f"  {name:<38} new")
+                continue
+            flag = "⚠️ REGRESSION" if item["status"] == "regression" else item["status"]
+            print(f"  {name:<38} time x{item['time_ratio']:<6} memory x{item['memory_ratio']:<6} {flag}")
+        if any(item["status"] == "regression" for item in output["comparison"].values()):
+            exit_code = 1
+
+    path = args.save or os.path.join(os.path.dirname(__file__), "results", datetime.now(tz=timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nSaved: {path}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
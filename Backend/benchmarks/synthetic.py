@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+# বেঞ্চমার্কের ডিফল্ট সিড: একই সিডে প্রতিবার হুবহু একই ডাটা
+DEFAULT_SEED = 42
+
+
+def synthetic_ohlcv(rows, freq="1min", seed=DEFAULT_SEED, start="2024-01-01", price=100.0, volatility=0.002):
+    """
+    সিডেড সিনথেটিক OHLCV (জ্যামিতিক র‍্যান্ডম ওয়াক), DatetimeIndex 'timestamp' (UTC)।
+    ফরম্যাট db.get_recent_candles এর আউটপুটের মতো, তাই স্ট্রিম/রিস্যাম্পল/ইন্ডিকেটর সরাসরি নিতে পারে।
+    """
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, volatility, rows)))
+    open_ = np.concatenate([[price], close[:-1]]) * (1 + rng.normal(0, volatility / 4, rows))
+    wick = np.abs(rng.normal(0, volatility, (2, rows))) * close
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+    volume = rng.lognormal(3, 1, rows)
+    index = pd.date_range(start, periods=rows, freq=freq, tz="UTC", name="timestamp")
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=index)
+
+
+def backtest_frame(df):
+    """fetch_historical_data ফরম্যাট: timestamp (ms), OHLCV, datetime কলাম"""
+    frame = df.reset_index(drop=True)
+    frame.insert(0, "timestamp", df.index.as_unit("ms").asi8)
+    frame["datetime"] = pd.to_datetime(frame["timestamp"], unit="ms")
+    return frame
+
+
+def ohlcv_rows(df, gap_every=0, seed=DEFAULT_SEED):
+    """ccxt ফরম্যাট [[ms, o, h, l, c, v], ...]; gap_every > 0 হলে গড়ে প্রতি gap_every বারে ১-৫ বারের গ্যাপ"""
+    rows = backtest_frame(df)[["timestamp", "open", "high", "low", "close", "volume"]].values.tolist()
+    if not gap_every:
+        return rows
+    rng = np.random.default_rng(seed)
+    keep = np.ones(len(rows), dtype=bool)
+    for start in np.flatnonzero(rng.random(len(rows)) < 1 / gap_every):
+        keep[start:start + rng.integers(1, 6)] = False
+    keep[0] = True
+    return [row for row, kept in zip(rows, keep) if kept]
+
+
+def kline_ticks(df, symbol="BENCH/USDT", ticks_per_bar=10, seed=DEFAULT_SEED):
+    """প্রতি বারে কয়েকটি ইনট্রা-বার টিক, MarketFeed এর broadcast ইনপুট ফরম্যাটে"""
+    rng = np.random.default_rng(seed)
+    times = df.index.as_unit("ms").asi8
+    ticks = []
+    for t, (o, h, l, c, v) in zip(times.tolist(), df[["open", "high", "low", "close", "volume"]].values.tolist()):
+        path = np.sort(rng.uniform(l, h, ticks_per_bar - 1)).tolist() + [c]
+        for k, price in enumerate(path, start=1):
+            ticks.append({"s": symbol, "time": int(t), "open": o, "high": max(o, price), "low": min(o, price),
+                          "close": price, "volume": v * k / ticks_per_bar, "closed": k == ticks_per_bar})
+    return ticks
@@ -0,0 +1,174 @@
+"""
+ভেক্টরাইজড BacktestEngine.simulate বনাম পুরনো বার-বাই-বার লুপ: ট্রেড, ফি, স্লিপেজ, ফাইনাল ব্যালেন্স ও
+ইকুইটি কার্ভ হুবহু মেলে কিনা। Backend থেকে চালানো: python -m pytest tests
+"""
+import numpy as np
+
+from app.services.backtest_engine import backtest_engine
+from app.services.strategy_manager import strategy_manager
+from app.services.technical_indicators import technical_indicators
+from benchmarks.synthetic import synthetic_ohlcv, backtest_frame
+
+
+def simulate_loop(df_analyzed, strategy_mode, initial_balance=1000, fee_percent=0.1, slippage_percent=0.0):
+    """
+    পুরনো বার-বাই-বার (iloc) রেফারেন্স সিমুলেশন। ধীর, শুধু ভেক্টরাইজড simulate এর সাথে তুলনার জন্য রাখা।
+    রিটার্ন: (trades, final_balance, equity_curve)
+    """
+    # ৩. সিমুলেশন লুপ ভেরিয়েবল
+    trades = []
+    balance = initial_balance
+    equity_curve = [{"time": df_analyzed.iloc[0]['timestamp'], "balance": balance}]
+    
+    position = None # { "entry_price": 100, "amount": 10, "type": "BUY" }
+    
+    # ৫০তম ক্যান্ডেল থেকে শুরু (Indicator Warmup)
+    for i in range(50, len(df_analyzed)):
+        current_candle = df_analyzed.iloc[i]
+        price = current_candle['close']
+        timestamp = current_candle['datetime'] # Timestamp অবজেক্ট
+        ts_str = str(timestamp)
+        
+        # --- SIGNAL MOCKING (Strategy Logic) ---
+        # রিয়েল টাইম Signal Engine এর লজিক এখানে ইমুলেট করা হচ্ছে
+        score = 0
+        # Simple Logic for Demonstration (Replace with rigorous Signal Engine calls if needed)
+        if current_candle['close'] > current_candle.get('EMA_20', 0): score += 1
+        if current_candle.get('RSI_14', 50) < 30: score += 2 # Oversold Buy
+        if current_candle.get('MACD_12_26_9', 0) > current_candle.get('MACDs_12_26_9', 0): score += 1
+        if current_candle['close'] > current_candle.get('VWAP', 0): score += 1
+        
+        # Phase Detection
+        phase = current_candle.get('Market_Phase', 'Consolidation')
+        
+        mock_result = {"score": score, "verdict": "BUY" if score > 0 else "SELL"}
+        decision = strategy_manager.get_strategy_decision(mock_result, phase)
+        
+        # --- TRADE EXECUTION ---
+        if position is None:
+            # ENTRY CHECK
+            if decision['should_trade'] and decision['final_verdict'] in ["BUY", "STRONG BUY"]:
+                # Slippage Apply
+                entry_price = price * (1 + slippage_percent/100)
+                
+                # Fee Calculation (Entry)
+                usable_balance = balance * 0.95 # রিস্ক ম্যানেজমেন্টের জন্য ৫% বাফার
+                fee = usable_balance * (fee_percent/100)
+                net_investment = usable_balance - fee
+                
+                amount = net_investment / entry_price
+                
+                position = {
+                    "entry_price": entry_price, 
+                    "amount": amount, 
+                    "entry_time": ts_str,
+                    "entry_fee": fee
+                }
+                balance -= usable_balance # ব্যালেন্স থেকে টাকা পজিশনে গেল
+
+        else:
+            # EXIT CHECK
+            current_value = position['amount'] * price
+            entry_val = position['amount'] * position['entry_price']
+            raw_pnl_pct = (current_value - entry_val) / entry_val * 100
+            
+            # Sell Signal or SL/TP
+            is_sell_signal = score <= -2
+            
+            if is_sell_signal or raw_pnl_pct > 2.0 or raw_pnl_pct < -1.0:
+                # Slippage on Exit
+                exit_price = price * (1 - slippage_percent/100)
+                
+                gross_return = position['amount'] * exit_price
+                exit_fee = gross_return * (fee_percent/100)
+                net_return = gross_return - exit_fee
+                
+                # ক্যাশ ব্যাক পাওয়া গেল
+                balance += net_return # অবশিষ্ট ক্যাশের সাথে যোগ
+                
+                # Profit Calc
+                total_fee = position['entry_fee'] + exit_fee
+                net_profit = net_return - (position['amount'] * position['entry_price']) - position['entry_fee']
+                
+                trades.append({
+                    "entry_time": position['entry_time'],
+                    "exit_time": ts_str,
+                    "entry_price": position['entry_price'],
+                    "exit_price": exit_price,
+                    "profit_usdt": net_profit,
+                    "profit_pct": raw_pnl_pct, # Raw Price move
+                    "fees_paid": total_fee,
+                    "strategy": strategy_mode
+                })
+                position = None
+
+        # --- EQUITY CURVE UPDATE ---
+        # প্রতি ক্যান্ডেলে বর্তমান পোর্টফোলিও ভ্যালু
+        current_equity = balance
+        if position:
+            # যদি পজিশন থাকে, তার বর্তমান ভ্যালু যোগ হবে
+            current_equity += (position['amount'] * price)
+        
+        equity_curve.append({
+            "time": int(current_candle['timestamp']), # JS এর জন্য মিলিসেকেন্ড
+            "balance": round(current_equity, 2)
+        })
+
+    return trades, balance, equity_curve
+
+
+def mismatches(df_analyzed, strategy_mode="MACD_RSI_VWAP", initial_balance=1000, fee_percent=0.1, slippage_percent=0.0):
+    """দুই সিমুলেশনের পার্থক্যের তালিকা (খালি = হুবহু মেলে)"""
+    args = (df_analyzed, strategy_mode, initial_balance, fee_percent, slippage_percent)
+    fast_trades, fast_balance, fast_curve = backtest_engine.simulate(*args)
+    loop_trades, loop_balance, loop_curve = simulate_loop(*args)
+
+    found = []
+    if len(fast_trades) != len(loop_trades):
+        found.append(f"trade count {len(fast_trades)} != {len(loop_trades)}")
+    for idx, (fast, loop) in enumerate(zip(fast_trades, loop_trades)):
+        for key in loop:
+            if fast[key] != loop[key]:
+                found.append(f"trade {idx} {key}: {fast[key]} != {loop[key]}")
+    if fast_balance != loop_balance:
+        found.append(f"final balance {fast_balance} != {loop_balance}")
+    if len(fast_curve) != len(loop_curve):
+        found.append(f"equity points {len(fast_curve)} != {len(loop_curve)}")
+    for idx, (fast, loop) in enumerate(zip(fast_curve, loop_curve)):
+        if fast != loop:
+            found.append(f"equity {idx}: {fast} != {loop}")
+            break
+    return found[:20]
+
+
+def analyzed_frame(rows=2000, seed=42, volatility=0.004):
+    df = backtest_frame(synthetic_ohlcv(rows, seed=seed, volatility=volatility))
+    return technical_indicators.apply_indicators(df, backtest_engine.SIGNAL_FEATURES)
+
+
+def test_default_parameters_match_loop():
+    for seed in (1, 2, 3):
+        df = analyzed_frame(seed=seed)
+        assert mismatches(df) == []
+
+
+def test_slippage_and_fees_match_loop():
+    df = analyzed_frame(seed=7)
+    assert mismatches(df, fee_percent=0.04, slippage_percent=0.05) == []
+    assert mismatches(df, initial_balance=25000, fee_percent=0.0) == []
+
+
+def test_phase_vwap_and_nan_columns_match_loop():
+    df = analyzed_frame(seed=11)
+    rng = np.random.default_rng(11)
+    df['Market_Phase'] = rng.choice(["Markup", "Accumulation", "Consolidation", "Distribution", "Markdown"], len(df))
+    df['VWAP'] = df['close'].rolling(20).mean()
+    df.loc[df.index[::37], 'RSI_14'] = np.nan
+    assert mismatches(df) == []
+
+
+def test_short_frame_has_no_trades():
+    df = analyzed_frame(rows=50)
+    trades, balance, curve = backtest_engine.simulate(df, "MACD_RSI_VWAP")
+    assert trades == [] and balance == 1000 and len(curve) == 1
+    assert mismatches(df) == []